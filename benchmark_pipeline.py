@@ -0,0 +1,404 @@
+"""
+Benchmark do pipeline de geometria (Fase 2)
+
+1. Malhas sintéticas de 8 a 10^6 vértices
+2. Fração controlada de arestas dentro, cruzando e fora do volume de visão
+3. As duas variantes de projeção (Z negativo e Z positivo)
+4. Vazão (vértices/s, arestas/s), pico de memória e curvas de escala
+5. Saída em JSON para comparar versões (--compara falha em regressões)
+
+Uso:
+    python benchmark_pipeline.py --saida atual.json
+    python benchmark_pipeline.py --rapido --compara base.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fase2_pipeline import (
+    Malha, PipelineGrafico, Ponto4D, cria_matriz_identidade
+)
+
+# ============================================================================
+# CONFIGURAÇÃO
+# ============================================================================
+
+TAMANHOS = (8, 100, 1_000, 10_000, 100_000, 1_000_000)
+TAMANHOS_RAPIDO = (8, 100, 1_000, 10_000)
+
+# Frações de arestas (dentro, cruzando, fora)
+CENARIOS: Dict[str, Tuple[float, float, float]] = {
+    'dentro': (1.0, 0.0, 0.0),
+    'cruzando': (0.0, 1.0, 0.0),
+    'fora': (0.0, 0.0, 1.0),
+    'misto': (0.5, 0.3, 0.2),
+}
+
+PROJECOES = {'z_negativo': True, 'z_positivo': False}
+
+# As entradas escalares criam objetos por vértice/aresta; acima deste
+# tamanho o tempo é só extrapolação linear
+LIMITE_ESCALAR = 10_000
+
+NEAR, FAR = 1.0, 10.0
+LARGURA, ALTURA = 800, 600
+
+
+# ============================================================================
+# MALHAS SINTÉTICAS
+# ============================================================================
+
+def _faixa_z(pipeline: PipelineGrafico) -> Tuple[float, float]:
+    """
+    Faixa de z normalizado ocupada por pontos à frente da câmera
+
+    As duas matrizes P não levam [near, far] para o mesmo intervalo; a
+    faixa é obtida projetando pontos do eixo de visão com 5% de folga.
+    """
+    sinal = -1.0 if pipeline.usa_z_negativo else 1.0
+    folga = 0.05 * (pipeline.far - pipeline.near)
+    d = np.array([pipeline.near + folga, pipeline.far - folga])
+    pontos = np.column_stack([np.zeros(2), np.zeros(2), sinal * d, np.ones(2)])
+    recorte = pontos @ pipeline.P.T
+    z = recorte[:, 2] / recorte[:, 3]
+    return float(z.min()), float(z.max())
+
+
+def _amostra_ndc(rng: np.random.Generator, n: int,
+                 faixa_z: Tuple[float, float]) -> np.ndarray:
+    """Pontos (n, 3) em NDC dentro do volume de visão"""
+    return np.column_stack([
+        rng.uniform(-0.95, 0.95, n),
+        rng.uniform(-0.95, 0.95, n),
+        rng.uniform(*faixa_z, n),
+    ])
+
+
+def malha_sintetica(n_vertices: int, fracoes: Tuple[float, float, float],
+                    pipeline: PipelineGrafico,
+                    semente: int = 0) -> Malha:
+    """
+    Malha com arestas independentes de classe controlada
+
+    Os vértices são sorteados em NDC e levados de volta ao SRU pela
+    inversa de P . M1 do pipeline, de modo que a classe de cada aresta
+    (dentro, cruzando o plano RIGHT ou fora) não depende da projeção.
+    Cada par de vértices (2i, 2i + 1) forma uma aresta; as faces são
+    triângulos (2i, 2i + 1, 2i + 2) sobre os mesmos vértices.
+
+    Args:
+        n_vertices: Número de vértices (par, mínimo 4)
+        fracoes: Frações (dentro, cruzando, fora) das arestas
+        pipeline: Pipeline cuja P . M1 define o volume de visão
+        semente: Semente do gerador
+
+    Returns:
+        Malha com arestas (n_vertices / 2, 2)
+    """
+    rng = np.random.default_rng(semente)
+    n_arestas = n_vertices // 2
+
+    # Classe de cada aresta: 0 dentro, 1 cruzando, 2 fora
+    limites = np.round(np.cumsum(fracoes) / sum(fracoes) * n_arestas).astype(int)
+    classe = np.searchsorted(limites, np.arange(n_arestas), side='right')
+    rng.shuffle(classe)
+
+    # Pontos fora têm x em [1.5, 3] (além do plano RIGHT)
+    faixa_z = _faixa_z(pipeline)
+    ndc = np.empty((n_arestas, 2, 3))
+    ndc[:, 0] = _amostra_ndc(rng, n_arestas, faixa_z)
+    ndc[:, 1] = _amostra_ndc(rng, n_arestas, faixa_z)
+    fora = rng.uniform(1.5, 3.0, (n_arestas, 2))
+    ndc[classe >= 1, 1, 0] = fora[classe >= 1, 1]
+    ndc[classe == 2, 0, 0] = fora[classe == 2, 0]
+
+    # NDC -> recorte (h > 0) -> SRU
+    h = rng.uniform(1.0, 5.0, (n_arestas, 2, 1))
+    recorte = np.concatenate([ndc * h, h], axis=2).reshape(-1, 4)
+    sru = np.linalg.solve(pipeline.matriz_recorte, recorte.T).T
+    vertices = sru[:, :3] / sru[:, 3:]
+
+    n = len(vertices)
+    i = np.arange(0, n, 2)
+    faces = np.column_stack([i, i + 1, (i + 2) % n])
+    arestas = np.arange(n).reshape(-1, 2)
+
+    return Malha(vertices, faces, arestas=arestas)
+
+
+# ============================================================================
+# ENTRADAS DO PIPELINE
+# ============================================================================
+
+def _vertices_camera(malha: Malha) -> np.ndarray:
+    """Vértices (N, 4) homogêneos; com M1 identidade SRU = câmera"""
+    return np.column_stack([malha.vertices, np.ones(malha.n_vertices)])
+
+
+def _prepara_processa_ponto(pipeline, malha):
+    pontos = [Ponto4D(*v) for v in _vertices_camera(malha)]
+    return lambda: [pipeline.processa_ponto(p) for p in pontos]
+
+
+def _prepara_processa_linha(pipeline, malha):
+    pontos = [Ponto4D(*v) for v in _vertices_camera(malha)]
+    pares = [(pontos[a], pontos[b]) for a, b in malha.arestas]
+    return lambda: [pipeline.processa_linha(p1, p2) for p1, p2 in pares]
+
+
+def _prepara_processa_cubo(pipeline, malha):
+    M1 = cria_matriz_identidade()
+    return lambda: pipeline.processa_cubo(malha, M1)
+
+
+def _prepara_processa_pontos(pipeline, malha):
+    pontos = _vertices_camera(malha)
+    return lambda: pipeline.processa_pontos(pontos)
+
+
+def _prepara_processa_arestas(pipeline, malha):
+    pontos = _vertices_camera(malha)
+    return lambda: pipeline.processa_arestas(pontos, malha.arestas)
+
+
+def _prepara_processa_malha(pipeline, malha):
+    M1 = cria_matriz_identidade()
+    return lambda: pipeline.processa_malha(malha, M1)
+
+
+def _prepara_recorta_faces(pipeline, malha):
+    pontos = _vertices_camera(malha)
+    return lambda: pipeline.recorta_faces(pontos, malha.faces)
+
+
+# nome -> (preparação, escalar)
+ENTRADAS: Dict[str, Tuple[Callable, bool]] = {
+    'processa_ponto': (_prepara_processa_ponto, True),
+    'processa_linha': (_prepara_processa_linha, True),
+    'processa_cubo': (_prepara_processa_cubo, False),
+    'processa_pontos': (_prepara_processa_pontos, False),
+    'processa_arestas': (_prepara_processa_arestas, False),
+    'processa_malha': (_prepara_processa_malha, False),
+    'recorta_faces': (_prepara_recorta_faces, False),
+}
+
+
+# ============================================================================
+# MEDIÇÃO
+# ============================================================================
+
+def mede(funcao: Callable, repeticoes: int,
+         memoria: bool = True) -> Tuple[float, Optional[int]]:
+    """
+    Melhor tempo de várias execuções e pico de memória de uma execução
+
+    O pico é medido em uma execução separada com tracemalloc (que inclui
+    as alocações do NumPy), pois o rastreamento deixa o código mais lento.
+
+    Returns:
+        Tupla (segundos, bytes); bytes é None se memoria for False
+    """
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    if not memoria:
+        return melhor, None
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return melhor, pico
+
+
+def _expoente_escala(tamanhos: List[int], tempos: List[float]) -> Optional[float]:
+    """Inclinação de log(tempo) x log(tamanho); 1.0 = escala linear"""
+    if len(tamanhos) < 2:
+        return None
+    inclinacao, _ = np.polyfit(np.log(tamanhos), np.log(tempos), 1)
+    return float(inclinacao)
+
+
+def executa(tamanhos, cenarios, entradas, repeticoes: int,
+            memoria: bool = True, log=sys.stderr) -> Dict:
+    """
+    Roda todas as combinações e monta o relatório
+
+    Returns:
+        Dicionário pronto para json.dump
+    """
+    resultados = []
+    for projecao, z_negativo in PROJECOES.items():
+        pipeline = PipelineGrafico(NEAR, FAR, LARGURA, ALTURA, usa_z_negativo=z_negativo)
+        for cenario in cenarios:
+            fracoes = CENARIOS[cenario]
+            for tamanho in tamanhos:
+                malha = malha_sintetica(tamanho, fracoes, pipeline)
+                n_arestas = len(malha.arestas)
+                for nome in entradas:
+                    prepara, escalar = ENTRADAS[nome]
+                    if escalar and tamanho > LIMITE_ESCALAR:
+                        continue
+                    funcao = prepara(pipeline, malha)
+                    funcao()  # aquecimento
+                    segundos, pico = mede(funcao, repeticoes, memoria)
+                    resultados.append({
+                        'entrada': nome,
+                        'projecao': projecao,
+                        'cenario': cenario,
+                        'fracoes': list(fracoes),
+                        'n_vertices': malha.n_vertices,
+                        'n_arestas': n_arestas,
+                        'segundos': segundos,
+                        'vertices_por_s': malha.n_vertices / segundos,
+                        'arestas_por_s': n_arestas / segundos,
+                        'pico_memoria_bytes': pico,
+                    })
+                    texto_pico = f"pico {pico / 2**20:8.2f} MiB" if pico is not None else ""
+                    print(f"{nome:>17} {projecao:>10} {cenario:>8} "
+                          f"N={malha.n_vertices:>8}: {segundos * 1e3:10.3f} ms "
+                          f"{malha.n_vertices / segundos:14,.0f} vert/s "
+                          f"{texto_pico}", file=log)
+
+    return {
+        'formato': 1,
+        'data': datetime.now(timezone.utc).isoformat(),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'parametros': {
+            'tamanhos': list(tamanhos),
+            'cenarios': list(cenarios),
+            'entradas': list(entradas),
+            'repeticoes': repeticoes,
+            'memoria': memoria,
+            'limite_escalar': LIMITE_ESCALAR,
+        },
+        'resultados': resultados,
+        'escala': _curvas_escala(resultados),
+    }
+
+
+def _curvas_escala(resultados: List[Dict]) -> List[Dict]:
+    """Agrupa tempos por (entrada, projeção, cenário) em ordem de tamanho"""
+    grupos: Dict[Tuple[str, str, str], List[Dict]] = {}
+    for r in resultados:
+        grupos.setdefault((r['entrada'], r['projecao'], r['cenario']), []).append(r)
+
+    curvas = []
+    for (entrada, projecao, cenario), linhas in grupos.items():
+        linhas.sort(key=lambda r: r['n_vertices'])
+        tamanhos = [r['n_vertices'] for r in linhas]
+        tempos = [r['segundos'] for r in linhas]
+        curvas.append({
+            'entrada': entrada,
+            'projecao': projecao,
+            'cenario': cenario,
+            'n_vertices': tamanhos,
+            'segundos': tempos,
+            'expoente': _expoente_escala(tamanhos, tempos),
+        })
+    return curvas
+
+
+def _commit_atual() -> Optional[str]:
+    """Hash do commit do repositório, se houver git"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================================================
+# COMPARAÇÃO ENTRE VERSÕES
+# ============================================================================
+
+def compara(atual: Dict, base: Dict, tolerancia: float) -> List[str]:
+    """
+    Lista regressões de vazão em relação a um relatório anterior
+
+    Args:
+        atual: Relatório desta execução
+        base: Relatório de referência
+        tolerancia: Queda relativa aceita (0.1 = 10%)
+
+    Returns:
+        Mensagens, uma por combinação que regrediu
+    """
+    def chave(r):
+        return (r['entrada'], r['projecao'], r['cenario'], r['n_vertices'])
+
+    referencia = {chave(r): r for r in base['resultados']}
+    regressoes = []
+    for r in atual['resultados']:
+        antigo = referencia.get(chave(r))
+        if antigo is None:
+            continue
+        razao = r['vertices_por_s'] / antigo['vertices_por_s']
+        if razao < 1.0 - tolerancia:
+            regressoes.append(
+                f"{r['entrada']} {r['projecao']} {r['cenario']} "
+                f"N={r['n_vertices']}: {razao:.2f}x da base")
+    return regressoes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tamanhos', type=int, nargs='+',
+                        help=f'Números de vértices (padrão: {TAMANHOS})')
+    parser.add_argument('--rapido', action='store_true',
+                        help=f'Usa apenas {TAMANHOS_RAPIDO}')
+    parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS),
+                        default=list(CENARIOS))
+    parser.add_argument('--entradas', nargs='+', choices=list(ENTRADAS),
+                        default=list(ENTRADAS))
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--sem-memoria', action='store_true',
+                        help='Não mede o pico de memória (tracemalloc é lento '
+                             'nas entradas escalares)')
+    parser.add_argument('--saida', help='Arquivo JSON (padrão: stdout)')
+    parser.add_argument('--compara', help='Relatório JSON de referência')
+    parser.add_argument('--tolerancia', type=float, default=0.1,
+                        help='Queda de vazão aceita em --compara')
+    args = parser.parse_args(argv)
+
+    tamanhos = args.tamanhos or (TAMANHOS_RAPIDO if args.rapido else TAMANHOS)
+    tamanhos = [max(4, t + t % 2) for t in tamanhos]
+    relatorio = executa(tamanhos, args.cenarios, args.entradas, args.repeticoes,
+                        memoria=not args.sem_memoria)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+    else:
+        json.dump(relatorio, sys.stdout, indent=2)
+        print()
+
+    if args.compara:
+        with open(args.compara, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        regressoes = compara(relatorio, base, args.tolerancia)
+        for mensagem in regressoes:
+            print(f"REGRESSÃO: {mensagem}", file=sys.stderr)
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,17 @@
 3. Recorte 3D (Clipping)
 4. Normalização (divisão homogênea)
 5. Mapeamento SRT para coordenadas de tela (matriz M2)
+6. Saída compacta: array estruturado e quadros binários
+7. Instanciamento: K cópias de uma malha por uma pilha (K, 4, 4) de matrizes
 """
 
+import struct
+import time
 import numpy as np
-from typing import List, Tuple, Optional
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union
 from dataclasses import dataclass
-from enum import IntFlag
+from enum import IntEnum, IntFlag
 
 # ============================================================================
 # ESTRUTURAS DE DADOS
@@ -80,6 +85,219 @@ class Cubo:
         return cls(vertices, arestas)
 
 
+@dataclass
+class Malha:
+    """
+    Malha indexada guardada em arrays contíguos
+    
+    Os vértices ficam no SRU como um array (N, 3) de floats (pode ser um
+    np.memmap) e as faces como índices int32 (F, K), orientadas no sentido
+    anti-horário vistas de fora. As arestas únicas são derivadas das faces
+    quando não são informadas.
+    
+    Normais de face, planos das faces e normais médias dos vértices são
+    calculados sob demanda e guardados até a geometria mudar. Atribuir
+    vertices ou faces invalida o cache; edições no próprio array exigem
+    chamar invalida().
+    """
+    vertices: np.ndarray  # (N, 3)
+    faces: np.ndarray  # (F, K) int32
+    normais: Optional[np.ndarray] = None  # (N, 3) por vértice
+    cores: Optional[np.ndarray] = None  # (N, 3) RGB em [0, 1]
+    arestas: Optional[np.ndarray] = None  # (E, 2) int32
+    
+    def __post_init__(self):
+        self.vertices = np.asarray(self.vertices)
+        if not np.issubdtype(self.vertices.dtype, np.floating):
+            self.vertices = self.vertices.astype(float)
+        self.vertices = self.vertices.reshape(-1, 3)
+        
+        self.faces = np.asarray(self.faces, dtype=np.int32)
+        if self.faces.ndim == 1:
+            self.faces = self.faces.reshape(-1, 3)
+        
+        if self.arestas is None:
+            self.arestas = arestas_unicas(self.faces)
+        else:
+            self.arestas = np.asarray(self.arestas, dtype=np.int32).reshape(-1, 2)
+    
+    def __setattr__(self, nome, valor):
+        super().__setattr__(nome, valor)
+        if nome in ('vertices', 'faces'):
+            self.invalida()
+    
+    def invalida(self):
+        """Descarta os dados derivados da geometria"""
+        self.__dict__['_derivados'] = {}
+        self.__dict__['versao'] = self.__dict__.get('versao', -1) + 1
+    
+    def _derivado(self, chave: str, calcula):
+        derivados = self.__dict__['_derivados']
+        if chave not in derivados:
+            derivados[chave] = calcula()
+        return derivados[chave]
+    
+    def vetores_area(self) -> np.ndarray:
+        """
+        Vetor área de cada face (normal com módulo = 2 x área)
+        
+        Soma os produtos vetoriais do leque (0, k, k + 1), o que vale para
+        polígonos com qualquer número de vértices.
+        """
+        def calcula():
+            v = np.asarray(self.vertices, dtype=float)[self.faces]
+            base = v[:, 1:] - v[:, :1]
+            return np.cross(base[:, :-1], base[:, 1:]).sum(axis=1)
+        return self._derivado('area', calcula)
+    
+    def normais_faces(self) -> np.ndarray:
+        """Normais unitárias das faces (F, 3); zero em faces degeneradas"""
+        def calcula():
+            area = self.vetores_area()
+            norma = np.linalg.norm(area, axis=1, keepdims=True)
+            return np.divide(area, norma, out=np.zeros_like(area), where=norma > 0)
+        return self._derivado('normais_faces', calcula)
+    
+    def planos_faces(self) -> np.ndarray:
+        """Termo D de cada plano de face (n . v0), para o teste de visibilidade"""
+        def calcula():
+            v0 = np.asarray(self.vertices, dtype=float)[self.faces[:, 0]]
+            return np.einsum('ij,ij->i', self.normais_faces(), v0)
+        return self._derivado('planos_faces', calcula)
+    
+    def normais_vertices(self) -> np.ndarray:
+        """
+        Normais médias unitárias dos vértices (N, 3)
+        
+        Média das normais das faces que usam o vértice, ponderada pela
+        área. Normais lidas do arquivo (campo normais) têm prioridade.
+        """
+        if self.normais is not None:
+            return self.normais
+        
+        def calcula():
+            area = self.vetores_area()
+            idx = self.faces.ravel()
+            k = self.faces.shape[1]
+            soma = np.stack([
+                np.bincount(idx, weights=np.repeat(area[:, c], k),
+                            minlength=len(self.vertices))
+                for c in range(3)
+            ], axis=1)
+            # bincount devolve inteiros quando não há faces
+            soma = soma.astype(float, copy=False)
+            norma = np.linalg.norm(soma, axis=1, keepdims=True)
+            return np.divide(soma, norma, out=np.zeros_like(soma), where=norma > 0)
+        return self._derivado('normais_vertices', calcula)
+    
+    @property
+    def n_vertices(self) -> int:
+        return len(self.vertices)
+    
+    @property
+    def n_faces(self) -> int:
+        return len(self.faces)
+    
+    def caixa_envolvente(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Caixa alinhada aos eixos (AABB): cantos mínimo e máximo (3,)"""
+        def calcula():
+            v = np.asarray(self.vertices, dtype=float)
+            return v.min(axis=0), v.max(axis=0)
+        return self._derivado('caixa', calcula)
+    
+    def esfera_envolvente(self) -> Tuple[np.ndarray, float]:
+        """Esfera envolvente centrada na AABB: (centro (3,), raio)"""
+        def calcula():
+            minimo, maximo = self.caixa_envolvente()
+            centro = (minimo + maximo) / 2.0
+            v = np.asarray(self.vertices, dtype=float)
+            return centro, float(np.sqrt(((v - centro) ** 2).sum(axis=1).max()))
+        return self._derivado('esfera', calcula)
+    
+    def derivados(self) -> Dict[str, np.ndarray]:
+        """
+        Todos os dados derivados como arrays, calculando os que faltam
+        
+        Usado para persistir a malha pré-processada (ver
+        leitores_malha.salva_instantaneo). A caixa vira um array (2, 3)
+        com mínimo e máximo e a esfera um array (4,) com centro e raio;
+        malhas sem vértices não têm volumes envolventes.
+        """
+        dados = {
+            'area': self.vetores_area(),
+            'normais_faces': self.normais_faces(),
+            'planos_faces': self.planos_faces(),
+        }
+        if self.n_vertices:
+            minimo, maximo = self.caixa_envolvente()
+            centro, raio = self.esfera_envolvente()
+            dados['caixa'] = np.stack([minimo, maximo])
+            dados['esfera'] = np.append(centro, raio)
+        if self.normais is None:
+            dados['normais_vertices'] = self.normais_vertices()
+        return dados
+    
+    def restaura_derivados(self, dados: Dict[str, np.ndarray]):
+        """
+        Instala dados derivados já calculados, no formato de derivados()
+        
+        Nada é conferido: os arrays precisam ter sido calculados com a
+        geometria atual.
+        """
+        derivados = self.__dict__['_derivados']
+        for chave in ('area', 'normais_faces', 'planos_faces', 'normais_vertices'):
+            if chave in dados:
+                derivados[chave] = dados[chave]
+        if 'caixa' in dados:
+            derivados['caixa'] = (dados['caixa'][0], dados['caixa'][1])
+        if 'esfera' in dados:
+            derivados['esfera'] = (dados['esfera'][:3], float(dados['esfera'][3]))
+    
+    def vertices_homogeneos(self) -> np.ndarray:
+        """Vértices como array (N, 4) com h = 1"""
+        homogeneos = np.ones((len(self.vertices), 4))
+        homogeneos[:, :3] = self.vertices
+        return homogeneos
+    
+    @classmethod
+    def de_cubo(cls, cubo: Cubo) -> 'Malha':
+        """
+        Converte um Cubo (mesma ordem de vértices e de arestas)
+        
+        As seis faces são montadas a partir da numeração usada em
+        Cubo.criar_cubo_unitario.
+        """
+        vertices = np.array([[v.x, v.y, v.z] for v in cubo.vertices])
+        faces = np.array([
+            [0, 3, 2, 1],  # Frente (z mínimo)
+            [4, 5, 6, 7],  # Trás (z máximo)
+            [0, 1, 5, 4],  # Baixo
+            [3, 7, 6, 2],  # Cima
+            [0, 4, 7, 3],  # Esquerda
+            [1, 2, 6, 5],  # Direita
+        ])
+        return cls(vertices, faces, arestas=np.array(cubo.arestas))
+
+
+def arestas_unicas(faces: np.ndarray) -> np.ndarray:
+    """
+    Extrai as arestas únicas de um array de faces
+    
+    Args:
+        faces: Array (F, K) de índices
+        
+    Returns:
+        Array (E, 2) int32 com cada aresta uma vez, menor índice primeiro
+    """
+    faces = np.asarray(faces)
+    if faces.size == 0:
+        return np.zeros((0, 2), dtype=np.int32)
+    
+    pares = np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2)
+    pares = np.sort(pares, axis=1)
+    return np.unique(pares, axis=0).astype(np.int32)
+
+
 # ============================================================================
 # OPERAÇÕES COM MATRIZES
 # ============================================================================
@@ -100,12 +318,313 @@ def multiplica_matriz_ponto(matriz: np.ndarray, ponto: Ponto4D) -> Ponto4D:
     return Ponto4D.from_array(resultado_array)
 
 
+def multiplica_matriz_pontos(matriz: np.ndarray, pontos: np.ndarray) -> np.ndarray:
+    """
+    Multiplica matriz 4x4 por um lote de pontos homogêneos
+    
+    Equivale a aplicar multiplica_matriz_ponto em cada linha, mas com
+    um único matmul sobre o array inteiro.
+    
+    Args:
+        matriz: Matriz 4x4 (NumPy array)
+        pontos: Array (N, 4) com um ponto (x, y, z, h) por linha
+        
+    Returns:
+        Array (N, 4) com os pontos transformados
+    """
+    return pontos @ matriz.T
+
+
+def multiplica_matriz_vertices(matriz: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """
+    Aplica matriz 4x4 em vértices cartesianos (h = 1 implícito)
+    
+    Evita montar o array (N, 4) de coordenadas homogêneas.
+    
+    Args:
+        matriz: Matriz 4x4 (NumPy array)
+        vertices: Array (N, 3)
+        
+    Returns:
+        Array (N, 4) com os pontos transformados
+    """
+    return vertices @ matriz[:, :3].T + matriz[:, 3]
+
+
+def como_ponto_flutuante(dados, dtype=None) -> np.ndarray:
+    """
+    Converte para array de ponto flutuante sem cópia quando possível
+    
+    Args:
+        dados: Array ou sequência
+        dtype: Tipo desejado; None mantém float32/float64 e converte
+            inteiros para float64
+        
+    Returns:
+        Array NumPy de ponto flutuante
+    """
+    if dtype is not None:
+        return np.asarray(dados, dtype=dtype)
+    dados = np.asarray(dados)
+    if not np.issubdtype(dados.dtype, np.floating):
+        dados = dados.astype(float)
+    return dados
+
+
 def imprime_matriz(nome: str, matriz: np.ndarray):
     """Imprime matriz formatada"""
     print(f"\n{nome}:")
     print(matriz)
 
 
+# ============================================================================
+# MATRIZ DE VISUALIZAÇÃO (M1) - CÂMERA
+# ============================================================================
+
+def cria_matriz_janela(cu: float, cv: float, su: float, sv: float,
+                       dp: float) -> np.ndarray:
+    """
+    Cria D . C: cisalhamento que leva o centro da janela para o eixo N e
+    escala que normaliza a pirâmide de visão
+    
+    Depois dela, pontos dentro da janela têm |x| <= -z e |y| <= -z.
+    
+    Args:
+        cu, cv: Centro da janela no plano de projeção
+        su, sv: Meia largura e meia altura da janela
+        dp: Distância do VRP ao plano de projeção
+        
+    Returns:
+        Matriz 4x4
+    """
+    C = np.eye(4)
+    C[0, 2] = cu / dp
+    C[1, 2] = cv / dp
+    
+    D = cria_matriz_escala(dp / su, dp / sv, 1.0)
+    
+    return D @ C
+
+
+def bases_camera(vrps: np.ndarray, focos: np.ndarray,
+                 view_up: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calcula as bases (U, V, N) de K câmeras de uma vez
+    
+    N aponta do ponto focal para o VRP, U = View-Up x N e V = N x U.
+    
+    Args:
+        vrps: Array (K, 3) com as posições das câmeras
+        focos: Array (K, 3) com os pontos focais
+        view_up: Array (3,) ou (K, 3) com o vetor View-Up
+        
+    Returns:
+        Tupla (u, v, n) de arrays (K, 3) unitários
+    """
+    n = vrps - focos
+    n_norma = np.linalg.norm(n, axis=1, keepdims=True)
+    
+    u = np.cross(np.broadcast_to(view_up, n.shape), n)
+    u_norma = np.linalg.norm(u, axis=1, keepdims=True)
+    
+    if np.any(n_norma < 1e-12) or np.any(u_norma < 1e-12 * n_norma):
+        raise ValueError("VRP igual ao ponto focal ou View-Up paralelo a N")
+    
+    n = n / n_norma
+    u = u / u_norma
+    v = np.cross(n, u)
+    
+    return u, v, n
+
+
+def cria_matrizes_visualizacao(vrps: np.ndarray, focos: np.ndarray,
+                               view_up=(0.0, 1.0, 0.0),
+                               cu: float = 0.0, cv: float = 0.0,
+                               su: float = 1.0, sv: float = 1.0,
+                               dp: float = 1.0) -> np.ndarray:
+    """
+    Monta K matrizes M1 = D . C . B . A de uma vez (caminhos de câmera)
+    
+    Args:
+        vrps: Array (K, 3) com as posições das câmeras
+        focos: Array (K, 3) com os pontos focais
+        view_up: Vetor View-Up, (3,) ou (K, 3)
+        cu, cv, su, sv, dp: Parâmetros da janela (ver cria_matriz_janela)
+        
+    Returns:
+        Array (K, 4, 4)
+    """
+    vrps = np.atleast_2d(np.asarray(vrps, dtype=float))
+    focos = np.atleast_2d(np.asarray(focos, dtype=float))
+    u, v, n = bases_camera(vrps, focos, np.asarray(view_up, dtype=float))
+    
+    # B . A: linhas U, V, N e translação -B . VRP
+    BA = np.zeros((len(vrps), 4, 4))
+    BA[:, 0, :3] = u
+    BA[:, 1, :3] = v
+    BA[:, 2, :3] = n
+    BA[:, :3, 3] = -np.einsum('kij,kj->ki', BA[:, :3, :3], vrps)
+    BA[:, 3, 3] = 1.0
+    
+    return cria_matriz_janela(cu, cv, su, sv, dp) @ BA
+
+
+def _rotacao_eixo(eixo: np.ndarray, angulo: float) -> np.ndarray:
+    """Matriz 3x3 de rotação em torno de um eixo unitário (Rodrigues)"""
+    x, y, z = eixo
+    K = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return np.eye(3) + np.sin(angulo) * K + (1.0 - np.cos(angulo)) * (K @ K)
+
+
+class Camera:
+    """
+    Câmera definida por VRP, ponto focal P e View-Up
+    
+    Monta M1 = D . C . B . A, onde A leva o VRP para a origem, B muda para
+    a base (U, V, N) e D . C ajusta a janela (Cu, Cv, Su, Sv, DP). Objetos
+    visíveis ficam com Z negativo (usar usa_z_negativo=True no pipeline).
+    
+    orbita, aproxima e desloca corrigem a base atual em vez de recalculá-la;
+    a cada MAX_ATUALIZACOES correções a base é refeita do zero para não
+    acumular erro numérico.
+    """
+    
+    MAX_ATUALIZACOES = 64
+    
+    def __init__(self, vrp, p, view_up=(0.0, 1.0, 0.0),
+                 cu: float = 0.0, cv: float = 0.0,
+                 su: float = 1.0, sv: float = 1.0, dp: float = 1.0,
+                 near: float = 1.0, far: float = 10.0):
+        """
+        Args:
+            vrp: Posição da câmera (View Reference Point)
+            p: Ponto focal
+            view_up: Vetor que aponta para cima
+            cu, cv: Centro da janela
+            su, sv: Meia largura e meia altura da janela
+            dp: Distância do VRP ao plano de projeção
+            near: Distância do plano near
+            far: Distância do plano far
+        """
+        self.vrp = np.array(vrp, dtype=float)
+        self.p = np.array(p, dtype=float)
+        self.view_up = np.array(view_up, dtype=float)
+        self.cu, self.cv = cu, cv
+        self.su, self.sv = su, sv
+        self.dp = dp
+        self.near = near
+        self.far = far
+        
+        self.versao = 0
+        self._janela = cria_matriz_janela(cu, cv, su, sv, dp)
+        self._reconstroi()
+    
+    @property
+    def M1(self) -> np.ndarray:
+        """Matriz de visualização atual"""
+        return self._M1
+    
+    def _reconstroi(self):
+        """Recalcula a base a partir de VRP, P e View-Up"""
+        u, v, n = bases_camera(self.vrp[np.newaxis], self.p[np.newaxis], self.view_up)
+        self.u, self.v, self.n = u[0], v[0], n[0]
+        self._atualizacoes = 0
+        self._atualiza_matriz()
+    
+    def _atualiza_matriz(self):
+        """Monta B . A com a base atual e aplica a janela"""
+        BA = np.eye(4)
+        BA[0, :3] = self.u
+        BA[1, :3] = self.v
+        BA[2, :3] = self.n
+        BA[:3, 3] = -(BA[:3, :3] @ self.vrp)
+        
+        self._BA = BA
+        self._M1 = self._janela @ BA
+        self.versao += 1
+    
+    def _corrigida(self):
+        """Conta uma correção incremental e refaz a base se necessário"""
+        self._atualizacoes += 1
+        if self._atualizacoes >= self.MAX_ATUALIZACOES:
+            self._reconstroi()
+        else:
+            self._M1 = self._janela @ self._BA
+            self.versao += 1
+    
+    def posiciona(self, vrp=None, p=None, view_up=None):
+        """Troca VRP, ponto focal e/ou View-Up (recalcula a base)"""
+        if vrp is not None:
+            self.vrp = np.array(vrp, dtype=float)
+        if p is not None:
+            self.p = np.array(p, dtype=float)
+        if view_up is not None:
+            self.view_up = np.array(view_up, dtype=float)
+        self._reconstroi()
+    
+    def define_janela(self, cu: float, cv: float, su: float, sv: float, dp: float):
+        """Troca os parâmetros da janela sem mexer na base"""
+        self.cu, self.cv, self.su, self.sv, self.dp = cu, cv, su, sv, dp
+        self._janela = cria_matriz_janela(cu, cv, su, sv, dp)
+        self._M1 = self._janela @ self._BA
+        self.versao += 1
+    
+    def orbita(self, azimute: float, elevacao: float = 0.0):
+        """
+        Gira o VRP em torno do ponto focal
+        
+        Args:
+            azimute: Ângulo em radianos em torno do View-Up
+            elevacao: Ângulo em radianos em torno de U (positivo sobe)
+        """
+        eixo_up = self.view_up / np.linalg.norm(self.view_up)
+        R = _rotacao_eixo(self.u, -elevacao) if elevacao else np.eye(3)
+        R = _rotacao_eixo(eixo_up, azimute) @ R
+        
+        # A base gira junto com a câmera
+        self.vrp = self.p + R @ (self.vrp - self.p)
+        self.u, self.v, self.n = R @ self.u, R @ self.v, R @ self.n
+        
+        self._BA[0, :3] = self.u
+        self._BA[1, :3] = self.v
+        self._BA[2, :3] = self.n
+        self._BA[:3, 3] = -(self._BA[:3, :3] @ self.vrp)
+        self._corrigida()
+    
+    def aproxima(self, distancia: float):
+        """
+        Move o VRP ao longo de N em direção ao ponto focal (dolly)
+        
+        A base não muda; só a translação de M1 é corrigida.
+        
+        Args:
+            distancia: Deslocamento (negativo afasta)
+        """
+        self.vrp = self.vrp - distancia * self.n
+        self._BA[2, 3] += distancia
+        self._corrigida()
+    
+    def desloca(self, du: float, dv: float):
+        """
+        Move VRP e ponto focal no plano (U, V) (pan)
+        
+        Args:
+            du: Deslocamento ao longo de U
+            dv: Deslocamento ao longo de V
+        """
+        delta = du * self.u + dv * self.v
+        self.vrp = self.vrp + delta
+        self.p = self.p + delta
+        self._BA[0, 3] -= du
+        self._BA[1, 3] -= dv
+        self._corrigida()
+    
+    def configura(self, pipeline: 'PipelineGrafico'):
+        """Aplica near/far e M1 desta câmera em um pipeline"""
+        pipeline.define_projecao(self.near, self.far)
+        pipeline.define_camera(self._M1)
+
+
 # ============================================================================
 # MATRIZ DE PROJEÇÃO PERSPECTIVA (P)
 # ============================================================================
@@ -164,7 +683,29 @@ def cria_projecao_perspectiva_z_negativo(near: float, far: float) -> np.ndarray:
 # NORMALIZAÇÃO HOMOGÊNEA
 # ============================================================================
 
-def normaliza_homogenea(ponto: Ponto4D, epsilon: float = 1e-10) -> Ponto4D:
+# Tolerância histórica para |h| e denominadores em float64 (e no caminho
+# escalar, que usa floats do Python)
+EPSILON_FLOAT64 = 1e-10
+
+
+def epsilon_para(dtype) -> float:
+    """
+    Tolerância numérica adequada à precisão de um tipo de ponto flutuante
+    
+    Em float64 é EPSILON_FLOAT64. Em float32 o arredondamento de
+    coordenadas da ordem de 1 já é ~1e-7, então valores menores que
+    100 épsilons de máquina (~1.2e-5) são tratados como zero.
+    
+    Args:
+        dtype: Tipo de ponto flutuante NumPy
+        
+    Returns:
+        Tolerância para comparações com zero
+    """
+    return max(EPSILON_FLOAT64, 100.0 * float(np.finfo(dtype).eps))
+
+
+def normaliza_homogenea(ponto: Ponto4D, epsilon: float = EPSILON_FLOAT64) -> Ponto4D:
     """
     Divide coordenadas homogêneas para obter NDC
     
@@ -192,6 +733,35 @@ def normaliza_homogenea(ponto: Ponto4D, epsilon: float = 1e-10) -> Ponto4D:
     )
 
 
+def normaliza_homogenea_lote(pontos: np.ndarray,
+                             epsilon: Optional[float] = None) -> np.ndarray:
+    """
+    Versão em lote de normaliza_homogenea
+    
+    Pontos com |h| < epsilon viram (0, 0, 0, 1), como no caso escalar,
+    mas sem imprimir aviso.
+    
+    Args:
+        pontos: Array (N, 4) em coordenadas homogêneas
+        epsilon: Tolerância para divisão por zero (None usa
+            epsilon_para(pontos.dtype))
+        
+    Returns:
+        Array (N, 4) em NDC com h = 1
+    """
+    if epsilon is None:
+        epsilon = epsilon_para(pontos.dtype)
+    h = pontos[:, 3]
+    h_pequeno = np.abs(h) < epsilon
+    h_seguro = np.where(h_pequeno, 1.0, h)
+    
+    ndc = pontos / h_seguro[:, np.newaxis]
+    ndc[h_pequeno] = 0.0
+    ndc[:, 3] = 1.0
+    
+    return ndc
+
+
 # ============================================================================
 # RECORTE 3D (CLIPPING)
 # ============================================================================
@@ -207,7 +777,16 @@ class CodigoRecorte(IntFlag):
     FAR = 32
 
 
-def calcula_codigo_regiao(ponto: Ponto4D, epsilon: float = 1e-10) -> CodigoRecorte:
+# Ordem em que recorta_linha_3d escolhe o plano de recorte
+_PLANOS_RECORTE = (
+    CodigoRecorte.LEFT, CodigoRecorte.RIGHT,
+    CodigoRecorte.BOTTOM, CodigoRecorte.TOP,
+    CodigoRecorte.NEAR, CodigoRecorte.FAR,
+)
+_TODOS_PLANOS = np.uint8(0b111111)
+
+
+def calcula_codigo_regiao(ponto: Ponto4D, epsilon: float = EPSILON_FLOAT64) -> CodigoRecorte:
     """
     Calcula código de região para ponto em coordenadas homogêneas
     
@@ -252,7 +831,45 @@ def calcula_codigo_regiao(ponto: Ponto4D, epsilon: float = 1e-10) -> CodigoRecor
     return codigo
 
 
-def ponto_visivel(ponto: Ponto4D, epsilon: float = 1e-10) -> bool:
+def calcula_codigos_regiao(pontos: np.ndarray, epsilon: Optional[float] = None) -> np.ndarray:
+    """
+    Versão em lote de calcula_codigo_regiao
+    
+    Os bits são os mesmos de CodigoRecorte, guardados em um array uint8
+    para permitir aceitar/rejeitar arestas inteiras com operações bit a bit.
+    
+    Args:
+        pontos: Array (N, 4) em coordenadas homogêneas
+        epsilon: Tolerância numérica (None usa epsilon_para(pontos.dtype))
+        
+    Returns:
+        Array (N,) uint8 com o código de região de cada ponto
+    """
+    if epsilon is None:
+        epsilon = epsilon_para(pontos.dtype)
+    x, y, z, h = pontos[:, 0], pontos[:, 1], pontos[:, 2], pontos[:, 3]
+    h_abs = np.abs(h)
+    
+    testes = (
+        (x < -h_abs, CodigoRecorte.LEFT),
+        (x > h_abs, CodigoRecorte.RIGHT),
+        (y < -h_abs, CodigoRecorte.BOTTOM),
+        (y > h_abs, CodigoRecorte.TOP),
+        ((z < 0) | (h < 0), CodigoRecorte.NEAR),
+        (z > h_abs, CodigoRecorte.FAR),
+    )
+    
+    codigos = np.zeros(len(pontos), dtype=np.uint8)
+    for fora, plano in testes:
+        codigos |= fora.astype(np.uint8) * np.uint8(plano)
+    
+    # Se h é muito pequeno, considerar fora de todos os planos
+    codigos[h_abs < epsilon] = _TODOS_PLANOS
+    
+    return codigos
+
+
+def ponto_visivel(ponto: Ponto4D, epsilon: float = EPSILON_FLOAT64) -> bool:
     """
     Verifica se ponto está dentro do volume de visualização
     
@@ -266,6 +883,20 @@ def ponto_visivel(ponto: Ponto4D, epsilon: float = 1e-10) -> bool:
     return calcula_codigo_regiao(ponto, epsilon) == CodigoRecorte.INSIDE
 
 
+def pontos_visiveis(pontos: np.ndarray, epsilon: Optional[float] = None) -> np.ndarray:
+    """
+    Versão em lote de ponto_visivel
+    
+    Args:
+        pontos: Array (N, 4) em coordenadas homogêneas (após projeção)
+        epsilon: Tolerância numérica (None usa epsilon_para(pontos.dtype))
+        
+    Returns:
+        Máscara booleana (N,) com True para pontos visíveis
+    """
+    return calcula_codigos_regiao(pontos, epsilon) == CodigoRecorte.INSIDE
+
+
 def interpola_pontos(p1: Ponto4D, p2: Ponto4D, t: float) -> Ponto4D:
     """
     Interpola linearmente entre dois pontos
@@ -287,7 +918,8 @@ def interpola_pontos(p1: Ponto4D, p2: Ponto4D, t: float) -> Ponto4D:
 
 
 def intersecao_com_plano(p1: Ponto4D, p2: Ponto4D, 
-                         plano: CodigoRecorte) -> Ponto4D:
+                         plano: CodigoRecorte,
+                         epsilon: float = EPSILON_FLOAT64) -> Ponto4D:
     """
     Encontra interseção de linha com plano em coordenadas homogêneas
     
@@ -295,12 +927,11 @@ def intersecao_com_plano(p1: Ponto4D, p2: Ponto4D,
         p1: Primeiro ponto
         p2: Segundo ponto
         plano: Plano de recorte
+        epsilon: Tolerância para divisão por zero
         
     Returns:
         Ponto de interseção
     """
-    epsilon = 1e-10
-    
     if plano == CodigoRecorte.LEFT:
         num = -(p1.x + p1.h)
         den = (p2.x + p2.h) - (p1.x + p1.h)
@@ -329,7 +960,9 @@ def intersecao_com_plano(p1: Ponto4D, p2: Ponto4D,
     t = num / den
     t = max(0.0, min(1.0, t))  # Clamp entre 0 e 1
     
-    return interpola_pontos(p1, p2, t)
+    p_inter = interpola_pontos(p1, p2, t).to_array()
+    _fixa_no_plano(p_inter, plano)
+    return Ponto4D(*p_inter)
 
 
 def recorta_linha_3d(p1: Ponto4D, p2: Ponto4D) -> Optional[Tuple[Ponto4D, Ponto4D]]:
@@ -386,75 +1019,637 @@ def recorta_linha_3d(p1: Ponto4D, p2: Ponto4D) -> Optional[Tuple[Ponto4D, Ponto4
     return None  # Não convergiu
 
 
-# ============================================================================
-# MAPEAMENTO SRT (SCALE, ROTATE, TRANSLATE) - MATRIZ M2
-# ============================================================================
+# Coordenada e múltiplo de h que definem cada plano (ex.: RIGHT é x = h)
+_COORDENADA_PLANO = {
+    CodigoRecorte.LEFT: (0, -1.0), CodigoRecorte.RIGHT: (0, 1.0),
+    CodigoRecorte.BOTTOM: (1, -1.0), CodigoRecorte.TOP: (1, 1.0),
+    CodigoRecorte.NEAR: (2, 0.0), CodigoRecorte.FAR: (2, 1.0),
+}
 
-def cria_matriz_srt(xmin: float, xmax: float, 
-                    ymin: float, ymax: float,
-                    zmin: float = 0.0, zmax: float = 1.0) -> np.ndarray:
+
+def _fixa_no_plano(pontos: np.ndarray, plano: CodigoRecorte):
     """
-    Cria matriz de mapeamento de NDC para coordenadas de tela
+    Põe pontos de interseção exatamente sobre o plano (no lugar)
     
-    NDC: x,y em [-1, 1] e z em [0, 1]
-    Tela: x em [xmin, xmax], y em [ymin, ymax], z em [zmin, zmax]
+    Sem isso o arredondamento pode deixar a interseção um ulp do lado de
+    fora; o código de região não muda e o recorte de linhas repete o
+    mesmo plano até esgotar as iterações, descartando uma aresta visível.
+    Em float32 isso acontece com frequência bem maior.
+    """
+    eixo, fator = _COORDENADA_PLANO[plano]
+    pontos[..., eixo] = fator * pontos[..., 3]
+
+
+def _distancia_plano(pontos: np.ndarray, plano: CodigoRecorte) -> np.ndarray:
+    """Distância assinada ao plano de recorte (>= 0 do lado de dentro)"""
+    x, y, z, h = pontos[..., 0], pontos[..., 1], pontos[..., 2], pontos[..., 3]
+    
+    if plano == CodigoRecorte.LEFT:
+        return x + h
+    if plano == CodigoRecorte.RIGHT:
+        return h - x
+    if plano == CodigoRecorte.BOTTOM:
+        return y + h
+    if plano == CodigoRecorte.TOP:
+        return h - y
+    if plano == CodigoRecorte.NEAR:
+        return z
+    if plano == CodigoRecorte.FAR:
+        return h - z
+    raise ValueError(f"Plano de recorte inválido: {plano!r}")
+
+
+def intersecao_com_plano_lote(p1: np.ndarray, p2: np.ndarray,
+                              plano: CodigoRecorte,
+                              epsilon: Optional[float] = None) -> np.ndarray:
+    """
+    Versão em lote de intersecao_com_plano para um único plano
     
     Args:
-        xmin, xmax: Limites X da tela
-        ymin, ymax: Limites Y da tela
-        zmin, zmax: Limites Z (profundidade)
+        p1: Array (M, 4) com os primeiros pontos
+        p2: Array (M, 4) com os segundos pontos
+        plano: Plano de recorte
+        epsilon: Tolerância para divisão por zero (None usa
+            epsilon_para(p1.dtype))
         
     Returns:
-        Matriz 4x4 de mapeamento SRT
+        Array (M, 4) com os pontos de interseção
     """
-    M2 = np.zeros((4, 4))
+    if plano not in _PLANOS_RECORTE:
+        return p1.copy()
+    if epsilon is None:
+        epsilon = epsilon_para(p1.dtype)
     
-    # Escala
-    M2[0, 0] = (xmax - xmin) / 2.0
-    M2[1, 1] = (ymax - ymin) / 2.0
-    M2[2, 2] = (zmax - zmin)
+    d1 = _distancia_plano(p1, plano)
+    d2 = _distancia_plano(p2, plano)
     
-    # Translação
-    M2[3, 0] = (xmax + xmin) / 2.0
-    M2[3, 1] = (ymax + ymin) / 2.0
-    M2[3, 2] = zmin
-    M2[3, 3] = 1.0
+    num = -d1
+    den = d2 - d1
     
-    return M2
+    # Evita divisão por zero
+    den_pequeno = np.abs(den) < epsilon
+    t = num / np.where(den_pequeno, 1.0, den)
+    t = np.clip(t, 0.0, 1.0)  # Clamp entre 0 e 1
+    
+    resultado = p1 + t[:, np.newaxis] * (p2 - p1)
+    _fixa_no_plano(resultado, plano)
+    resultado[den_pequeno] = p1[den_pequeno]
+    
+    return resultado
 
 
-def cria_matriz_srt_raster(xmin: float, xmax: float,
-                           ymin: float, ymax: float,
-                           zmin: float = 0.0, zmax: float = 1.0) -> np.ndarray:
+def recorta_linhas_3d(p1: np.ndarray, p2: np.ndarray,
+                      c1: Optional[np.ndarray] = None,
+                      c2: Optional[np.ndarray] = None,
+                      perfil: Optional['Perfil'] = None
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Matriz SRT para displays raster (Y invertido)
+    Versão em lote de recorta_linha_3d (Cohen-Sutherland)
     
-    Em displays raster, Y cresce para baixo
+    Cada iteração aceita ou rejeita trivialmente as arestas restantes com
+    operações bit a bit sobre os códigos e calcula interseções apenas para
+    as arestas que cruzam o volume, agrupadas por plano. A saída tem o
+    tipo de ponto flutuante de p1.
     
     Args:
-        xmin, xmax: Limites X da tela
-        ymin, ymax: Limites Y da tela
-        zmin, zmax: Limites Z (profundidade)
+        p1: Array (E, 4) com o primeiro ponto de cada aresta
+        p2: Array (E, 4) com o segundo ponto de cada aresta
+        c1: Códigos de região de p1 (calculados se None)
+        c2: Códigos de região de p2 (calculados se None)
+        perfil: Perfil que recebe os contadores de arestas aceitas,
+            rejeitadas e recortadas e o número de iterações
         
     Returns:
-        Matriz 4x4 de mapeamento SRT com Y invertido
+        Tupla (p1_recortado, p2_recortado, visivel). Linhas de arestas
+        invisíveis nos arrays de pontos não têm significado.
     """
-    M2 = np.zeros((4, 4))
+    MAX_ITERACOES = 10
     
-    # Escala (Y negativo para inverter)
-    M2[0, 0] = (xmax - xmin) / 2.0
+    n = len(p1)
+    saida1 = np.zeros((n, 4), dtype=p1.dtype)
+    saida2 = np.zeros((n, 4), dtype=p1.dtype)
+    visivel = np.zeros(n, dtype=bool)
+    
+    idx = np.arange(n)
+    c1 = calcula_codigos_regiao(p1) if c1 is None else c1
+    c2 = calcula_codigos_regiao(p2) if c2 is None else c2
+    
+    for iteracao in range(MAX_ITERACOES):
+        # Ambos dentro
+        aceitas = (c1 | c2) == CodigoRecorte.INSIDE
+        saida1[idx[aceitas]] = p1[aceitas]
+        saida2[idx[aceitas]] = p2[aceitas]
+        visivel[idx[aceitas]] = True
+        
+        # Descarta aceitas e as que estão fora do mesmo lado
+        cruzam = ~aceitas & ((c1 & c2) == 0)
+        idx, p1, p2, c1, c2 = idx[cruzam], p1[cruzam], p2[cruzam], c1[cruzam], c2[cruzam]
+        
+        if perfil is not None:
+            if iteracao == 0:
+                n_aceitas = int(np.count_nonzero(aceitas))
+                perfil.conta('arestas_aceitas', n_aceitas)
+                perfil.conta('arestas_rejeitadas', n - n_aceitas - len(idx))
+                perfil.conta('arestas_recortadas', len(idx))
+            if len(idx):
+                perfil.conta('iteracoes_recorte')
+        
+        if len(idx) == 0:
+            break
+        
+        # Escolhe ponto fora e o plano de menor bit, como na versão escalar
+        troca_p1 = c1 != CodigoRecorte.INSIDE
+        codigo_fora = np.where(troca_p1, c1, c2)
+        plano_bit = codigo_fora & (~codigo_fora + np.uint8(1))
+        
+        p_inter = np.empty_like(p1)
+        for plano in _PLANOS_RECORTE:
+            no_plano = plano_bit == plano
+            if no_plano.any():
+                p_inter[no_plano] = intersecao_com_plano_lote(
+                    p1[no_plano], p2[no_plano], plano)
+        
+        # Substitui ponto fora pela interseção
+        c_inter = calcula_codigos_regiao(p_inter)
+        p1 = np.where(troca_p1[:, np.newaxis], p_inter, p1)
+        p2 = np.where(troca_p1[:, np.newaxis], p2, p_inter)
+        c1 = np.where(troca_p1, c_inter, c1)
+        c2 = np.where(troca_p1, c2, c_inter)
+    
+    # Arestas que sobraram não convergiram
+    return saida1, saida2, visivel
+
+
+def _recorta_poligonos_plano(dados: np.ndarray, contagem: np.ndarray,
+                             plano: CodigoRecorte,
+                             epsilon: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Um passo de Sutherland-Hodgman contra um plano, para vários polígonos
+    
+    Args:
+        dados: Array (F, C, 4 + A) com (x, y, z, h) seguido dos atributos
+        contagem: Número de vértices válidos de cada polígono
+        plano: Plano de recorte
+        epsilon: Tolerância para divisão por zero
+        
+    Returns:
+        Tupla (dados, contagem) recortados
+    """
+    n_pol, capacidade, _ = dados.shape
+    slots = np.arange(capacidade)
+    valido = slots < contagem[:, np.newaxis]
+    proximo = (slots + 1) % np.maximum(contagem, 1)[:, np.newaxis]
+    
+    # Aresta S -> E de cada slot
+    inicio = dados
+    fim = np.take_along_axis(dados, proximo[..., np.newaxis], axis=1)
+    d_inicio = _distancia_plano(inicio, plano)
+    d_fim = np.take_along_axis(d_inicio, proximo, axis=1)
+    inicio_dentro = d_inicio >= 0
+    fim_dentro = d_fim >= 0
+    
+    # Mesma interseção de intersecao_com_plano, aplicada também aos atributos
+    den = d_fim - d_inicio
+    den_pequeno = np.abs(den) < epsilon
+    t = np.clip(-d_inicio / np.where(den_pequeno, 1.0, den), 0.0, 1.0)
+    t[den_pequeno] = 0.0
+    inter = inicio + t[..., np.newaxis] * (fim - inicio)
+    
+    # Cada aresta emite [interseção se cruza o plano] + [E se E dentro]
+    candidatos = np.stack([inter, fim], axis=2).reshape(n_pol, 2 * capacidade, -1)
+    emite = np.stack([valido & (inicio_dentro != fim_dentro),
+                      valido & fim_dentro], axis=2).reshape(n_pol, 2 * capacidade)
+    
+    nova_contagem = emite.sum(axis=1)
+    posicao = np.cumsum(emite, axis=1) - 1
+    
+    # Polígonos côncavos podem ganhar mais de um vértice por plano
+    nova_capacidade = max(capacidade, int(nova_contagem.max(initial=0)))
+    saida = np.zeros((n_pol, nova_capacidade, dados.shape[2]), dtype=dados.dtype)
+    
+    pol, k = np.nonzero(emite)
+    saida[pol, posicao[pol, k]] = candidatos[pol, k]
+    
+    return saida, nova_contagem
+
+
+def recorta_poligonos_3d(poligonos: np.ndarray,
+                         atributos: Optional[np.ndarray] = None,
+                         contagem: Optional[np.ndarray] = None,
+                         epsilon: Optional[float] = None
+                         ) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Recorta polígonos no volume de visualização usando Sutherland-Hodgman
+    
+    O recorte é feito em coordenadas homogêneas (x, y, z, h) contra os seis
+    planos de CodigoRecorte. Os atributos de vértice (cores de Gouraud,
+    normais de Phong, ...) são interpolados com o mesmo parâmetro t dos
+    pontos, como em interpola_pontos. Normais interpoladas não são
+    renormalizadas aqui.
+    
+    Polígonos com todos os vértices dentro do volume não passam pelo
+    recorte, e polígonos com todos os vértices fora do mesmo plano são
+    descartados sem calcular interseções. Polígonos float32 são
+    recortados em float32.
+    
+    Args:
+        poligonos: Array (F, K, 4) com os vértices de cada polígono
+        atributos: Array (F, K, A) opcional com atributos por vértice
+        contagem: Número de vértices válidos de cada polígono (padrão K)
+        epsilon: Tolerância numérica (None usa epsilon_para do tipo dos
+            polígonos)
+        
+    Returns:
+        Tupla (vertices, atributos, contagem, faces): vertices é
+        (F', C, 4) com C >= K, atributos é (F', C, A) ou None, contagem
+        é (F',) e faces é (F',) com o índice do polígono de entrada.
+        Polígonos que ficaram com menos de 3 vértices são descartados.
+    """
+    poligonos = como_ponto_flutuante(poligonos)
+    n_pol, n_vert, _ = poligonos.shape
+    if contagem is None:
+        contagem = np.full(n_pol, n_vert, dtype=np.intp)
+    if epsilon is None:
+        epsilon = epsilon_para(poligonos.dtype)
+    
+    dados = poligonos
+    if atributos is not None:
+        dados = np.concatenate(
+            [poligonos, np.asarray(atributos, dtype=poligonos.dtype)], axis=2)
+    
+    # Aceitação/rejeição trivial pelos códigos de região
+    valido = np.arange(n_vert) < contagem[:, np.newaxis]
+    codigos = calcula_codigos_regiao(poligonos.reshape(-1, 4), epsilon).reshape(n_pol, n_vert)
+    codigo_ou = np.bitwise_or.reduce(np.where(valido, codigos, 0), axis=1)
+    codigo_e = np.bitwise_and.reduce(np.where(valido, codigos, _TODOS_PLANOS), axis=1)
+    
+    dentro = codigo_ou == CodigoRecorte.INSIDE
+    cruzam = ~dentro & (codigo_e == 0)
+    
+    rec_dados = dados[cruzam]
+    rec_contagem = contagem[cruzam]
+    for plano in _PLANOS_RECORTE:
+        fora = (_distancia_plano(rec_dados, plano) < 0) & \
+               (np.arange(rec_dados.shape[1]) < rec_contagem[:, np.newaxis])
+        sel = fora.any(axis=1)
+        if not sel.any():
+            continue
+        
+        parcial, parcial_contagem = _recorta_poligonos_plano(
+            rec_dados[sel], rec_contagem[sel], plano, epsilon)
+        if parcial.shape[1] > rec_dados.shape[1]:
+            extra = parcial.shape[1] - rec_dados.shape[1]
+            rec_dados = np.pad(rec_dados, ((0, 0), (0, extra), (0, 0)))
+        rec_dados[sel] = 0.0
+        rec_dados[sel, :parcial.shape[1]] = parcial
+        rec_contagem[sel] = parcial_contagem
+    
+    # Monta a saída na ordem original
+    idx_cruzam = np.nonzero(cruzam)[0]
+    mantidos = rec_contagem >= 3
+    faces = np.sort(np.concatenate([np.nonzero(dentro)[0], idx_cruzam[mantidos]]))
+    
+    capacidade = max(n_vert, rec_dados.shape[1])
+    saida = np.zeros((len(faces), capacidade, dados.shape[2]), dtype=dados.dtype)
+    saida_contagem = np.zeros(len(faces), dtype=np.intp)
+    
+    pos_dentro = np.searchsorted(faces, np.nonzero(dentro)[0])
+    saida[pos_dentro, :n_vert] = dados[dentro]
+    saida_contagem[pos_dentro] = contagem[dentro]
+    
+    pos_cruzam = np.searchsorted(faces, idx_cruzam[mantidos])
+    saida[pos_cruzam, :rec_dados.shape[1]] = rec_dados[mantidos]
+    saida_contagem[pos_cruzam] = rec_contagem[mantidos]
+    
+    saida_atributos = saida[..., 4:] if atributos is not None else None
+    return saida[..., :4], saida_atributos, saida_contagem, faces
+
+
+# ============================================================================
+# VOLUMES ENVOLVENTES CONTRA O VOLUME DE VISÃO
+# ============================================================================
+
+class ClasseVolume(IntEnum):
+    """Posição de um volume envolvente em relação ao volume de visão"""
+    FORA = 0     # Nada a desenhar
+    CRUZA = 1    # Precisa de recorte
+    DENTRO = 2   # Pode pular o recorte
+
+
+# Funcionais dos planos de _distancia_plano em (x, y, z, h), na mesma ordem
+# de _PLANOS_RECORTE
+_FUNCIONAIS_PLANOS = np.array([
+    [1.0, 0.0, 0.0, 1.0],    # LEFT:   x + h
+    [-1.0, 0.0, 0.0, 1.0],   # RIGHT:  h - x
+    [0.0, 1.0, 0.0, 1.0],    # BOTTOM: y + h
+    [0.0, -1.0, 0.0, 1.0],   # TOP:    h - y
+    [0.0, 0.0, 1.0, 0.0],    # NEAR:   z
+    [0.0, 0.0, -1.0, 1.0],   # FAR:    h - z
+])
+
+
+def planos_volume_visao(matriz_recorte: np.ndarray) -> np.ndarray:
+    """
+    Planos de recorte levados para o sistema de origem de uma matriz
+    
+    Os seis planos de CodigoRecorte são funções lineares das coordenadas
+    homogêneas de recorte; compostos com a matriz (P . M1, por exemplo)
+    viram planos n . p + d no SRU. Testar um volume contra eles é o mesmo
+    que testá-lo em coordenadas de recorte.
+    
+    Args:
+        matriz_recorte: Matriz 4x4 que leva o sistema de origem ao recorte
+        
+    Returns:
+        Array (6, 4) com (nx, ny, nz, d) de normal unitária, positivo do
+        lado de dentro
+    """
+    planos = _FUNCIONAIS_PLANOS @ matriz_recorte
+    norma = np.linalg.norm(planos[:, :3], axis=1, keepdims=True)
+    return planos / np.where(norma > 0, norma, 1.0)
+
+
+def classifica_esferas(planos: np.ndarray, centros: np.ndarray,
+                       raios: np.ndarray) -> np.ndarray:
+    """
+    Classifica esferas contra os planos do volume de visão
+    
+    Args:
+        planos: Array (6, 4) de planos_volume_visao
+        centros: Array (K, 3)
+        raios: Array (K,)
+        
+    Returns:
+        Array (K,) com valores de ClasseVolume
+    """
+    distancias = np.asarray(centros) @ planos[:, :3].T + planos[:, 3]
+    raios = np.asarray(raios)[:, np.newaxis]
+    classes = np.full(len(distancias), ClasseVolume.CRUZA, dtype=np.int8)
+    classes[(distancias >= raios).all(axis=1)] = ClasseVolume.DENTRO
+    classes[(distancias < -raios).any(axis=1)] = ClasseVolume.FORA
+    return classes
+
+
+def classifica_caixas(planos: np.ndarray, minimos: np.ndarray,
+                      maximos: np.ndarray) -> np.ndarray:
+    """
+    Classifica caixas alinhadas aos eixos contra os planos do volume de visão
+    
+    Para cada plano, o canto mais à frente (na direção da normal) decide
+    se a caixa está toda fora e o canto mais atrás se está toda dentro.
+    
+    Args:
+        planos: Array (6, 4) de planos_volume_visao
+        minimos: Array (K, 3) com os cantos mínimos
+        maximos: Array (K, 3) com os cantos máximos
+        
+    Returns:
+        Array (K,) com valores de ClasseVolume
+    """
+    positivo = planos[:, :3] >= 0
+    minimos = np.asarray(minimos)[:, np.newaxis, :]
+    maximos = np.asarray(maximos)[:, np.newaxis, :]
+    frente = np.where(positivo, maximos, minimos)
+    tras = np.where(positivo, minimos, maximos)
+    
+    d_frente = np.einsum('kpi,pi->kp', frente, planos[:, :3]) + planos[:, 3]
+    d_tras = np.einsum('kpi,pi->kp', tras, planos[:, :3]) + planos[:, 3]
+    
+    classes = np.full(len(d_frente), ClasseVolume.CRUZA, dtype=np.int8)
+    classes[(d_tras >= 0).all(axis=1)] = ClasseVolume.DENTRO
+    classes[(d_frente < 0).any(axis=1)] = ClasseVolume.FORA
+    return classes
+
+
+def caixas_transformadas(minimo: np.ndarray, maximo: np.ndarray,
+                         matrizes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    AABBs de uma caixa levada por K matrizes afins (instâncias)
+    
+    Os 8 cantos são transformados por todas as matrizes de uma vez e a
+    nova caixa envolve os cantos transformados.
+    
+    Args:
+        minimo: Canto mínimo (3,) no sistema local
+        maximo: Canto máximo (3,) no sistema local
+        matrizes: Array (K, 4, 4) de matrizes afins (última linha 0 0 0 1)
+        
+    Returns:
+        Tupla (minimos, maximos) de arrays (K, 3)
+    """
+    cantos = np.array([[maximo[0] if i & 1 else minimo[0],
+                        maximo[1] if i & 2 else minimo[1],
+                        maximo[2] if i & 4 else minimo[2]] for i in range(8)])
+    transformados = cantos @ matrizes[:, :3, :3].transpose(0, 2, 1) + \
+        matrizes[:, np.newaxis, :3, 3]
+    return transformados.min(axis=1), transformados.max(axis=1)
+
+
+# ============================================================================
+# MAPEAMENTO SRT (SCALE, ROTATE, TRANSLATE) - MATRIZ M2
+# ============================================================================
+
+def cria_matriz_srt(xmin: float, xmax: float, 
+                    ymin: float, ymax: float,
+                    zmin: float = 0.0, zmax: float = 1.0) -> np.ndarray:
+    """
+    Cria matriz de mapeamento de NDC para coordenadas de tela
+    
+    NDC: x,y em [-1, 1] e z em [0, 1]
+    Tela: x em [xmin, xmax], y em [ymin, ymax], z em [zmin, zmax]
+    
+    Args:
+        xmin, xmax: Limites X da tela
+        ymin, ymax: Limites Y da tela
+        zmin, zmax: Limites Z (profundidade)
+        
+    Returns:
+        Matriz 4x4 de mapeamento SRT
+    """
+    M2 = np.zeros((4, 4))
+    
+    # Escala
+    M2[0, 0] = (xmax - xmin) / 2.0
+    M2[1, 1] = (ymax - ymin) / 2.0
+    M2[2, 2] = (zmax - zmin)
+    
+    # Translação (última coluna, pois os pontos são vetores coluna)
+    M2[0, 3] = (xmax + xmin) / 2.0
+    M2[1, 3] = (ymax + ymin) / 2.0
+    M2[2, 3] = zmin
+    M2[3, 3] = 1.0
+    
+    return M2
+
+
+def cria_matriz_srt_raster(xmin: float, xmax: float,
+                           ymin: float, ymax: float,
+                           zmin: float = 0.0, zmax: float = 1.0) -> np.ndarray:
+    """
+    Matriz SRT para displays raster (Y invertido)
+    
+    Em displays raster, Y cresce para baixo
+    
+    Args:
+        xmin, xmax: Limites X da tela
+        ymin, ymax: Limites Y da tela
+        zmin, zmax: Limites Z (profundidade)
+        
+    Returns:
+        Matriz 4x4 de mapeamento SRT com Y invertido
+    """
+    M2 = np.zeros((4, 4))
+    
+    # Escala (Y negativo para inverter)
+    M2[0, 0] = (xmax - xmin) / 2.0
     M2[1, 1] = -(ymax - ymin) / 2.0  # Invertido!
     M2[2, 2] = (zmax - zmin)
     
-    # Translação
-    M2[3, 0] = (xmax + xmin) / 2.0
-    M2[3, 1] = (ymax + ymin) / 2.0
-    M2[3, 2] = zmin
+    # Translação (última coluna, pois os pontos são vetores coluna)
+    M2[0, 3] = (xmax + xmin) / 2.0
+    M2[1, 3] = (ymax + ymin) / 2.0
+    M2[2, 3] = zmin
     M2[3, 3] = 1.0
     
     return M2
 
 
+# ============================================================================
+# INSTRUMENTAÇÃO (PERFIL POR ESTÁGIO)
+# ============================================================================
+
+class Perfil:
+    """
+    Tempos e contadores por estágio do pipeline
+    
+    Estágios: projecao, codigos (outcodes), recorte, divisao (cálculo de
+    1/h), viewport (escala e translação de M2) e rasterizacao.
+    
+    Contadores: vertices, arestas_aceitas, arestas_rejeitadas (trivialmente),
+    arestas_recortadas, iteracoes_recorte, h_zero (divisões com |h| ~ 0),
+    vertices_fora_janela (releituras no modo em fluxo), malhas_fora e
+    malhas_dentro (descartadas ou desenhadas sem recorte pelo volume
+    envolvente) e vertices_poupados_lod (vértices a menos pelos níveis de
+    detalhe).
+    
+    Níveis de detalhe: lod guarda, por objeto, o nível escolhido e o
+    limite de erro em pixels da última escolha.
+    """
+    
+    ESTAGIOS = ('projecao', 'codigos', 'recorte', 'divisao', 'viewport', 'rasterizacao')
+    CONTADORES = ('vertices', 'arestas_aceitas', 'arestas_rejeitadas',
+                  'arestas_recortadas', 'iteracoes_recorte', 'h_zero',
+                  'vertices_fora_janela', 'malhas_fora', 'malhas_dentro',
+                  'vertices_poupados_lod')
+    
+    ativo = True
+    
+    def __init__(self, callback: Optional[Callable[[str, float], None]] = None):
+        """
+        Args:
+            callback: Função chamada com (estágio, segundos) ao fim de cada
+                estágio cronometrado
+        """
+        self.callback = callback
+        self.zera()
+    
+    def zera(self):
+        """Zera tempos e contadores"""
+        self.tempos: Dict[str, float] = dict.fromkeys(self.ESTAGIOS, 0.0)
+        self.chamadas: Dict[str, int] = dict.fromkeys(self.ESTAGIOS, 0)
+        self.contadores: Dict[str, int] = dict.fromkeys(self.CONTADORES, 0)
+        self.lod: Dict[int, Tuple[int, float]] = {}
+    
+    @contextmanager
+    def estagio(self, nome: str):
+        """Cronometra o bloco 'with' e acumula no estágio"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.tempos[nome] += duracao
+            self.chamadas[nome] += 1
+            if self.callback is not None:
+                self.callback(nome, duracao)
+    
+    def conta(self, nome: str, quantidade: int = 1):
+        """Soma a um contador"""
+        self.contadores[nome] += int(quantidade)
+    
+    def registra_lod(self, objeto: int, nivel: int, erro_pixels: float):
+        """Guarda o nível de detalhe escolhido para um objeto e seu erro em pixels"""
+        self.lod[objeto] = (int(nivel), float(erro_pixels))
+    
+    def estatisticas(self) -> Dict[str, Dict]:
+        """Cópia dos tempos (segundos), chamadas, contadores e níveis de detalhe"""
+        return {
+            'tempos': dict(self.tempos),
+            'chamadas': dict(self.chamadas),
+            'contadores': dict(self.contadores),
+            'lod': dict(self.lod),
+        }
+
+
+class _PerfilDesligado(Perfil):
+    """Perfil que não mede nada: custo de uma chamada por estágio"""
+    
+    ativo = False
+    _nulo = nullcontext()
+    
+    def estagio(self, nome: str):
+        return self._nulo
+    
+    def conta(self, nome: str, quantidade: int = 1):
+        pass
+    
+    def registra_lod(self, objeto: int, nivel: int, erro_pixels: float):
+        pass
+
+
+PERFIL_DESLIGADO = _PerfilDesligado()
+
+
+# ============================================================================
+# PROCESSAMENTO EM FLUXO (STREAMING)
+# ============================================================================
+
+class JanelaVertices:
+    """
+    Cache circular dos últimos vértices projetados de um fluxo
+    
+    Guarda as coordenadas de recorte dos 'capacidade' vértices mais
+    recentes, endereçados pelo índice absoluto no fluxo. Arestas de um
+    bloco podem apontar para vértices de blocos anteriores enquanto eles
+    ainda estiverem na janela.
+    """
+    
+    def __init__(self, capacidade: int, dtype=np.float64):
+        self.capacidade = capacidade
+        self._dados = np.empty((capacidade, 4), dtype=dtype)
+        self.inicio = 0  # Primeiro índice absoluto ainda guardado
+        self.fim = 0     # Próximo índice absoluto
+    
+    def adiciona(self, pontos: np.ndarray):
+        """Acrescenta vértices (n, 4), descartando os mais antigos"""
+        n = len(pontos)
+        if n > self.capacidade:
+            pontos = pontos[-self.capacidade:]
+        primeiro = self.fim + n - len(pontos)
+        posicoes = (primeiro + np.arange(len(pontos))) % self.capacidade
+        self._dados[posicoes] = pontos
+        self.fim += n
+        self.inicio = max(self.inicio, self.fim - self.capacidade)
+    
+    def contem(self, indices: np.ndarray) -> np.ndarray:
+        """Máscara dos índices absolutos presentes na janela"""
+        return (indices >= self.inicio) & (indices < self.fim)
+    
+    def busca(self, indices: np.ndarray) -> np.ndarray:
+        """Coordenadas de recorte de índices presentes na janela"""
+        return self._dados[indices % self.capacidade]
+
+
 # ============================================================================
 # PIPELINE COMPLETO
 # ============================================================================
@@ -463,7 +1658,8 @@ class PipelineGrafico:
     
     def __init__(self, near: float, far: float, 
                  largura_tela: int, altura_tela: int,
-                 usa_z_negativo: bool = True):
+                 usa_z_negativo: bool = True,
+                 dtype=np.float64):
         """
         Args:
             near: Distância do plano near
@@ -471,23 +1667,316 @@ class PipelineGrafico:
             largura_tela: Largura da tela em pixels
             altura_tela: Altura da tela em pixels
             usa_z_negativo: True se Z negativo = frente da câmera
+            dtype: Tipo de ponto flutuante dos estágios em lote. Com
+                np.float32 vértices, coordenadas de recorte e de tela
+                ocupam metade da memória; as matrizes continuam sendo
+                compostas em float64 e só então convertidas.
+        """
+        self.dtype = np.dtype(dtype)
+        if not np.issubdtype(self.dtype, np.floating):
+            raise ValueError(f"dtype deve ser de ponto flutuante, recebido {self.dtype}")
+        self.epsilon = epsilon_para(self.dtype)
+        
+        # Versões incrementadas a cada mudança de M1, P e M2; as matrizes
+        # compostas só são refeitas quando alguma versão muda
+        self.versao_camera = 0
+        self.versao_projecao = 0
+        self.versao_viewport = 0
+        self._cache_recorte = None
+        self._cache_composta = None
+        self._cache_viewport = None
+        self._cache_planos = None
+        self.perfil: Perfil = PERFIL_DESLIGADO
+        
+        self._M1 = cria_matriz_identidade()
+        self.near = None
+        self.far = None
+        self.usa_z_negativo = None
+        self.largura = None
+        self.altura = None
+        
+        self.define_projecao(near, far, usa_z_negativo)
+        self.define_viewport(largura_tela, altura_tela)
+    
+    # ------------------------------------------------------------------
+    # Matrizes e cache
+    # ------------------------------------------------------------------
+    
+    @property
+    def M1(self) -> np.ndarray:
+        """Matriz de visualização (SRU -> câmera)"""
+        return self._M1
+    
+    @M1.setter
+    def M1(self, M1: np.ndarray):
+        self._M1 = np.array(M1, dtype=float)
+        self.versao_camera += 1
+    
+    @property
+    def P(self) -> np.ndarray:
+        """Matriz de projeção perspectiva"""
+        return self._P
+    
+    @P.setter
+    def P(self, P: np.ndarray):
+        self._P = np.array(P, dtype=float)
+        self.versao_projecao += 1
+    
+    @property
+    def M2(self) -> np.ndarray:
+        """Matriz de mapeamento NDC -> tela"""
+        return self._M2
+    
+    @M2.setter
+    def M2(self, M2: np.ndarray):
+        self._M2 = np.array(M2, dtype=float)
+        self.versao_viewport += 1
+    
+    def define_camera(self, M1: np.ndarray):
+        """
+        Troca a matriz de visualização M1
+        
+        Não invalida nada se a matriz for igual à atual.
+        """
+        if not np.array_equal(M1, self._M1):
+            self.M1 = M1
+    
+    def define_projecao(self, near: float, far: float,
+                        usa_z_negativo: Optional[bool] = None):
+        """
+        Troca os planos near/far (recria P e a faixa de Z de M2)
+        
+        Args:
+            near: Distância do plano near
+            far: Distância do plano far
+            usa_z_negativo: True se Z negativo = frente da câmera
+                (None mantém o atual)
+        """
+        if usa_z_negativo is None:
+            usa_z_negativo = self.usa_z_negativo
+        if (near, far, usa_z_negativo) == (self.near, self.far, self.usa_z_negativo):
+            return
+        
+        z_mudou = usa_z_negativo != self.usa_z_negativo
+        self.near = near
+        self.far = far
+        self.usa_z_negativo = usa_z_negativo
+        
+        if usa_z_negativo:
+            self.P = cria_projecao_perspectiva_z_negativo(near, far)
+        else:
+            self.P = cria_projecao_perspectiva(near, far)
+        
+        if z_mudou and self.largura is not None:
+            self._atualiza_M2()
+    
+    def define_viewport(self, largura_tela: int, altura_tela: int):
+        """
+        Troca o tamanho da tela (recria M2)
+        
+        Args:
+            largura_tela: Largura da tela em pixels
+            altura_tela: Altura da tela em pixels
+        """
+        if (largura_tela, altura_tela) == (self.largura, self.altura):
+            return
+        
+        self.largura = largura_tela
+        self.altura = altura_tela
+        self._atualiza_M2()
+    
+    def _atualiza_M2(self):
+        # Com Z negativo o z normalizado cresce em direção ao near; a faixa
+        # de profundidade é invertida para que menor z seja sempre mais
+        # próximo no Z-buffer
+        z_tela = (1, 0) if self.usa_z_negativo else (0, 1)
+        self.M2 = cria_matriz_srt_raster(
+            0, self.largura, 
+            0, self.altura,
+            *z_tela
+        )
+    
+    @property
+    def matriz_recorte(self) -> np.ndarray:
+        """
+        P . M1 em cache: leva o SRU direto para coordenadas de recorte
+        
+        Composta em float64 e convertida para o dtype do pipeline.
+        """
+        return self._recorte()[1]
+    
+    def _recorte(self) -> Tuple[np.ndarray, np.ndarray]:
+        """P . M1 em float64 e no dtype do pipeline"""
+        chave = (self.versao_camera, self.versao_projecao)
+        if self._cache_recorte is None or self._cache_recorte[0] != chave:
+            recorte = self._P @ self._M1
+            self._cache_recorte = (chave, (recorte, recorte.astype(self.dtype)))
+        return self._cache_recorte[1]
+    
+    @property
+    def matriz_composta(self) -> np.ndarray:
+        """
+        M2 . P . M1 em cache, no dtype do pipeline
+        
+        Serve para vértices que não precisam de recorte: após a divisão
+        por h (a quarta coordenada) já estão em coordenadas de tela.
+        """
+        chave = (self.versao_camera, self.versao_projecao, self.versao_viewport)
+        if self._cache_composta is None or self._cache_composta[0] != chave:
+            composta = self._M2 @ self._recorte()[0]
+            self._cache_composta = (chave, composta.astype(self.dtype))
+        return self._cache_composta[1]
+    
+    @property
+    def planos_visao(self) -> np.ndarray:
+        """Planos (6, 4) do volume de visão no SRU, em cache (ver planos_volume_visao)"""
+        chave = (self.versao_camera, self.versao_projecao)
+        if self._cache_planos is None or self._cache_planos[0] != chave:
+            self._cache_planos = (chave, planos_volume_visao(self._recorte()[0]))
+        return self._cache_planos[1]
+    
+    def _escala_deslocamento_tela(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Diagonal e translação de M2 para a divisão + viewport fundidas"""
+        if self._cache_viewport is None or self._cache_viewport[0] != self.versao_viewport:
+            escala = np.diag(self._M2)[:3].astype(self.dtype)
+            deslocamento = self._M2[:3, 3].astype(self.dtype)
+            self._cache_viewport = (self.versao_viewport, (escala, deslocamento))
+        return self._cache_viewport[1]
+    
+    # ------------------------------------------------------------------
+    # Instrumentação
+    # ------------------------------------------------------------------
+    
+    def habilita_perfil(self, callback: Optional[Callable[[str, float], None]] = None
+                        ) -> Perfil:
+        """
+        Passa a medir tempo e contadores de cada estágio
+        
+        Args:
+            callback: Função chamada com (estágio, segundos) a cada estágio
+            
+        Returns:
+            O Perfil novo (também em self.perfil)
+        """
+        self.perfil = Perfil(callback)
+        return self.perfil
+    
+    def desabilita_perfil(self):
+        """Volta ao perfil desligado (custo próximo de zero)"""
+        self.perfil = PERFIL_DESLIGADO
+    
+    def estatisticas(self) -> Dict[str, Dict]:
+        """Retrato dos tempos e contadores acumulados até agora"""
+        return self.perfil.estatisticas()
+    
+    # ------------------------------------------------------------------
+    # Estágios em lote
+    # ------------------------------------------------------------------
+    
+    def transforma_vertices(self, vertices: np.ndarray,
+                            M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Leva vértices do SRU para coordenadas de recorte com um único matmul
+        
+        Vértices em outro tipo são convertidos para o dtype do pipeline;
+        malhas criadas já nesse tipo evitam a cópia.
+        
+        Args:
+            vertices: Array (N, 3) no SRU
+            M1: Nova matriz de visualização (None mantém a atual)
+            
+        Returns:
+            Array (N, 4) em coordenadas homogêneas de recorte
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        self.perfil.conta('vertices', len(vertices))
+        with self.perfil.estagio('projecao'):
+            return multiplica_matriz_vertices(self.matriz_recorte,
+                                              np.asarray(vertices, dtype=self.dtype))
+    
+    def projeta_pontos(self, pontos: np.ndarray) -> np.ndarray:
+        """
+        Aplica a projeção perspectiva P em um lote de pontos
+        
+        Args:
+            pontos: Array (N, 4) em coordenadas de câmera (após M1)
+            
+        Returns:
+            Array (N, 4) em coordenadas homogêneas de recorte
+        """
+        self.perfil.conta('vertices', len(pontos))
+        with self.perfil.estagio('projecao'):
+            return multiplica_matriz_pontos(self.P.astype(self.dtype, copy=False),
+                                            np.asarray(pontos, dtype=self.dtype))
+    
+    def coordenadas_tela(self, pontos_proj: np.ndarray) -> np.ndarray:
+        """
+        Divisão homogênea seguida do mapeamento M2, sem arredondar
+        
+        Args:
+            pontos_proj: Array (N, 4) em coordenadas homogêneas de recorte
+            
+        Returns:
+            Array (N, 3) com (x, y, z) de tela em ponto flutuante
+        """
+        # Divisão por h e M2 (escala + translação) em um único passo
+        perfil = self.perfil
+        escala, deslocamento = self._escala_deslocamento_tela()
+        with perfil.estagio('divisao'):
+            h = pontos_proj[:, 3]
+            h_pequeno = np.abs(h) < self.epsilon
+            inv_h = 1.0 / np.where(h_pequeno, 1.0, h)
+            inv_h[h_pequeno] = 0.0
+        if perfil.ativo:
+            perfil.conta('h_zero', np.count_nonzero(h_pequeno))
+        
+        with perfil.estagio('viewport'):
+            return pontos_proj[:, :3] * (inv_h[:, np.newaxis] * escala) + deslocamento
+    
+    def mapeia_tela(self, pontos_proj: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Divisão homogênea seguida do mapeamento M2 para um lote de pontos
+        
+        Args:
+            pontos_proj: Array (N, 4) em coordenadas homogêneas de recorte
+            
+        Returns:
+            Tupla (xy, z): xy é (N, 2) int32 arredondado como em
+            processa_ponto e z é (N,) com a profundidade para o Z-buffer
+        """
+        p_tela = self.coordenadas_tela(pontos_proj)
+        
+        # int() trunca em direção a zero; astype faz o mesmo
+        xy = (p_tela[:, :2] + 0.5).astype(np.int32)
+        return xy, p_tela[:, 2]
+    
+    def processa_pontos(self, pontos: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aplica o pipeline em um lote de pontos
+        
+        Cada estágio é um único matmul sobre o array inteiro, sem criar
+        Ponto4D por vértice. O resultado é o mesmo de chamar
+        processa_ponto em cada linha.
+        
+        Args:
+            pontos: Array (N, 4) em coordenadas de câmera (após M1)
+            
+        Returns:
+            Tupla (xy, z, visivel): coordenadas de tela (N, 2) int32,
+            profundidade (N,) e máscara (N,) de pontos visíveis.
+            Entradas invisíveis de xy e z não têm significado.
         """
-        self.near = near
-        self.far = far
-        self.largura = largura_tela
-        self.altura = altura_tela
+        pontos = np.asarray(pontos, dtype=self.dtype)
+        if pontos.ndim != 2 or pontos.shape[1] != 4:
+            raise ValueError(f"Esperado array (N, 4), recebido {pontos.shape}")
         
-        # Cria matrizes
-        if usa_z_negativo:
-            self.P = cria_projecao_perspectiva_z_negativo(near, far)
-        else:
-            self.P = cria_projecao_perspectiva(near, far)
+        p_proj = self.projeta_pontos(pontos)
+        with self.perfil.estagio('codigos'):
+            visivel = pontos_visiveis(p_proj)
+        xy, z = self.mapeia_tela(p_proj)
         
-        self.M2 = cria_matriz_srt_raster(
-            0, largura_tela, 
-            0, altura_tela,
-            0, 1
-        )
+        return xy, z, visivel
     
     def processa_ponto(self, p_camera: Ponto4D, 
                        verbose: bool = False) -> Optional[PontoTela]:
@@ -503,34 +1992,511 @@ class PipelineGrafico:
         """
         if verbose:
             print(f"\n--- Pipeline para {p_camera} ---")
+            print(f"  Após projeção: {multiplica_matriz_ponto(self.P, p_camera)}")
         
-        # 1. Projeção perspectiva
-        p_proj = multiplica_matriz_ponto(self.P, p_camera)
-        if verbose:
-            print(f"  Após projeção: {p_proj}")
+        xy, z, visivel = self.processa_pontos(p_camera.to_array()[np.newaxis, :])
         
-        # 2. Verificar visibilidade
-        if not ponto_visivel(p_proj):
+        if not visivel[0]:
             if verbose:
                 print("  Ponto invisível!")
             return None
         
-        # 3. Normalização homogênea
-        p_ndc = normaliza_homogenea(p_proj)
+        resultado = PontoTela(int(xy[0, 0]), int(xy[0, 1]), float(z[0]))
         if verbose:
-            print(f"  NDC: {p_ndc}")
+            print(f"  Tela: {resultado}")
         
-        # 4. Mapeamento para tela
-        p_tela_temp = multiplica_matriz_ponto(self.M2, p_ndc)
-        if verbose:
-            print(f"  Tela: {p_tela_temp}")
+        return resultado
+    
+    def processa_arestas(self, vertices_cam: np.ndarray,
+                         arestas: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Processa um lote de arestas indexadas
         
-        # 5. Converte para inteiros
-        return PontoTela(
-            int(p_tela_temp.x + 0.5),
-            int(p_tela_temp.y + 0.5),
-            p_tela_temp.z
-        )
+        Cada vértice é projetado e recebe seu código de região uma única
+        vez, mesmo que seja compartilhado por várias arestas.
+        
+        Args:
+            vertices_cam: Array (N, 4) de vértices em coord. câmera
+            arestas: Array (E, 2) de índices nos vértices
+            
+        Returns:
+            Tupla (xy, z, visivel): xy é (E, 2, 2) int32 com as duas
+            extremidades de cada aresta na tela, z é (E, 2) e visivel é
+            a máscara (E,) de arestas que sobreviveram ao recorte
+        """
+        p_proj = self.projeta_pontos(vertices_cam)
+        return self.processa_arestas_recorte(p_proj, arestas)
+    
+    def processa_arestas_recorte(self, p_proj: np.ndarray,
+                                 arestas: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Como processa_arestas, mas com vértices já em coordenadas de recorte
+        
+        Args:
+            p_proj: Array (N, 4) em coordenadas homogêneas de recorte
+            arestas: Array (E, 2) de índices nos vértices
+            
+        Returns:
+            Mesmo retorno de processa_arestas
+        """
+        arestas = np.asarray(arestas, dtype=np.intp).reshape(-1, 2)
+        n_arestas = len(arestas)
+        
+        perfil = self.perfil
+        
+        # Códigos uma vez por vértice
+        with perfil.estagio('codigos'):
+            codigos = calcula_codigos_regiao(p_proj)
+        
+        i1, i2 = arestas[:, 0], arestas[:, 1]
+        
+        # Recorte 3D
+        with perfil.estagio('recorte'):
+            p1_rec, p2_rec, visivel = recorta_linhas_3d(
+                p_proj[i1], p_proj[i2], codigos[i1], codigos[i2],
+                perfil if perfil.ativo else None)
+        
+        # NDC e tela apenas para as arestas visíveis
+        xy = np.zeros((n_arestas, 2, 2), dtype=np.int32)
+        z = np.zeros((n_arestas, 2), dtype=p_proj.dtype)
+        n_vis = int(visivel.sum())
+        if n_vis:
+            xy_vis, z_vis = self.mapeia_tela(
+                np.concatenate([p1_rec[visivel], p2_rec[visivel]]))
+            xy[visivel, 0], xy[visivel, 1] = xy_vis[:n_vis], xy_vis[n_vis:]
+            z[visivel, 0], z[visivel, 1] = z_vis[:n_vis], z_vis[n_vis:]
+        
+        return xy, z, visivel
+    
+    def recorta_faces(self, vertices_cam: np.ndarray, faces: np.ndarray,
+                      atributos: Optional[np.ndarray] = None
+                      ) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray, np.ndarray]:
+        """
+        Projeta os vértices uma vez e recorta faces indexadas
+        
+        Args:
+            vertices_cam: Array (N, 4) de vértices em coord. câmera
+            faces: Array (F, K) de índices nos vértices
+            atributos: Array (N, A) opcional com atributos por vértice
+            
+        Returns:
+            Mesmo retorno de recorta_poligonos_3d, em coordenadas
+            homogêneas de recorte (antes da divisão por h)
+        """
+        faces = np.asarray(faces, dtype=np.intp)
+        p_proj = self.projeta_pontos(vertices_cam)
+        
+        atributos_faces = None
+        if atributos is not None:
+            atributos_faces = np.asarray(atributos, dtype=self.dtype)[faces]
+        
+        with self.perfil.estagio('recorte'):
+            return recorta_poligonos_3d(p_proj[faces], atributos_faces)
+    
+    def rasteriza_faces(self, rasterizador, vertices_cam: np.ndarray,
+                        faces: np.ndarray,
+                        cores: Optional[np.ndarray] = None,
+                        cores_vertices: Optional[np.ndarray] = None) -> int:
+        """
+        Recorta, mapeia para a tela e preenche faces indexadas
+        
+        Args:
+            rasterizador: Estágio de rasterização com Z-buffer
+                (fase3_rasterizacao.Rasterizador)
+            vertices_cam: Array (N, 4) de vértices em coord. câmera
+            faces: Array (F, K) de índices nos vértices
+            cores: Array (F, 3) com a cor de cada face (constante)
+            cores_vertices: Array (N, 3) com a cor de cada vértice
+                (Gouraud); recortada junto com os vértices
+            
+        Returns:
+            Número de pixels escritos
+        """
+        p_proj = self.projeta_pontos(vertices_cam)
+        return self._rasteriza_recorte(rasterizador, p_proj, faces, cores, cores_vertices)
+    
+    @property
+    def posicao_observador(self) -> np.ndarray:
+        """
+        Posição do observador no sistema em que M1 é aplicada
+        
+        É a imagem da origem da câmera por M1 inversa; fica em cache até a
+        câmera mudar.
+        """
+        chave = self.versao_camera
+        cache = getattr(self, '_cache_observador', None)
+        if cache is None or cache[0] != chave:
+            origem = np.linalg.solve(self._M1, np.array([0.0, 0.0, 0.0, 1.0]))
+            self._cache_observador = (chave, origem[:3] / origem[3])
+        return self._cache_observador[1]
+    
+    def raios_tela(self, centros: np.ndarray, raios: np.ndarray,
+                   M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Raio aproximado, em pixels, da projeção de K esferas
+        
+        Aproximação de primeira ordem: o raio é multiplicado pela maior
+        taxa de variação de x ou y de tela (após P, divisão e M2) por
+        unidade de comprimento no centro da esfera. Esferas que alcançam
+        o plano do observador (h <= 0 em algum ponto) recebem infinito.
+        
+        Args:
+            centros: Array (K, 3) no sistema em que M1 é aplicada
+            raios: Array (K,) de raios
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Returns:
+            Array (K,) de raios em pixels
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        recorte = self._recorte()[0]
+        centros = np.asarray(centros, dtype=float).reshape(-1, 3)
+        raios = np.asarray(raios, dtype=float).reshape(-1)
+        
+        p = centros @ recorte[:, :3].T + recorte[:, 3]
+        h = p[:, 3]
+        linha_h = recorte[3, :3]
+        longe = h > raios * np.linalg.norm(linha_h)
+        h = np.where(longe, h, 1.0)
+        
+        # d(x/h)/dp = (linha_x . h - x . linha_h) / h^2, idem para y
+        taxa = []
+        for eixo in (0, 1):
+            gradiente = (recorte[eixo, :3] * h[:, np.newaxis]
+                         - p[:, eixo:eixo + 1] * linha_h) / (h * h)[:, np.newaxis]
+            taxa.append(abs(self._M2[eixo, eixo]) * np.linalg.norm(gradiente, axis=1))
+        return np.where(longe, raios * np.maximum(*taxa), np.inf)
+    
+    def classifica_malha(self, malha: Malha, M1: Optional[np.ndarray] = None) -> ClasseVolume:
+        """
+        Posição da malha em relação ao volume de visão
+        
+        Testa primeiro a esfera envolvente e, se ela cruzar algum plano,
+        a AABB, que é mais justa. Uma malha sem vértices fica FORA.
+        
+        Args:
+            malha: Malha no SRU
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Returns:
+            FORA, CRUZA ou DENTRO
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        if malha.n_vertices == 0:
+            self.perfil.conta('malhas_fora')
+            return ClasseVolume.FORA
+        planos = self.planos_visao
+        centro, raio = malha.esfera_envolvente()
+        classe = classifica_esferas(planos, centro[np.newaxis], np.array([raio]))[0]
+        if classe == ClasseVolume.CRUZA:
+            minimo, maximo = malha.caixa_envolvente()
+            classe = classifica_caixas(planos, minimo[np.newaxis], maximo[np.newaxis])[0]
+        
+        classe = ClasseVolume(classe)
+        if classe == ClasseVolume.FORA:
+            self.perfil.conta('malhas_fora')
+        elif classe == ClasseVolume.DENTRO:
+            self.perfil.conta('malhas_dentro')
+        return classe
+    
+    def classifica_instancias(self, malha: Malha, modelos: np.ndarray,
+                              M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Posição de K instâncias de uma malha em relação ao volume de visão
+        
+        A AABB local da malha é levada por cada matriz de modelo e todas as
+        caixas são testadas em lote.
+        
+        Args:
+            malha: Malha no seu sistema local
+            modelos: Array (K, 4, 4) de matrizes de modelo afins
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Returns:
+            Array (K,) com valores de ClasseVolume
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        minimo, maximo = malha.caixa_envolvente()
+        classes = classifica_caixas(self.planos_visao,
+                                    *caixas_transformadas(minimo, maximo, modelos))
+        if self.perfil.ativo:
+            self.perfil.conta('malhas_fora', np.count_nonzero(classes == ClasseVolume.FORA))
+            self.perfil.conta('malhas_dentro', np.count_nonzero(classes == ClasseVolume.DENTRO))
+        return classes
+    
+    def _vertices_instancias(self, malha: Malha, modelos: np.ndarray,
+                             matriz: np.ndarray) -> np.ndarray:
+        """
+        Vértices de todas as instâncias por uma matriz (P . M1 ou M2 . P . M1)
+        
+        As K matrizes matriz . modelo são compostas em float64 e aplicadas
+        aos vértices com um único matmul em pilha.
+        
+        Returns:
+            Array (K, N, 4) no dtype do pipeline
+        """
+        compostas = (matriz @ modelos).astype(self.dtype)
+        vertices = np.asarray(malha.vertices, dtype=self.dtype)
+        self.perfil.conta('vertices', len(modelos) * len(vertices))
+        with self.perfil.estagio('projecao'):
+            return vertices @ compostas[:, :, :3].transpose(0, 2, 1) + \
+                compostas[:, np.newaxis, :, 3]
+    
+    def faces_frontais(self, malha: Malha, M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Back-face culling em lote
+        
+        Uma face é visível se n . observador - D > 0, com n e D
+        pré-calculados na malha: um único produto escalar por face.
+        
+        Args:
+            malha: Malha com faces orientadas no sentido anti-horário
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Returns:
+            Máscara (F,) de faces voltadas para o observador
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        return malha.normais_faces() @ self.posicao_observador - malha.planos_faces() > 0
+    
+    def rasteriza_malha(self, rasterizador, malha: Malha,
+                        M1: Optional[np.ndarray] = None,
+                        cores: Optional[np.ndarray] = None,
+                        cores_vertices: Optional[np.ndarray] = None,
+                        culling: bool = True,
+                        sombreador=None,
+                        classe: Optional[ClasseVolume] = None) -> int:
+        """
+        Culling, recorte, mapeamento para a tela e preenchimento de uma malha
+        
+        Malhas cujo volume envolvente está fora do volume de visão são
+        descartadas sem projetar nenhum vértice; as que estão inteiramente
+        dentro pulam o recorte.
+        
+        Args:
+            rasterizador: Estágio de rasterização com Z-buffer
+            malha: Malha a desenhar
+            M1: Matriz de visualização (None usa a da câmera atual)
+            cores: Array (F, 3) com a cor de cada face
+            cores_vertices: Array (N, 3) com a cor de cada vértice; se
+                cores e cores_vertices forem None usa malha.cores
+            culling: Se True, descarta faces traseiras antes do recorte
+            sombreador: Se informado, cores_vertices são atributos quaisquer
+                (ex.: normal e posição), recortados junto com os vértices e
+                convertidos em cor por pixel (ver fase4_iluminacao)
+            classe: Classe do volume envolvente, se já conhecida (ex.: pela
+                BVH da cena); None calcula com classifica_malha
+            
+        Returns:
+            Número de pixels escritos
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        if classe is None:
+            classe = self.classifica_malha(malha)
+        if classe == ClasseVolume.FORA:
+            return 0
+        
+        p_proj = self.transforma_vertices(malha.vertices)
+        
+        if cores is None and cores_vertices is None:
+            cores_vertices = malha.cores
+        
+        faces = malha.faces
+        if culling:
+            frontais = self.faces_frontais(malha)
+            faces = faces[frontais]
+            if cores is not None:
+                cores = np.asarray(cores)[frontais]
+        
+        return self._rasteriza_recorte(rasterizador, p_proj, faces, cores,
+                                       cores_vertices, sombreador,
+                                       recorta=classe != ClasseVolume.DENTRO)
+    
+    def desenha_arestas(self, rasterizador, malha: Malha,
+                        M1: Optional[np.ndarray] = None,
+                        cor: Optional[np.ndarray] = None,
+                        ocultas: bool = True,
+                        vies: float = 1e-5,
+                        inclinacao: float = 1.0) -> int:
+        """
+        Desenha o aramado de uma malha, opcionalmente sem as linhas ocultas
+        
+        Com ocultas=True as faces frontais são rasterizadas antes só no
+        Z-buffer, afastadas proporcionalmente à sua inclinação, e as arestas
+        passam no teste de profundidade com uma tolerância vies; ficam
+        visíveis apenas as que não estão atrás de alguma face.
+        
+        Args:
+            rasterizador: Estágio de rasterização com Z-buffer
+            malha: Malha a desenhar
+            M1: Matriz de visualização (None usa a da câmera atual)
+            cor: Cor RGB (3,) comum ou (E, 3) por aresta; None usa branco
+            ocultas: Se True, remove as linhas ocultas
+            vies: Tolerância de profundidade (em z de tela) das arestas
+                contra as faces
+            inclinacao: Fator do deslocamento das faces por inclinação, em
+                pixels; cobre o arredondamento das extremidades e a
+                amostragem no centro do pixel
+            
+        Returns:
+            Número de pixels de aresta escritos
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        classe = self.classifica_malha(malha)
+        if classe == ClasseVolume.FORA:
+            return 0
+        
+        if ocultas and len(malha.faces):
+            p_proj = self.transforma_vertices(malha.vertices)
+            faces = malha.faces[self.faces_frontais(malha)]
+            self._rasteriza_recorte(rasterizador, p_proj, faces, None, None,
+                                    recorta=classe != ClasseVolume.DENTRO,
+                                    so_profundidade=True, deslocamento=inclinacao)
+        
+        xy, z, visivel = self.processa_malha(malha, classe=classe)
+        linhas = np.concatenate([xy, z[:, :, np.newaxis]], axis=2)[visivel]
+        if cor is not None and np.ndim(cor) == 2:
+            cor = np.asarray(cor)[visivel]
+        
+        with self.perfil.estagio('rasterizacao'):
+            return rasterizador.rasteriza_linhas(linhas, cor, vies=vies)
+    
+    def rasteriza_malha_adiada(self, gbuffer, malha: Malha, material: int = 0,
+                               M1: Optional[np.ndarray] = None,
+                               culling: bool = True) -> int:
+        """
+        Passada geométrica do modo adiado (deferred shading)
+
+        Grava no G-buffer, para a superfície mais próxima de cada pixel, a
+        normal interpolada, a posição (no sistema em que M1 é aplicada,
+        o mesmo da iluminação) e o índice do material. Nenhuma iluminação
+        é calculada aqui.
+
+        Args:
+            gbuffer: RasterizadorGBuffer (fase3_rasterizacao)
+            malha: Malha a desenhar
+            material: Índice do material na lista usada na iluminação
+            M1: Matriz de visualização (None usa a da câmera atual)
+            culling: Se True, descarta faces traseiras antes do recorte
+
+        Returns:
+            Número de pixels escritos (inclui sobreposição)
+        """
+        atributos = np.empty((malha.n_vertices, 7))
+        atributos[:, 0:3] = malha.normais_vertices()
+        atributos[:, 3:6] = malha.vertices
+        atributos[:, 6] = material
+        return self.rasteriza_malha(gbuffer, malha, M1, cores_vertices=atributos,
+                                    culling=culling)
+
+    def rasteriza_instancias(self, rasterizador, malha: Malha, modelos: np.ndarray,
+                             M1: Optional[np.ndarray] = None,
+                             cores: Optional[np.ndarray] = None,
+                             culling: bool = True) -> int:
+        """
+        Rasteriza K instâncias de uma malha em uma única chamada
+        
+        Instâncias fora do volume de visão são descartadas pela AABB; as
+        restantes são projetadas juntas, o back-face culling usa o
+        observador levado ao sistema local de cada instância e todas as
+        faces vão para um único recorte e uma única rasterização.
+        
+        Args:
+            rasterizador: Estágio de rasterização com Z-buffer
+            malha: Malha no seu sistema local (vértices guardados uma vez)
+            modelos: Array (K, 4, 4) de matrizes de modelo afins
+            M1: Matriz de visualização (None usa a da câmera atual)
+            cores: Array (K, 3) com a cor de cada instância; se None usa
+                malha.cores por vértice
+            culling: Se True, descarta faces traseiras
+            
+        Returns:
+            Número de pixels escritos
+        """
+        modelos = np.asarray(modelos, dtype=float).reshape(-1, 4, 4)
+        classes = self.classifica_instancias(malha, modelos, M1)
+        vivas = np.flatnonzero(classes != ClasseVolume.FORA)
+        if len(vivas) == 0:
+            return 0
+        
+        n = malha.n_vertices
+        p_proj = self._vertices_instancias(malha, modelos[vivas],
+                                           self._recorte()[0]).reshape(-1, 4)
+        faces = malha.faces[np.newaxis] + (np.arange(len(vivas)) * n)[:, np.newaxis, np.newaxis]
+        
+        if culling:
+            # Observador no sistema local de cada instância
+            observador = np.append(self.posicao_observador, 1.0)
+            locais = np.linalg.solve(modelos[vivas],
+                                     np.broadcast_to(observador, (len(vivas), 4))[..., np.newaxis])[..., 0]
+            locais = locais[:, :3] / locais[:, 3:]
+            frontais = locais @ malha.normais_faces().T - malha.planos_faces() > 0
+        else:
+            frontais = np.ones(faces.shape[:2], dtype=bool)
+        
+        cores_faces = cores_vertices = None
+        if cores is not None:
+            cores_faces = np.broadcast_to(np.asarray(cores, dtype=float)[vivas][:, np.newaxis],
+                                          faces.shape[:2] + (3,))[frontais]
+        elif malha.cores is not None:
+            cores_vertices = np.tile(malha.cores, (len(vivas), 1))
+        
+        return self._rasteriza_recorte(
+            rasterizador, p_proj, faces[frontais], cores_faces, cores_vertices,
+            recorta=bool(np.any(classes[vivas] == ClasseVolume.CRUZA)))
+    
+    def _rasteriza_recorte(self, rasterizador, p_proj: np.ndarray, faces: np.ndarray,
+                           cores: Optional[np.ndarray],
+                           cores_vertices: Optional[np.ndarray],
+                           sombreador=None, recorta: bool = True,
+                           **opcoes) -> int:
+        """
+        Recorta faces já em coordenadas de recorte e as rasteriza
+        
+        Com recorta=False (malha inteira dentro do volume de visão) cada
+        vértice é levado à tela uma única vez e as faces são usadas como
+        estão. Opções extras (ex.: so_profundidade) vão para
+        rasteriza_poligonos.
+        """
+        faces = np.asarray(faces, dtype=np.intp)
+        atributos = None
+        if cores_vertices is not None:
+            atributos = np.asarray(cores_vertices, dtype=self.dtype)[faces]
+        
+        if recorta:
+            with self.perfil.estagio('recorte'):
+                poligonos, atributos, contagem, idx_faces = recorta_poligonos_3d(
+                    p_proj[faces], atributos)
+            
+            valido = np.arange(poligonos.shape[1]) < contagem[:, np.newaxis]
+            tela = np.zeros(poligonos.shape[:2] + (3,), dtype=self.dtype)
+            tela[valido] = self.coordenadas_tela(poligonos[valido])
+        else:
+            tela = self.coordenadas_tela(p_proj)[faces]
+            contagem = np.full(len(faces), faces.shape[1])
+            idx_faces = np.arange(len(faces))
+        
+        if cores_vertices is not None:
+            cores_poligonos = atributos
+        elif cores is not None:
+            cores_poligonos = np.asarray(cores, dtype=float)[idx_faces]
+        else:
+            cores_poligonos = None
+        
+        # Só repassa o sombreador se houver, para aceitar rasterizadores
+        # sem ele
+        if sombreador is not None:
+            opcoes['sombreador'] = sombreador
+        
+        with self.perfil.estagio('rasterizacao'):
+            return rasterizador.rasteriza_poligonos(tela, contagem, cores_poligonos,
+                                                    **opcoes)
     
     def processa_linha(self, p1_cam: Ponto4D, p2_cam: Ponto4D,
                       verbose: bool = False) -> Optional[Tuple[PontoTela, PontoTela]]:
@@ -545,82 +2511,379 @@ class PipelineGrafico:
         Returns:
             Tupla (PontoTela1, PontoTela2) ou None se linha invisível
         """
-        # Projeção
-        p1_proj = multiplica_matriz_ponto(self.P, p1_cam)
-        p2_proj = multiplica_matriz_ponto(self.P, p2_cam)
+        xy, z, visivel = self.processa_arestas(
+            np.array([p1_cam.to_array(), p2_cam.to_array()]),
+            np.array([[0, 1]])
+        )
         
-        # Recorte 3D
-        resultado = recorta_linha_3d(p1_proj, p2_proj)
-        if resultado is None:
+        if not visivel[0]:
             if verbose:
                 print("Linha invisível (recortada)")
             return None
         
-        p1_rec, p2_rec = resultado
+        return _linha_tela(xy[0], z[0])
+    
+    def processa_malha(self, malha: Malha, M1: Optional[np.ndarray] = None,
+                       classe: Optional[ClasseVolume] = None
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Processa todas as arestas de uma malha em lote
         
-        # NDC
-        p1_ndc = normaliza_homogenea(p1_rec)
-        p2_ndc = normaliza_homogenea(p2_rec)
+        O volume envolvente decide o caminho: fora, nenhuma aresta é
+        projetada; dentro, os vértices vão direto para a tela com a
+        matriz composta M2 . P . M1, sem códigos de região nem recorte.
         
-        # Tela
-        p1_tela_temp = multiplica_matriz_ponto(self.M2, p1_ndc)
-        p2_tela_temp = multiplica_matriz_ponto(self.M2, p2_ndc)
+        Args:
+            malha: Malha indexada
+            M1: Matriz de visualização (None usa a da câmera atual)
+            classe: Classe do volume envolvente, se já conhecida
+            
+        Returns:
+            Mesmo retorno de processa_arestas, na ordem de malha.arestas
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        if classe is None:
+            classe = self.classifica_malha(malha)
         
-        pt1 = PontoTela(
-            int(p1_tela_temp.x + 0.5),
-            int(p1_tela_temp.y + 0.5),
-            p1_tela_temp.z
-        )
+        n_arestas = len(malha.arestas)
+        if classe == ClasseVolume.FORA:
+            return (np.zeros((n_arestas, 2, 2), dtype=np.int32),
+                    np.zeros((n_arestas, 2), dtype=self.dtype),
+                    np.zeros(n_arestas, dtype=bool))
         
-        pt2 = PontoTela(
-            int(p2_tela_temp.x + 0.5),
-            int(p2_tela_temp.y + 0.5),
-            p2_tela_temp.z
-        )
+        if classe == ClasseVolume.DENTRO:
+            return self._processa_arestas_sem_recorte(malha)
         
-        return (pt1, pt2)
+        p_proj = self.transforma_vertices(malha.vertices)
+        return self.processa_arestas_recorte(p_proj, malha.arestas)
+    
+    def _processa_arestas_sem_recorte(self, malha: Malha
+                                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Caminho rápido de processa_malha para malhas dentro do volume"""
+        self.perfil.conta('vertices', malha.n_vertices)
+        with self.perfil.estagio('projecao'):
+            p_tela = multiplica_matriz_vertices(
+                self.matriz_composta, np.asarray(malha.vertices, dtype=self.dtype))
+        with self.perfil.estagio('divisao'):
+            p_tela = p_tela[:, :3] / p_tela[:, 3:]
+        
+        xy = (p_tela[:, :2] + 0.5).astype(np.int32)
+        arestas = np.asarray(malha.arestas, dtype=np.intp)
+        self.perfil.conta('arestas_aceitas', len(arestas))
+        return xy[arestas], p_tela[arestas, 2], np.ones(len(arestas), dtype=bool)
+    
+    def processa_fluxo(self, blocos: Iterable[Tuple[Optional[np.ndarray], np.ndarray]],
+                       janela: int = 1 << 20,
+                       vertices_origem: Optional[np.ndarray] = None,
+                       M1: Optional[np.ndarray] = None
+                       ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Processa arestas bloco a bloco, com memória limitada
+        
+        Cada bloco traz vértices novos (numerados em sequência a partir
+        de 0 ao longo do fluxo) e arestas com índices absolutos. Os
+        vértices são projetados uma vez ao chegar e guardados em uma
+        JanelaVertices; arestas que apontam para vértices que já saíram
+        da janela (ou que ainda não chegaram) são resolvidas relendo
+        vertices_origem, por exemplo um np.memmap do arquivo.
+        
+        A câmera deve ficar fixa durante o fluxo: a janela guarda
+        coordenadas já projetadas.
+        
+        Args:
+            blocos: Iterável de (vertices (n, 3) no SRU ou None, arestas (e, 2))
+            janela: Número de vértices projetados mantidos em cache
+            vertices_origem: Array (N, 3) indexável com todos os vértices
+                (opcional; sem ele, índices fora da janela são erro)
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Yields:
+            Tupla (indices, xy, z) por bloco, apenas com as arestas
+            visíveis: índices absolutos das arestas no fluxo (Ev,),
+            xy (Ev, 2, 2) int32 e z (Ev, 2)
+        """
+        if M1 is not None:
+            self.define_camera(M1)
+        cache = JanelaVertices(janela, self.dtype)
+        n_arestas = 0
+        
+        for vertices, arestas in blocos:
+            if vertices is not None and len(vertices):
+                cache.adiciona(self.transforma_vertices(vertices))
+            
+            arestas = np.asarray(arestas, dtype=np.int64).reshape(-1, 2)
+            if len(arestas) == 0:
+                continue
+            
+            # Vértices distintos do bloco, reindexados de 0 a k - 1
+            usados, locais = np.unique(arestas, return_inverse=True)
+            p_proj = np.empty((len(usados), 4), dtype=self.dtype)
+            na_janela = cache.contem(usados)
+            p_proj[na_janela] = cache.busca(usados[na_janela])
+            
+            faltando = usados[~na_janela]
+            if len(faltando):
+                if vertices_origem is None:
+                    raise ValueError(
+                        f"{len(faltando)} vértices fora da janela de {janela} "
+                        f"(índices {faltando.min()}..{faltando.max()}); aumente "
+                        f"a janela ou informe vertices_origem")
+                self.perfil.conta('vertices_fora_janela', len(faltando))
+                p_proj[~na_janela] = self.transforma_vertices(vertices_origem[faltando])
+            
+            xy, z, visivel = self.processa_arestas_recorte(p_proj, locais.reshape(-1, 2))
+            indices = n_arestas + np.flatnonzero(visivel)
+            n_arestas += len(arestas)
+            yield indices, xy[visivel], z[visivel]
+    
+    def processa_instancias(self, malha: Malha, modelos: np.ndarray,
+                            M1: Optional[np.ndarray] = None,
+                            max_vertices: int = 1 << 20
+                            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Processa as arestas de K instâncias de uma malha em lote
+        
+        Equivale a chamar processa_malha com M1 . modelo para cada
+        instância, mas sem laço em Python por instância: as caixas são
+        classificadas juntas, as instâncias inteiramente dentro do volume
+        vão direto para a tela pela matriz composta e as que cruzam são
+        recortadas juntas, como uma única malha com K cópias das arestas.
+        
+        Args:
+            malha: Malha no seu sistema local
+            modelos: Array (K, 4, 4) de matrizes de modelo afins
+            M1: Matriz de visualização (None usa a da câmera atual)
+            max_vertices: Vértices transformados por passada (limita a
+                memória temporária)
+            
+        Returns:
+            Tupla (instancia, aresta, xy, z) só com as arestas visíveis,
+            ordenadas por instância e aresta: índice da instância (Ev,),
+            índice da aresta em malha.arestas (Ev,), xy (Ev, 2, 2) int32
+            e z (Ev, 2)
+        """
+        modelos = np.asarray(modelos, dtype=float).reshape(-1, 4, 4)
+        classes = self.classifica_instancias(malha, modelos, M1)
+        
+        arestas = np.asarray(malha.arestas, dtype=np.intp)
+        n, n_arestas = malha.n_vertices, len(arestas)
+        por_passada = max(1, max_vertices // max(n, 1))
+        recorte = self._recorte()[0]
+        composta = self._M2 @ recorte
+        
+        partes = []
+        for classe in (ClasseVolume.DENTRO, ClasseVolume.CRUZA):
+            selecionadas = np.flatnonzero(classes == classe)
+            for inicio in range(0, len(selecionadas), por_passada):
+                bloco = selecionadas[inicio:inicio + por_passada]
+                
+                if classe == ClasseVolume.DENTRO:
+                    p_tela = self._vertices_instancias(malha, modelos[bloco], composta)
+                    with self.perfil.estagio('divisao'):
+                        p_tela = p_tela[..., :3] / p_tela[..., 3:]
+                    xy = (p_tela[..., :2] + 0.5).astype(np.int32)[:, arestas]
+                    z = p_tela[..., 2][:, arestas]
+                    visivel = np.ones((len(bloco), n_arestas), dtype=bool)
+                    self.perfil.conta('arestas_aceitas', visivel.size)
+                else:
+                    p_proj = self._vertices_instancias(malha, modelos[bloco], recorte)
+                    deslocamento = (np.arange(len(bloco)) * n)[:, np.newaxis, np.newaxis]
+                    xy, z, visivel = self.processa_arestas_recorte(
+                        p_proj.reshape(-1, 4), (arestas + deslocamento).reshape(-1, 2))
+                    xy = xy.reshape(len(bloco), n_arestas, 2, 2)
+                    z = z.reshape(len(bloco), n_arestas, 2)
+                    visivel = visivel.reshape(len(bloco), n_arestas)
+                
+                instancia, aresta = np.nonzero(visivel)
+                partes.append((bloco[instancia], aresta, xy[visivel], z[visivel]))
+        
+        if not partes:
+            return (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp),
+                    np.zeros((0, 2, 2), dtype=np.int32), np.zeros((0, 2), dtype=self.dtype))
+        
+        instancia, aresta, xy, z = (np.concatenate(coluna) for coluna in zip(*partes))
+        ordem = np.lexsort((aresta, instancia))
+        return instancia[ordem], aresta[ordem], xy[ordem], z[ordem]
+    
+    def processa_segmentos(self, cubo: Union[Cubo, Malha],
+                           M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Arestas visíveis de um cubo ou malha como um único array estruturado
+        
+        Mesmo conteúdo de processa_cubo, na mesma ordem, mas em 24 bytes
+        por segmento em vez de dois PontoTela; o buffer pode ser exportado
+        com bytes_segmentos ou escreve_quadro sem reempacotar.
+        
+        Args:
+            cubo: Cubo ou Malha a processar
+            M1: Matriz de visualização (None usa a da câmera atual)
+            
+        Returns:
+            Array (Ev,) com dtype DTYPE_SEGMENTO
+        """
+        malha = cubo if isinstance(cubo, Malha) else Malha.de_cubo(cubo)
+        return segmentos_estruturados(*self.processa_malha(malha, M1))
     
-    def processa_cubo(self, cubo: Cubo, M1: np.ndarray,
+    def processa_cubo(self, cubo: Union[Cubo, Malha], M1: np.ndarray,
                      verbose: bool = False) -> List[Tuple[PontoTela, PontoTela]]:
         """
-        Processa todas as arestas de um cubo
+        Processa todas as arestas de um cubo ou de uma malha
         
         Args:
-            cubo: Cubo a processar
+            cubo: Cubo ou Malha a processar
             M1: Matriz de visualização (Fase 1)
             verbose: Se True, imprime informações
             
         Returns:
             Lista de linhas visíveis (tuplas de PontoTela)
         """
-        linhas_visiveis = []
+        malha = cubo if isinstance(cubo, Malha) else Malha.de_cubo(cubo)
+        xy, z, visivel = self.processa_malha(malha, M1)
         
-        # 1. Transforma todos vértices por M1
-        vertices_cam = []
-        for v in cubo.vertices:
-            v_cam = multiplica_matriz_ponto(M1, v)
-            vertices_cam.append(v_cam)
-        
-        # 2. Processa cada aresta
-        for i, (idx1, idx2) in enumerate(cubo.arestas):
+        linhas_visiveis = []
+        for i, (idx1, idx2) in enumerate(malha.arestas):
             if verbose:
                 print(f"\nAresta {i}: {idx1} -> {idx2}")
             
-            resultado = self.processa_linha(
-                vertices_cam[idx1],
-                vertices_cam[idx2],
-                verbose
-            )
-            
-            if resultado is not None:
-                linhas_visiveis.append(resultado)
+            if not visivel[i]:
                 if verbose:
-                    pt1, pt2 = resultado
-                    print(f"  Visível: {pt1} -> {pt2}")
+                    print("Linha invisível (recortada)")
+                continue
+            
+            pt1, pt2 = _linha_tela(xy[i], z[i])
+            linhas_visiveis.append((pt1, pt2))
+            if verbose:
+                print(f"  Visível: {pt1} -> {pt2}")
         
         return linhas_visiveis
 
 
+def _linha_tela(xy: np.ndarray, z: np.ndarray) -> Tuple[PontoTela, PontoTela]:
+    """Converte uma linha de processa_arestas em tupla de PontoTela"""
+    return (
+        PontoTela(int(xy[0, 0]), int(xy[0, 1]), float(z[0])),
+        PontoTela(int(xy[1, 0]), int(xy[1, 1]), float(z[1])),
+    )
+
+
+# ============================================================================
+# SAÍDA COMPACTA (ARRAY ESTRUTURADO E QUADROS BINÁRIOS)
+# ============================================================================
+
+# Um segmento de tela em 24 bytes little-endian; int32 e float32 têm o
+# mesmo tamanho, então o buffer pode ser lido com Int32Array e Float32Array
+# sobrepostos (6 palavras por segmento)
+DTYPE_SEGMENTO = np.dtype([
+    ('x0', '<i4'), ('y0', '<i4'), ('z0', '<f4'),
+    ('x1', '<i4'), ('y1', '<i4'), ('z1', '<f4'),
+])
+
+# Cabeçalho do quadro (24 bytes): mágico, versão, bytes por segmento,
+# número de segmentos, número do quadro, largura e altura da tela
+MAGICO_QUADRO = b'CGQD'
+VERSAO_QUADRO = 1
+_CABECALHO_QUADRO = struct.Struct('<4sHHIIII')
+
+
+def segmentos_estruturados(xy: np.ndarray, z: np.ndarray,
+                           visivel: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Empacota a saída de processa_arestas em um array estruturado
+    
+    Args:
+        xy: Array (E, 2, 2) int32 com as extremidades na tela
+        z: Array (E, 2) com as profundidades
+        visivel: Máscara (E,); se informada, só as arestas visíveis entram
+        
+    Returns:
+        Array (Ev,) com dtype DTYPE_SEGMENTO
+    """
+    if visivel is not None:
+        xy, z = xy[visivel], z[visivel]
+    
+    segmentos = np.empty(len(xy), dtype=DTYPE_SEGMENTO)
+    segmentos['x0'], segmentos['y0'] = xy[:, 0, 0], xy[:, 0, 1]
+    segmentos['x1'], segmentos['y1'] = xy[:, 1, 0], xy[:, 1, 1]
+    segmentos['z0'], segmentos['z1'] = z[:, 0], z[:, 1]
+    return segmentos
+
+
+def bytes_segmentos(segmentos: np.ndarray) -> memoryview:
+    """
+    Buffer do array de segmentos como memoryview de bytes, sem cópia
+    
+    Args:
+        segmentos: Array contíguo com dtype DTYPE_SEGMENTO
+        
+    Returns:
+        memoryview de len(segmentos) * 24 bytes
+    """
+    if segmentos.dtype != DTYPE_SEGMENTO or not segmentos.flags.c_contiguous:
+        raise ValueError("Esperado array contíguo com dtype DTYPE_SEGMENTO")
+    return segmentos.view(np.uint8).data
+
+
+def escreve_quadro(arquivo, segmentos: np.ndarray, numero: int = 0,
+                   largura: int = 0, altura: int = 0) -> int:
+    """
+    Escreve um quadro binário (cabeçalho + segmentos) em um arquivo
+    
+    Quadros podem ser concatenados no mesmo arquivo ou fluxo. O formato
+    é lido no navegador por readSegmentFrame (projCG.js).
+    
+    Args:
+        arquivo: Objeto binário com write (arquivo, BytesIO, socket...)
+        segmentos: Array com dtype DTYPE_SEGMENTO
+        numero: Número do quadro
+        largura: Largura da tela em pixels
+        altura: Altura da tela em pixels
+        
+    Returns:
+        Número de bytes escritos
+    """
+    segmentos = np.ascontiguousarray(segmentos, dtype=DTYPE_SEGMENTO)
+    cabecalho = _CABECALHO_QUADRO.pack(MAGICO_QUADRO, VERSAO_QUADRO,
+                                       DTYPE_SEGMENTO.itemsize, len(segmentos),
+                                       numero, largura, altura)
+    arquivo.write(cabecalho)
+    arquivo.write(bytes_segmentos(segmentos))
+    return len(cabecalho) + segmentos.nbytes
+
+
+def le_quadro(dados, deslocamento: int = 0) -> Tuple[Dict[str, int], np.ndarray, int]:
+    """
+    Lê um quadro de um buffer (bytes, mmap, memoryview) sem copiar
+    
+    Args:
+        dados: Buffer com um ou mais quadros
+        deslocamento: Posição do início do quadro
+        
+    Returns:
+        Tupla (cabecalho, segmentos, proximo): campos do cabeçalho, array
+        DTYPE_SEGMENTO que aponta para o buffer e posição do próximo quadro
+    """
+    magico, versao, tamanho, n, numero, largura, altura = \
+        _CABECALHO_QUADRO.unpack_from(dados, deslocamento)
+    if magico != MAGICO_QUADRO:
+        raise ValueError(f"Quadro inválido na posição {deslocamento}: {magico!r}")
+    if versao != VERSAO_QUADRO or tamanho != DTYPE_SEGMENTO.itemsize:
+        raise ValueError(f"Versão de quadro não suportada: {versao} ({tamanho} bytes)")
+    
+    inicio = deslocamento + _CABECALHO_QUADRO.size
+    segmentos = np.frombuffer(dados, dtype=DTYPE_SEGMENTO, count=n, offset=inicio)
+    cabecalho = {'numero': numero, 'largura': largura, 'altura': altura}
+    return cabecalho, segmentos, inicio + n * tamanho
+
+
+def le_quadros(dados) -> Iterator[Tuple[Dict[str, int], np.ndarray]]:
+    """Percorre todos os quadros concatenados em um buffer"""
+    posicao = 0
+    while posicao < len(dados):
+        cabecalho, segmentos, posicao = le_quadro(dados, posicao)
+        yield cabecalho, segmentos
+
+
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
@@ -631,11 +2894,11 @@ def cria_matriz_identidade() -> np.ndarray:
 
 
 def cria_matriz_translacao(tx: float, ty: float, tz: float) -> np.ndarray:
-    """Cria matriz de translação"""
+    """Cria matriz de translação (última coluna, pontos como vetores coluna)"""
     T = np.eye(4)
-    T[3, 0] = tx
-    T[3, 1] = ty
-    T[3, 2] = tz
+    T[0, 3] = tx
+    T[1, 3] = ty
+    T[2, 3] = tz
     return T
 
 
@@ -648,6 +2911,14 @@ def cria_matriz_escala(sx: float, sy: float, sz: float) -> np.ndarray:
     return S
 
 
+def cria_matriz_rotacao(eixo: Tuple[float, float, float], angulo: float) -> np.ndarray:
+    """Cria matriz de rotação de angulo radianos em torno de um eixo pela origem"""
+    eixo = np.asarray(eixo, dtype=float)
+    R = np.eye(4)
+    R[:3, :3] = _rotacao_eixo(eixo / np.linalg.norm(eixo), angulo)
+    return R
+
+
 # ============================================================================
 # EXEMPLO DE USO
 # ============================================================================
@@ -674,13 +2945,117 @@ if __name__ == "__main__":
         print(f"Esperado: próximo de ({largura//2}, {altura//2})")
     
     print("\n--- Teste 2: Cubo ---")
-    # Cria cubo centrado em (0, 0, -5)
-    cubo = Cubo.criar_cubo_unitario(centro=(0, 0, -5), tamanho=2)
+    # Cubo centrado na origem do SRU
+    cubo = Cubo.criar_cubo_unitario(centro=(0, 0, 0), tamanho=2)
     
-    # Matriz M1 simples (identidade - cubo já está em coord. câmera)
-    M1 = cria_matriz_identidade()
+    # Câmera a 5 unidades olhando para a origem
+    camera = Camera(vrp=(0, 0, 5), p=(0, 0, 0), view_up=(0, 1, 0),
+                    near=near, far=far)
+    M1 = camera.M1
     
     linhas = pipeline.processa_cubo(cubo, M1, verbose=False)
     print(f"\nTotal de arestas visíveis: {len(linhas)}")
     for i, (pt1, pt2) in enumerate(linhas):
         print(f"  Aresta {i}: {pt1} -> {pt2}")
+    
+    print("\n--- Teste 3: Perfil por estágio ---")
+    perfil = pipeline.habilita_perfil()
+    camera.aproxima(3.5)
+    camera.configura(pipeline)
+    pipeline.processa_cubo(cubo, camera.M1)
+    estatisticas = pipeline.estatisticas()
+    for estagio, segundos in estatisticas['tempos'].items():
+        print(f"  {estagio:>12}: {segundos * 1e6:8.1f} us")
+    print(f"  Contadores: {estatisticas['contadores']}")
+    pipeline.desabilita_perfil()
+    
+    print("\n--- Teste 4: Processamento em fluxo ---")
+    malha_cubo = Malha.de_cubo(cubo)
+    # Cada aresta vai no bloco em que seu último vértice chega
+    no_primeiro = malha_cubo.arestas.max(axis=1) < 4
+    blocos = [
+        (malha_cubo.vertices[:4], malha_cubo.arestas[no_primeiro]),
+        (malha_cubo.vertices[4:], malha_cubo.arestas[~no_primeiro]),
+    ]
+    visiveis = sum(len(indices) for indices, _, _ in
+                   pipeline.processa_fluxo(blocos, janela=8, M1=camera.M1))
+    print(f"Arestas visíveis em fluxo: {visiveis} (em lote: "
+          f"{int(pipeline.processa_malha(malha_cubo, camera.M1)[2].sum())})")
+    
+    print("\n--- Teste 5: Saída compacta ---")
+    import io
+    segmentos = pipeline.processa_segmentos(cubo, camera.M1)
+    iguais = all(
+        (s['x0'], s['y0'], s['x1'], s['y1']) == (p1.x, p1.y, p2.x, p2.y)
+        for s, (p1, p2) in zip(segmentos, pipeline.processa_cubo(cubo, camera.M1))
+    )
+    fluxo = io.BytesIO()
+    escrito = escreve_quadro(fluxo, segmentos, numero=1, largura=largura, altura=altura)
+    cabecalho, lidos, _ = le_quadro(fluxo.getbuffer())
+    print(f"{len(segmentos)} segmentos em {segmentos.nbytes} bytes "
+          f"(quadro de {escrito} bytes), iguais a processa_cubo: {iguais}")
+    print(f"Quadro lido: {cabecalho}, idêntico: {np.array_equal(lidos, segmentos)}")
+
+    print("\n--- Teste 6: Precisão float32 x float64 ---")
+    gerador = np.random.default_rng(0)
+    vertices = gerador.uniform(-3, 3, (50000, 3))
+    faces = gerador.integers(0, len(vertices), (20000, 3))
+    resultados = {}
+    for tipo in (np.float64, np.float32):
+        pipeline_tipo = PipelineGrafico(near, far, largura, altura, dtype=tipo)
+        camera.configura(pipeline_tipo)
+        malha = Malha(vertices.astype(tipo), faces)
+        resultados[tipo] = pipeline_tipo.processa_malha(malha)
+        print(f"{np.dtype(tipo).name}: vértices {malha.vertices.nbytes / 1e6:.1f} MB, "
+              f"coord. de recorte {pipeline_tipo.transforma_vertices(malha.vertices).nbytes / 1e6:.1f} MB")
+    xy64, z64, vis64 = resultados[np.float64]
+    xy32, z32, vis32 = resultados[np.float32]
+    ambos = vis64 & vis32
+    desvio_xy = int(np.abs(xy32[ambos] - xy64[ambos]).max())
+    desvio_z = float(np.abs(z32[ambos] - z64[ambos]).max())
+    diferentes = int((vis64 != vis32).sum())
+    print(f"Desvio máximo em tela: {desvio_xy} pixel(s), z: {desvio_z:.1e}")
+    print(f"Arestas com visibilidade diferente: {diferentes} de {len(vis64)}")
+    # float32 só pode mudar o arredondamento final dos pixels
+    assert desvio_xy <= 1, f"float32 desviou {desvio_xy} pixels"
+    assert desvio_z <= 1e-5, f"float32 desviou {desvio_z:.1e} em z"
+    assert diferentes == 0, f"{diferentes} arestas com visibilidade diferente em float32"
+    
+    print("\n--- Teste 7: Instanciamento ---")
+    pipeline.define_camera(camera.M1)
+    malha = Malha.de_cubo(Cubo.criar_cubo_unitario(centro=(0, 0, 0), tamanho=0.5))
+    grade = np.stack(np.meshgrid(np.arange(-20, 20), np.arange(-20, 20), indexing='ij'),
+                     axis=-1).reshape(-1, 2)
+    modelos = np.array([cria_matriz_translacao(x, 0.0, z) for x, z in grade])
+    inicio = time.perf_counter()
+    instancia, aresta, xy_inst, z_inst = pipeline.processa_instancias(malha, modelos)
+    tempo_lote = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    referencia = []
+    for k, modelo in enumerate(modelos):
+        xy_k, _, vis_k = pipeline.processa_malha(malha, camera.M1 @ modelo)
+        referencia.extend((k, e, *xy_k[e].ravel()) for e in np.flatnonzero(vis_k))
+    tempo_laco = time.perf_counter() - inicio
+    pipeline.define_camera(camera.M1)
+    referencia = np.array(referencia).reshape(-1, 6)
+    obtido = np.column_stack([instancia, aresta, xy_inst.reshape(-1, 4)])
+    classes = pipeline.classifica_instancias(malha, modelos)
+    print(f"{len(modelos)} instâncias: {np.count_nonzero(classes == ClasseVolume.FORA)} fora, "
+          f"{np.count_nonzero(classes == ClasseVolume.DENTRO)} dentro, "
+          f"{np.count_nonzero(classes == ClasseVolume.CRUZA)} cruzando")
+    print(f"Arestas visíveis: {len(obtido)} (laço: {len(referencia)}), "
+          f"iguais: {obtido.shape == referencia.shape and bool((obtido == referencia).all())}")
+    print(f"Lote: {tempo_lote * 1e3:.1f} ms, laço por instância: {tempo_laco * 1e3:.1f} ms")
+    
+    print("\n--- Teste 8: Malha vazia ---")
+    from fase3_rasterizacao import Rasterizador
+    vazia = Malha(np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+    classe = pipeline.classifica_malha(vazia)
+    xy, z, visivel = pipeline.processa_malha(vazia)
+    escritos = pipeline.rasteriza_malha(Rasterizador.para_pipeline(pipeline), vazia)
+    segmentos = pipeline.processa_segmentos(vazia)
+    print(f"Classe: {classe.name}, arestas: {len(xy)}, pixels: {escritos}, "
+          f"segmentos: {len(segmentos)}")
+    assert classe == ClasseVolume.FORA
+    assert xy.shape == (0, 2, 2) and z.shape == (0, 2) and visivel.shape == (0,)
+    assert escritos == 0 and len(segmentos) == 0
@@ -0,0 +1,874 @@
+"""
+1. Z-buffer e buffer de imagem (RGB)
+2. Rasterização de triângulos/polígonos com teste de profundidade
+3. Interpolação de cor (constante ou Gouraud) e de Z por pixel
+4. Renderização em tiles com vários processos e memória compartilhada
+5. G-buffer (normal, posição e material por pixel) para o modo adiado
+6. Rasterização de linhas (DDA) com teste de profundidade e linhas ocultas
+"""
+
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ============================================================================
+# RASTERIZAÇÃO COM Z-BUFFER
+# ============================================================================
+
+class Rasterizador:
+    """
+    Estágio de rasterização do pipeline
+
+    Mantém um Z-buffer float32 (menor z = mais próximo) e um buffer de
+    imagem RGB uint8 do tamanho da tela. Os triângulos são preenchidos por
+    blocos: todos os pixels das caixas envolventes de um grupo de
+    triângulos são testados de uma vez com arrays NumPy.
+    """
+
+    def __init__(self, largura: int, altura: int,
+                 cor_fundo: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+                 max_fragmentos: int = 1 << 22,
+                 zbuffer: Optional[np.ndarray] = None,
+                 imagem: Optional[np.ndarray] = None):
+        """
+        Args:
+            largura: Largura da tela em pixels
+            altura: Altura da tela em pixels
+            cor_fundo: Cor RGB de fundo, componentes em [0, 1]
+            max_fragmentos: Número máximo de pixels candidatos por bloco
+                (limita a memória temporária)
+            zbuffer: Z-buffer (altura, largura) float32 externo, por
+                exemplo em memória compartilhada. Não é limpo na criação.
+            imagem: Buffer de imagem (altura, largura, 3) uint8 externo
+        """
+        self.largura = largura
+        self.altura = altura
+        self.cor_fundo = cor_fundo
+        self.max_fragmentos = max_fragmentos
+
+        externos = zbuffer is not None and imagem is not None
+        if zbuffer is None:
+            zbuffer = np.empty((altura, largura), dtype=np.float32)
+        if imagem is None:
+            imagem = np.empty((altura, largura, 3), dtype=np.uint8)
+        self.zbuffer = zbuffer
+        self.imagem = imagem
+
+        # Estatísticas acumuladas
+        self.fragmentos = 0
+        self.pixels_escritos = 0
+        self.tempo = 0.0
+
+        if not externos:
+            self.limpa()
+
+    @classmethod
+    def para_pipeline(cls, pipeline, **kwargs) -> 'Rasterizador':
+        """Cria rasterizador com o tamanho de tela de um PipelineGrafico"""
+        return cls(pipeline.largura, pipeline.altura, **kwargs)
+
+    def limpa(self, regiao: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Preenche o Z-buffer com infinito e a imagem com a cor de fundo
+
+        Args:
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo a limpar; padrão
+                é a tela inteira
+        """
+        janela = _fatia(regiao)
+        self.zbuffer[janela] = np.inf
+        self.imagem[janela] = _para_uint8(np.asarray(self.cor_fundo, dtype=float))
+
+    @property
+    def pixels_por_segundo(self) -> float:
+        """Pixels candidatos testados por segundo de rasterização"""
+        if self.tempo == 0.0:
+            return 0.0
+        return self.fragmentos / self.tempo
+
+    def rasteriza_triangulos(self, tela: np.ndarray,
+                             cores: Optional[np.ndarray] = None,
+                             regiao: Optional[Tuple[int, int, int, int]] = None,
+                             sombreador: Optional[Callable] = None,
+                             so_profundidade: bool = False,
+                             deslocamento: float = 0.0) -> int:
+        """
+        Preenche triângulos com teste de profundidade
+
+        Os pixels são amostrados nas coordenadas inteiras. Em empates de
+        profundidade vale o primeiro triângulo da lista, como em um laço
+        sequencial com 'z < zbuffer'.
+
+        Args:
+            tela: Array (T, 3, 3) com (x, y, z) de tela de cada vértice
+            cores: Array (T, 3) com a cor de cada triângulo ou (T, 3, 3)
+                com a cor de cada vértice (Gouraud), componentes em [0, 1].
+                Se None, usa branco. Com sombreador, são atributos
+                quaisquer, (T, A) ou (T, 3, A).
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo que limita a
+                escrita (usado pelos tiles); padrão é a tela inteira
+            sombreador: Função que recebe os atributos interpolados (M, A)
+                dos pixels que passaram no Z-buffer e devolve cores (M, 3)
+            so_profundidade: Se True, atualiza só o Z-buffer (passada de
+                profundidade do modo de linhas ocultas)
+            deslocamento: Fator do deslocamento de profundidade por
+                inclinação: cada triângulo é afastado de deslocamento vezes
+                a maior variação de z por pixel (como glPolygonOffset)
+
+        Returns:
+            Número de pixels escritos
+        """
+        inicio = time.perf_counter()
+
+        tela = np.asarray(tela, dtype=float)
+        cores = _cores_por_vertice(cores, len(tela))
+        if regiao is None:
+            regiao = (0, self.largura - 1, 0, self.altura - 1)
+
+        x0, x1, y0, y1, area, validos = _caixas_envolventes(tela, regiao)
+
+        escritos = 0
+        for bloco in self._blocos(np.nonzero(validos)[0], x0, x1, y0, y1):
+            escritos += self._rasteriza_bloco(
+                tela[bloco], cores[bloco], area[bloco],
+                x0[bloco], x1[bloco], y0[bloco], y1[bloco], sombreador,
+                so_profundidade, deslocamento
+            )
+
+        self.pixels_escritos += escritos
+        self.tempo += time.perf_counter() - inicio
+        return escritos
+
+    def rasteriza_poligonos(self, tela: np.ndarray, contagem: np.ndarray,
+                            cores: Optional[np.ndarray] = None,
+                            sombreador: Optional[Callable] = None,
+                            so_profundidade: bool = False,
+                            deslocamento: float = 0.0) -> int:
+        """
+        Preenche polígonos convexos (saída do recorte) dividindo em leque
+
+        Args:
+            tela: Array (F, C, 3) com (x, y, z) de tela
+            contagem: Número de vértices válidos de cada polígono
+            cores: Array (F, A) por face ou (F, C, A) por vértice
+            sombreador: Ver rasteriza_triangulos
+            so_profundidade: Ver rasteriza_triangulos
+            deslocamento: Ver rasteriza_triangulos
+
+        Returns:
+            Número de pixels escritos
+        """
+        triangulos, cores_tri = triangula_leque(tela, contagem, cores)
+        return self.rasteriza_triangulos(triangulos, cores_tri, sombreador=sombreador,
+                                         so_profundidade=so_profundidade,
+                                         deslocamento=deslocamento)
+
+    def rasteriza_linhas(self, linhas: np.ndarray,
+                         cores: Optional[np.ndarray] = None,
+                         vies: float = 0.0,
+                         regiao: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        Desenha segmentos com DDA e teste de profundidade
+
+        Cada segmento é amostrado em max(|dx|, |dy|) + 1 pixels, com z
+        interpolado linearmente entre as extremidades (z de tela é afim no
+        espaço da tela). Todos os pixels de um bloco de segmentos são
+        gerados e testados de uma vez, como nos triângulos.
+
+        Args:
+            linhas: Array (E, 2, 3) com (x, y, z) de tela das extremidades
+            cores: Cor RGB (3,) comum ou (E, 3) por segmento, em [0, 1].
+                Se None, usa branco.
+            vies: Tolerância de profundidade; o pixel passa se
+                z - vies < zbuffer. No modo de linhas ocultas evita que
+                as arestas sejam escondidas pelas próprias faces.
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo que limita a
+                escrita (usado pelos tiles); padrão é a tela inteira
+
+        Returns:
+            Número de pixels escritos
+        """
+        inicio = time.perf_counter()
+
+        if regiao is None:
+            regiao = (0, self.largura - 1, 0, self.altura - 1)
+        linhas = np.asarray(linhas, dtype=float).reshape(-1, 2, 3)
+        if cores is None:
+            cores = (1.0, 1.0, 1.0)
+        cores = np.broadcast_to(np.asarray(cores, dtype=float), (len(linhas), 3))
+
+        delta = linhas[:, 1] - linhas[:, 0]
+        passos = np.ceil(np.abs(delta[:, :2]).max(axis=1)).astype(np.int64)
+        n_pixels = passos + 1
+
+        escritos = 0
+        for bloco in self._grupos(np.arange(len(linhas)), n_pixels):
+            escritos += self._rasteriza_linhas_bloco(
+                linhas[bloco], delta[bloco], passos[bloco], cores[bloco], vies, regiao
+            )
+
+        self.pixels_escritos += escritos
+        self.tempo += time.perf_counter() - inicio
+        return escritos
+
+    def _blocos(self, indices: np.ndarray, x0, x1, y0, y1):
+        """Agrupa triângulos consecutivos até max_fragmentos pixels"""
+        areas = (x1[indices] - x0[indices] + 1) * (y1[indices] - y0[indices] + 1)
+        return self._grupos(indices, areas)
+
+    def _grupos(self, indices: np.ndarray, tamanhos: np.ndarray):
+        """Agrupa primitivas consecutivas até max_fragmentos pixels"""
+        acumulado = np.cumsum(tamanhos)
+
+        inicio = 0
+        while inicio < len(indices):
+            base = acumulado[inicio - 1] if inicio else 0
+            fim = int(np.searchsorted(acumulado, base + self.max_fragmentos, side='right'))
+            fim = max(fim, inicio + 1)
+            yield indices[inicio:fim]
+            inicio = fim
+
+    def _rasteriza_bloco(self, tela, cores, area, x0, x1, y0, y1, sombreador,
+                         so_profundidade=False, deslocamento=0.0) -> int:
+        """Testa todos os pixels das caixas envolventes de um bloco"""
+        larguras = x1 - x0 + 1
+        n_pixels = larguras * (y1 - y0 + 1)
+
+        # Um fragmento candidato por pixel de cada caixa
+        tri = np.repeat(np.arange(len(tela)), n_pixels)
+        posicao = np.arange(tri.size) - np.repeat(np.cumsum(n_pixels) - n_pixels, n_pixels)
+        px = x0[tri] + posicao % larguras[tri]
+        py = y0[tri] + posicao // larguras[tri]
+        self.fragmentos += tri.size
+
+        # Coordenadas baricêntricas
+        v0, v1, v2 = tela[tri, 0], tela[tri, 1], tela[tri, 2]
+        b0 = _funcao_aresta(v1, v2, px, py) / area[tri]
+        b1 = _funcao_aresta(v2, v0, px, py) / area[tri]
+        b2 = 1.0 - b0 - b1
+        dentro = (b0 >= 0) & (b1 >= 0) & (b2 >= 0)
+
+        tri, px, py = tri[dentro], px[dentro], py[dentro]
+        b0, b1, b2 = b0[dentro], b1[dentro], b2[dentro]
+
+        z = b0 * tela[tri, 0, 2] + b1 * tela[tri, 1, 2] + b2 * tela[tri, 2, 2]
+        if deslocamento:
+            z = z + deslocamento * _inclinacao_profundidade(tela, area)[tri]
+        z = z.astype(np.float32)
+        pixel = py * self.largura + px
+
+        # Teste de profundidade contra o Z-buffer atual
+        zbuffer = self.zbuffer.reshape(-1)
+        passa = z < zbuffer[pixel]
+        tri, pixel, z = tri[passa], pixel[passa], z[passa]
+        b0, b1, b2 = b0[passa], b1[passa], b2[passa]
+        if pixel.size == 0:
+            return 0
+
+        # Mais próximo por pixel; lexsort é estável, então em empate fica o
+        # primeiro triângulo
+        ordem = np.lexsort((z, pixel))
+        primeiro = np.ones(ordem.size, dtype=bool)
+        primeiro[1:] = pixel[ordem[1:]] != pixel[ordem[:-1]]
+        vencedores = ordem[primeiro]
+
+        tri, pixel = tri[vencedores], pixel[vencedores]
+        if so_profundidade:
+            zbuffer[pixel] = z[vencedores]
+            return int(pixel.size)
+
+        b = np.stack([b0[vencedores], b1[vencedores], b2[vencedores]], axis=1)
+        cor = np.einsum('nk,nkc->nc', b, cores[tri])
+        if sombreador is not None:
+            cor = sombreador(cor)
+
+        zbuffer[pixel] = z[vencedores]
+        self._escreve(pixel, cor)
+
+        return int(pixel.size)
+
+    def _rasteriza_linhas_bloco(self, linhas, delta, passos, cores, vies, regiao) -> int:
+        """Gera e testa todos os pixels de um bloco de segmentos"""
+        n_pixels = passos + 1
+
+        # Um fragmento por passo do DDA de cada segmento
+        seg = np.repeat(np.arange(len(linhas)), n_pixels)
+        passo = np.arange(seg.size) - np.repeat(np.cumsum(n_pixels) - n_pixels, n_pixels)
+        self.fragmentos += seg.size
+
+        t = passo / np.maximum(passos, 1)[seg]
+        ponto = linhas[seg, 0] + t[:, np.newaxis] * delta[seg]
+        px = np.floor(ponto[:, 0] + 0.5).astype(np.int64)
+        py = np.floor(ponto[:, 1] + 0.5).astype(np.int64)
+        z = ponto[:, 2].astype(np.float32)
+
+        rx0, rx1, ry0, ry1 = regiao
+        na_tela = (px >= rx0) & (px <= rx1) & (py >= ry0) & (py <= ry1)
+        seg, z = seg[na_tela], z[na_tela]
+        pixel = py[na_tela] * self.largura + px[na_tela]
+
+        zbuffer = self.zbuffer.reshape(-1)
+        passa = z - vies < zbuffer[pixel]
+        seg, pixel, z = seg[passa], pixel[passa], z[passa]
+        if pixel.size == 0:
+            return 0
+
+        # Mais próximo por pixel, empate para o primeiro segmento
+        ordem = np.lexsort((z, pixel))
+        primeiro = np.ones(ordem.size, dtype=bool)
+        primeiro[1:] = pixel[ordem[1:]] != pixel[ordem[:-1]]
+        vencedores = ordem[primeiro]
+
+        pixel = pixel[vencedores]
+        # Com vies a linha pode passar um pouco atrás da face; o Z-buffer
+        # não recua
+        zbuffer[pixel] = np.minimum(zbuffer[pixel], z[vencedores])
+        self._escreve(pixel, cores[seg[vencedores]])
+
+        return int(pixel.size)
+
+    def _escreve(self, pixel: np.ndarray, cor: np.ndarray):
+        """Grava as cores (M, 3) dos pixels vencedores (índices lineares)"""
+        self.imagem.reshape(-1, 3)[pixel] = _para_uint8(cor)
+
+
+class RasterizadorGBuffer(Rasterizador):
+    """
+    Passada geométrica do modo adiado (deferred shading)
+
+    Em vez de cor, cada pixel guarda os atributos interpolados da
+    superfície visível: normal, posição e índice do material, em planos
+    (altura, largura). A iluminação é feita depois, uma única vez por
+    pixel visível, independente de quantas superfícies se sobrepõem.
+
+    Os atributos por vértice esperados são (nx, ny, nz, x, y, z, material).
+    """
+
+    def __init__(self, largura: int, altura: int,
+                 cor_fundo: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+                 max_fragmentos: int = 1 << 22):
+        """
+        Args:
+            largura: Largura da tela em pixels
+            altura: Altura da tela em pixels
+            cor_fundo: Cor RGB de fundo da imagem final
+            max_fragmentos: Número máximo de pixels candidatos por bloco
+        """
+        self.normal = np.empty((altura, largura, 3), dtype=np.float32)
+        self.posicao = np.empty((altura, largura, 3), dtype=np.float32)
+        self.material = np.empty((altura, largura), dtype=np.int16)
+        super().__init__(largura, altura, cor_fundo, max_fragmentos)
+
+    def limpa(self, regiao: Optional[Tuple[int, int, int, int]] = None):
+        """Limpa Z-buffer, imagem e planos; material -1 marca pixel vazio"""
+        super().limpa(regiao)
+        janela = _fatia(regiao)
+        self.normal[janela] = 0.0
+        self.posicao[janela] = 0.0
+        self.material[janela] = -1
+
+    def pixels_visiveis(self) -> np.ndarray:
+        """Índices lineares dos pixels cobertos por alguma superfície"""
+        return np.flatnonzero(self.material.reshape(-1) >= 0)
+
+    def _escreve(self, pixel: np.ndarray, atributos: np.ndarray):
+        self.normal.reshape(-1, 3)[pixel] = atributos[:, 0:3]
+        self.posicao.reshape(-1, 3)[pixel] = atributos[:, 3:6]
+        self.material.reshape(-1)[pixel] = np.rint(atributos[:, 6])
+
+
+# ============================================================================
+# RENDERIZAÇÃO EM TILES (MULTIPROCESSO)
+# ============================================================================
+
+# Segmentos de memória compartilhada já abertos em cada processo
+_memorias_abertas: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _abre_memoria(nome: str) -> shared_memory.SharedMemory:
+    """Abre (uma única vez por processo) um segmento compartilhado"""
+    shm = _memorias_abertas.get(nome)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=nome)
+        _memorias_abertas[nome] = shm
+    return shm
+
+
+def _rasteriza_tile(tarefa) -> Tuple[int, int]:
+    """
+    Executado nos processos trabalhadores: rasteriza um tile escrevendo
+    direto no Z-buffer e na imagem compartilhados
+
+    As primitivas chegam como linhas de um array float64 compartilhado:
+    triângulos com 9 coordenadas seguidas de 3 * A atributos, segmentos
+    com 6 coordenadas seguidas da cor.
+
+    Returns:
+        Tupla (pixels escritos, fragmentos testados)
+    """
+    (nome_z, nome_img, largura, altura, max_fragmentos,
+     nome_dados, forma, linhas, regiao, indices, opcoes) = tarefa
+
+    zbuffer = np.ndarray((altura, largura), dtype=np.float32,
+                         buffer=_abre_memoria(nome_z).buf)
+    imagem = np.ndarray((altura, largura, 3), dtype=np.uint8,
+                        buffer=_abre_memoria(nome_img).buf)
+
+    # Os dados das primitivas mudam a cada chamada; copia o tile e fecha
+    shm_dados = shared_memory.SharedMemory(name=nome_dados)
+    dados = np.ndarray(forma, dtype=np.float64, buffer=shm_dados.buf)
+    selecionados = dados[indices]
+    del dados
+    shm_dados.close()
+
+    rasterizador = Rasterizador(largura, altura, max_fragmentos=max_fragmentos,
+                                zbuffer=zbuffer, imagem=imagem)
+    if linhas:
+        escritos = rasterizador.rasteriza_linhas(
+            selecionados[:, :6].reshape(-1, 2, 3), selecionados[:, 6:9],
+            regiao=regiao, **opcoes)
+    else:
+        escritos = rasterizador.rasteriza_triangulos(
+            selecionados[:, :9].reshape(-1, 3, 3),
+            selecionados[:, 9:].reshape(len(selecionados), 3, -1),
+            regiao, **opcoes)
+    return escritos, rasterizador.fragmentos
+
+
+class RasterizadorTiles:
+    """
+    Rasterizador que divide a tela em tiles e os preenche em paralelo
+
+    O Z-buffer e a imagem ficam em multiprocessing.shared_memory; cada
+    processo do pool escreve direto no seu tile, então nenhum quadro é
+    serializado. Tem a mesma interface de Rasterizador (triângulos,
+    polígonos, passada só de profundidade e linhas) e pode ser passado
+    para PipelineGrafico.rasteriza_faces e desenha_arestas. O resultado é
+    idêntico, pixel a pixel, ao de um Rasterizador em um único processo.
+
+    Deve ser fechado com fecha() (ou usado em um bloco with) para liberar o
+    pool e a memória compartilhada.
+    """
+
+    def __init__(self, largura: int, altura: int,
+                 cor_fundo: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+                 tamanho_tile: int = 64,
+                 trabalhadores: Optional[int] = None,
+                 max_fragmentos: int = 1 << 20):
+        """
+        Args:
+            largura: Largura da tela em pixels
+            altura: Altura da tela em pixels
+            cor_fundo: Cor RGB de fundo, componentes em [0, 1]
+            tamanho_tile: Lado do tile em pixels
+            trabalhadores: Número de processos (padrão: os.cpu_count())
+            max_fragmentos: Pixels candidatos por bloco em cada processo
+        """
+        self.largura = largura
+        self.altura = altura
+        self.cor_fundo = cor_fundo
+        self.tamanho_tile = tamanho_tile
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.max_fragmentos = max_fragmentos
+
+        self._shm_z = shared_memory.SharedMemory(
+            create=True, size=largura * altura * 4)
+        self._shm_img = shared_memory.SharedMemory(
+            create=True, size=largura * altura * 3)
+        self.zbuffer = np.ndarray((altura, largura), dtype=np.float32,
+                                  buffer=self._shm_z.buf)
+        self.imagem = np.ndarray((altura, largura, 3), dtype=np.uint8,
+                                 buffer=self._shm_img.buf)
+
+        self._pool = ProcessPoolExecutor(max_workers=self.trabalhadores)
+
+        # Estatísticas acumuladas
+        self.fragmentos = 0
+        self.pixels_escritos = 0
+        self.tempo = 0.0
+
+        self.limpa()
+
+    @classmethod
+    def para_pipeline(cls, pipeline, **kwargs) -> 'RasterizadorTiles':
+        """Cria rasterizador com o tamanho de tela de um PipelineGrafico"""
+        return cls(pipeline.largura, pipeline.altura, **kwargs)
+
+    def limpa(self, regiao: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Preenche o Z-buffer com infinito e a imagem com a cor de fundo
+
+        Args:
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo a limpar; padrão
+                é a tela inteira
+        """
+        janela = _fatia(regiao)
+        self.zbuffer[janela] = np.inf
+        self.imagem[janela] = _para_uint8(np.asarray(self.cor_fundo, dtype=float))
+
+    @property
+    def pixels_por_segundo(self) -> float:
+        """Pixels candidatos testados por segundo (tempo de parede)"""
+        if self.tempo == 0.0:
+            return 0.0
+        return self.fragmentos / self.tempo
+
+    def rasteriza_triangulos(self, tela: np.ndarray,
+                             cores: Optional[np.ndarray] = None,
+                             regiao: Optional[Tuple[int, int, int, int]] = None,
+                             sombreador: Optional[Callable] = None,
+                             so_profundidade: bool = False,
+                             deslocamento: float = 0.0) -> int:
+        """
+        Distribui os triângulos pelos tiles e os preenche em paralelo
+
+        Args:
+            tela: Array (T, 3, 3) com (x, y, z) de tela de cada vértice
+            cores: Array (T, A) por triângulo ou (T, 3, A) por vértice
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo que limita a
+                escrita; só os tiles que o tocam são distribuídos
+            sombreador: Ver Rasterizador.rasteriza_triangulos; precisa
+                poder ser serializado (pickle) para os trabalhadores
+            so_profundidade: Ver Rasterizador.rasteriza_triangulos
+            deslocamento: Ver Rasterizador.rasteriza_triangulos
+
+        Returns:
+            Número de pixels escritos
+        """
+        inicio = time.perf_counter()
+
+        tela = np.asarray(tela, dtype=float)
+        n_tri = len(tela)
+        cores = _cores_por_vertice(cores, n_tri)
+        if regiao is None:
+            regiao = (0, self.largura - 1, 0, self.altura - 1)
+
+        x0, x1, y0, y1, _, validos = _caixas_envolventes(tela, regiao)
+        dados = np.concatenate([tela.reshape(n_tri, 9), cores.reshape(n_tri, -1)], axis=1)
+        escritos = self._executa_tiles(
+            dados, False, x0, x1, y0, y1, validos,
+            {'sombreador': sombreador, 'so_profundidade': so_profundidade,
+             'deslocamento': deslocamento}, regiao)
+
+        self.tempo += time.perf_counter() - inicio
+        return escritos
+
+    def rasteriza_poligonos(self, tela: np.ndarray, contagem: np.ndarray,
+                            cores: Optional[np.ndarray] = None,
+                            sombreador: Optional[Callable] = None,
+                            so_profundidade: bool = False,
+                            deslocamento: float = 0.0) -> int:
+        """
+        Preenche polígonos convexos (saída do recorte) dividindo em leque
+
+        Args:
+            tela: Array (F, C, 3) com (x, y, z) de tela
+            contagem: Número de vértices válidos de cada polígono
+            cores: Array (F, A) por face ou (F, C, A) por vértice
+            sombreador: Ver rasteriza_triangulos
+            so_profundidade: Ver rasteriza_triangulos
+            deslocamento: Ver rasteriza_triangulos
+
+        Returns:
+            Número de pixels escritos
+        """
+        triangulos, cores_tri = triangula_leque(tela, contagem, cores)
+        return self.rasteriza_triangulos(triangulos, cores_tri, sombreador=sombreador,
+                                         so_profundidade=so_profundidade,
+                                         deslocamento=deslocamento)
+
+    def rasteriza_linhas(self, linhas: np.ndarray,
+                         cores: Optional[np.ndarray] = None,
+                         vies: float = 0.0,
+                         regiao: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        Distribui os segmentos pelos tiles e os desenha em paralelo
+
+        Args:
+            linhas: Array (E, 2, 3) com (x, y, z) de tela das extremidades
+            cores: Cor RGB (3,) comum ou (E, 3) por segmento
+            vies: Ver Rasterizador.rasteriza_linhas
+            regiao: Retângulo (x0, x1, y0, y1) inclusivo que limita a
+                escrita; só os tiles que o tocam são distribuídos
+
+        Returns:
+            Número de pixels escritos
+        """
+        inicio = time.perf_counter()
+
+        linhas = np.asarray(linhas, dtype=float).reshape(-1, 2, 3)
+        if cores is None:
+            cores = (1.0, 1.0, 1.0)
+        cores = np.broadcast_to(np.asarray(cores, dtype=float), (len(linhas), 3))
+        if regiao is None:
+            regiao = (0, self.largura - 1, 0, self.altura - 1)
+        rx0, rx1, ry0, ry1 = regiao
+
+        # Caixa dos pixels amostrados pelo DDA (arredondamento de ponto + 0.5)
+        pixels = np.floor(linhas[:, :, :2] + 0.5).astype(np.int64)
+        x0 = np.maximum(pixels[:, :, 0].min(axis=1), rx0)
+        x1 = np.minimum(pixels[:, :, 0].max(axis=1), rx1)
+        y0 = np.maximum(pixels[:, :, 1].min(axis=1), ry0)
+        y1 = np.minimum(pixels[:, :, 1].max(axis=1), ry1)
+        validos = (x1 >= x0) & (y1 >= y0)
+
+        dados = np.concatenate([linhas.reshape(-1, 6), cores], axis=1)
+        escritos = self._executa_tiles(dados, True, x0, x1, y0, y1, validos,
+                                       {'vies': vies}, regiao)
+
+        self.tempo += time.perf_counter() - inicio
+        return escritos
+
+    def _executa_tiles(self, dados: np.ndarray, linhas: bool,
+                       x0, x1, y0, y1, validos, opcoes: Dict,
+                       regiao: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        Passa as primitivas aos trabalhadores, um tile por tarefa
+
+        Args:
+            dados: Array (P, C) float64 com uma primitiva por linha (ver
+                _rasteriza_tile)
+            linhas: True para segmentos, False para triângulos
+            x0, x1, y0, y1, validos: Caixas das primitivas na tela
+            opcoes: Argumentos repassados ao Rasterizador de cada tile
+            regiao: Retângulo que limita a escrita; cada tile é recortado
+                por ele
+
+        Returns:
+            Número de pixels escritos
+        """
+        tiles = self._distribui_tiles(x0, x1, y0, y1, validos)
+        if regiao is not None:
+            rx0, rx1, ry0, ry1 = regiao
+            tiles = [((max(tx0, rx0), min(tx1, rx1), max(ty0, ry0), min(ty1, ry1)), indices)
+                     for (tx0, tx1, ty0, ty1), indices in tiles]
+        if not tiles:
+            return 0
+
+        # Primitivas vão para os trabalhadores por memória compartilhada
+        shm_dados = shared_memory.SharedMemory(create=True, size=max(dados.nbytes, 1))
+        try:
+            compartilhado = np.ndarray(dados.shape, dtype=np.float64, buffer=shm_dados.buf)
+            compartilhado[:] = dados
+            del compartilhado
+
+            tarefas = [
+                (self._shm_z.name, self._shm_img.name, self.largura, self.altura,
+                 self.max_fragmentos, shm_dados.name, dados.shape, linhas,
+                 regiao, indices, opcoes)
+                for regiao, indices in tiles
+            ]
+            resultados = list(self._pool.map(_rasteriza_tile, tarefas))
+        finally:
+            shm_dados.close()
+            shm_dados.unlink()
+
+        escritos = sum(r[0] for r in resultados)
+        self.fragmentos += sum(r[1] for r in resultados)
+        self.pixels_escritos += escritos
+        return escritos
+
+    def _distribui_tiles(self, x0, x1, y0, y1, validos
+                         ) -> List[Tuple[Tuple[int, int, int, int], np.ndarray]]:
+        """
+        Associa cada primitiva aos tiles que sua caixa envolvente toca
+
+        Returns:
+            Lista de (região do tile, índices das primitivas em ordem)
+            apenas para tiles com alguma primitiva
+        """
+        t = self.tamanho_tile
+        tri = np.nonzero(validos)[0]
+        tx0, tx1 = x0[tri] // t, x1[tri] // t
+        ty0, ty1 = y0[tri] // t, y1[tri] // t
+        n_tiles_x = (self.largura + t - 1) // t
+
+        # Um par (triângulo, tile) para cada tile tocado
+        larguras = tx1 - tx0 + 1
+        n_pares = larguras * (ty1 - ty0 + 1)
+        par_tri = np.repeat(tri, n_pares)
+        deslocamento = np.arange(par_tri.size) - np.repeat(np.cumsum(n_pares) - n_pares, n_pares)
+        par_larg = np.repeat(larguras, n_pares)
+        par_tile = ((np.repeat(ty0, n_pares) + deslocamento // par_larg) * n_tiles_x +
+                    np.repeat(tx0, n_pares) + deslocamento % par_larg)
+
+        # Ordenação estável mantém a ordem dos triângulos dentro do tile
+        ordem = np.argsort(par_tile, kind='stable')
+        par_tile, par_tri = par_tile[ordem], par_tri[ordem]
+        ids, inicios = np.unique(par_tile, return_index=True)
+
+        tiles = []
+        for tile, indices in zip(ids, np.split(par_tri, inicios[1:])):
+            ty, tx = divmod(int(tile), n_tiles_x)
+            regiao = (tx * t, min((tx + 1) * t, self.largura) - 1,
+                      ty * t, min((ty + 1) * t, self.altura) - 1)
+            tiles.append((regiao, indices))
+        return tiles
+
+    def fecha(self):
+        """Encerra o pool e libera a memória compartilhada"""
+        if self._pool is None:
+            return
+        self._pool.shutdown()
+        self._pool = None
+
+        # Views precisam ser soltas antes de fechar os segmentos
+        self.zbuffer = self.zbuffer.copy()
+        self.imagem = self.imagem.copy()
+        for shm in (self._shm_z, self._shm_img):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self) -> 'RasterizadorTiles':
+        return self
+
+    def __exit__(self, *exc):
+        self.fecha()
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES
+# ============================================================================
+
+def _cores_por_vertice(cores: Optional[np.ndarray], n_tri: int) -> np.ndarray:
+    """Normaliza cores (atributos) por triângulo ou por vértice para (T, 3, A)"""
+    if cores is None:
+        return np.ones((n_tri, 3, 3))
+    cores = np.asarray(cores, dtype=float)
+    if cores.ndim == 2:
+        cores = np.repeat(cores[:, np.newaxis, :], 3, axis=1)
+    return cores
+
+
+def _fatia(regiao: Optional[Tuple[int, int, int, int]]) -> Tuple[slice, slice]:
+    """Fatias (linhas, colunas) de um retângulo (x0, x1, y0, y1) inclusivo"""
+    if regiao is None:
+        return slice(None), slice(None)
+    x0, x1, y0, y1 = regiao
+    return slice(y0, y1 + 1), slice(x0, x1 + 1)
+
+
+def _caixas_envolventes(tela: np.ndarray, regiao: Tuple[int, int, int, int]):
+    """
+    Caixas envolventes inteiras dos triângulos, limitadas a uma região
+
+    Returns:
+        Tupla (x0, x1, y0, y1, area, validos); area é o dobro da área
+        assinada e validos marca triângulos não degenerados que tocam a
+        região
+    """
+    rx0, rx1, ry0, ry1 = regiao
+    x0 = np.maximum(np.ceil(tela[:, :, 0].min(axis=1)), rx0).astype(np.int64)
+    x1 = np.minimum(np.floor(tela[:, :, 0].max(axis=1)), rx1).astype(np.int64)
+    y0 = np.maximum(np.ceil(tela[:, :, 1].min(axis=1)), ry0).astype(np.int64)
+    y1 = np.minimum(np.floor(tela[:, :, 1].max(axis=1)), ry1).astype(np.int64)
+
+    area = _funcao_aresta(tela[:, 0], tela[:, 1], tela[:, 2, 0], tela[:, 2, 1])
+    validos = (x1 >= x0) & (y1 >= y0) & (np.abs(area) > 1e-12)
+
+    return x0, x1, y0, y1, area, validos
+
+
+def _funcao_aresta(a: np.ndarray, b: np.ndarray, px, py) -> np.ndarray:
+    """Função de aresta (dobro da área assinada de a, b, p)"""
+    return (b[..., 0] - a[..., 0]) * (py - a[..., 1]) - \
+           (b[..., 1] - a[..., 1]) * (px - a[..., 0])
+
+
+def _inclinacao_profundidade(tela: np.ndarray, area: np.ndarray) -> np.ndarray:
+    """Maior |dz/dx|, |dz/dy| de cada triângulo no espaço da tela"""
+    e1 = tela[:, 1] - tela[:, 0]
+    e2 = tela[:, 2] - tela[:, 0]
+    dz_dx = (e1[:, 2] * e2[:, 1] - e2[:, 2] * e1[:, 1]) / area
+    dz_dy = (e2[:, 2] * e1[:, 0] - e1[:, 2] * e2[:, 0]) / area
+    return np.maximum(np.abs(dz_dx), np.abs(dz_dy))
+
+
+def _para_uint8(cor: np.ndarray) -> np.ndarray:
+    """Converte cores em [0, 1] para uint8"""
+    return (np.clip(cor, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def triangula_leque(poligonos: np.ndarray, contagem: np.ndarray,
+                    atributos: Optional[np.ndarray] = None
+                    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Divide polígonos convexos em triângulos (0, k, k + 1)
+
+    Args:
+        poligonos: Array (F, C, D) com os vértices de cada polígono
+        contagem: Número de vértices válidos de cada polígono
+        atributos: Array (F, A) por face ou (F, C, A) por vértice
+
+    Returns:
+        Tupla (triangulos, atributos): (T, 3, D) e (T, A) ou (T, 3, A)
+    """
+    contagem = np.asarray(contagem)
+    capacidade = poligonos.shape[1]
+
+    face, k = np.nonzero(np.arange(1, capacidade - 1) < (contagem[:, np.newaxis] - 1))
+    k = k + 1
+    idx = np.stack([np.zeros_like(k), k, k + 1], axis=1)
+
+    triangulos = poligonos[face[:, np.newaxis], idx]
+
+    if atributos is None:
+        return triangulos, None
+    atributos = np.asarray(atributos)
+    if atributos.ndim == 2:
+        return triangulos, atributos[face]
+    return triangulos, atributos[face[:, np.newaxis], idx]
+
+
+# ============================================================================
+# EXEMPLO DE USO
+# ============================================================================
+
+if __name__ == "__main__":
+    from fase2_pipeline import PipelineGrafico, Camera, Cubo, Malha, cria_matriz_identidade
+
+    print("=" * 60)
+    print("FASE 3: RASTERIZAÇÃO COM Z-BUFFER - Python")
+    print("=" * 60)
+
+    largura = 800
+    altura = 600
+    pipeline = PipelineGrafico(1.0, 10.0, largura, altura, usa_z_negativo=True)
+    rasterizador = Rasterizador.para_pipeline(pipeline)
+
+    cubo = Cubo.criar_cubo_unitario(centro=(0, 0, -5), tamanho=2)
+    vertices = np.array([v.to_array() for v in cubo.vertices])
+    vertices_cam = vertices @ cria_matriz_identidade().T
+
+    faces = np.array([
+        [0, 1, 2, 3], [5, 4, 7, 6],
+        [4, 0, 3, 7], [1, 5, 6, 2],
+        [3, 2, 6, 7], [4, 5, 1, 0],
+    ])
+    cores = np.array([
+        [1, 0, 0], [0, 1, 0], [0, 0, 1],
+        [1, 1, 0], [1, 0, 1], [0, 1, 1],
+    ], dtype=float)
+
+    escritos = pipeline.rasteriza_faces(rasterizador, vertices_cam, faces, cores)
+    print(f"\nPixels escritos: {escritos}")
+    print(f"Pixels cobertos: {int(np.isfinite(rasterizador.zbuffer).sum())}")
+    print(f"Desempenho: {rasterizador.pixels_por_segundo:,.0f} pixels/s")
+
+    print("\n--- Tiles em paralelo ---")
+    with RasterizadorTiles.para_pipeline(pipeline, trabalhadores=4) as tiles:
+        pipeline.rasteriza_faces(tiles, vertices_cam, faces, cores)
+        iguais = np.array_equal(tiles.imagem, rasterizador.imagem)
+        print(f"Imagem idêntica à de um processo: {iguais}")
+        print(f"Desempenho: {tiles.pixels_por_segundo:,.0f} pixels/s")
+
+    print("\n--- Aramado com linhas ocultas ---")
+    Camera(vrp=(3, 2.5, 4), p=(0, 0, 0), near=1.0, far=10.0).configura(pipeline)
+    malha = Malha.de_cubo(Cubo.criar_cubo_unitario(centro=(0, 0, 0), tamanho=2))
+    for ocultas in (False, True):
+        aramado = Rasterizador.para_pipeline(pipeline)
+        escritos = pipeline.desenha_arestas(aramado, malha, cor=(1, 1, 1), ocultas=ocultas)
+        print(f"Linhas ocultas removidas: {ocultas} -> {escritos} pixels de aresta")
@@ -0,0 +1,363 @@
+"""
+1. Modelo de iluminação de Phong (ambiente, difusa e especular)
+2. Várias lâmpadas pontuais avaliadas em uma única passada vetorizada
+3. Tabela de consulta para o termo especular pow(R . V, n)
+4. Tonalização constante (por face), Gouraud (por vértice) e Phong (por pixel)
+"""
+
+import time
+import numpy as np
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional, Sequence, Tuple
+
+from fase2_pipeline import Malha
+
+# ============================================================================
+# ESTRUTURAS DE DADOS
+# ============================================================================
+
+@dataclass
+class Material:
+    """Coeficientes de reflexão RGB (Ka, Kd, Ks) e expoente especular n"""
+    ka: Tuple[float, float, float] = (0.2, 0.2, 0.2)
+    kd: Tuple[float, float, float] = (0.7, 0.7, 0.7)
+    ks: Tuple[float, float, float] = (0.5, 0.5, 0.5)
+    n: float = 20.0
+
+    def __post_init__(self):
+        self.ka = np.asarray(self.ka, dtype=float)
+        self.kd = np.asarray(self.kd, dtype=float)
+        self.ks = np.asarray(self.ks, dtype=float)
+        self.n = float(self.n)
+
+
+@dataclass
+class Lampada:
+    """Lâmpada pontual com posição no SRU e intensidade RGB"""
+    posicao: Tuple[float, float, float]
+    cor: Tuple[float, float, float] = (1.0, 1.0, 1.0)
+
+
+class ModoTonalizacao(Enum):
+    """Onde o modelo de iluminação é avaliado"""
+    CONSTANTE = 'constante'   # uma vez por face (flat)
+    GOURAUD = 'gouraud'       # por vértice, cores interpoladas
+    PHONG = 'phong'           # por pixel, normais interpoladas
+
+
+# ============================================================================
+# MODELO DE ILUMINAÇÃO DE PHONG
+# ============================================================================
+
+class Iluminacao:
+    """
+    Luz ambiente e lâmpadas pontuais da cena
+
+    I = Ia.Ka + soma_l Il.(Kd (N . L) + Ks (R . V)^n)
+
+    As lâmpadas ficam empacotadas em arrays (L, 3) para que todas sejam
+    avaliadas de uma vez por broadcasting. O termo (R . V)^n é lido de uma
+    tabela por expoente, com interpolação linear.
+    """
+
+    def __init__(self, ambiente: Tuple[float, float, float] = (0.2, 0.2, 0.2),
+                 lampadas: Sequence[Lampada] = (),
+                 tamanho_tabela: int = 1024,
+                 max_pontos: int = 1 << 16):
+        """
+        Args:
+            ambiente: Intensidade RGB da luz ambiente (Ia)
+            lampadas: Lâmpadas pontuais
+            tamanho_tabela: Número de intervalos da tabela de pow em [0, 1]
+            max_pontos: Número máximo de pontos por passada (limita a
+                memória temporária, que cresce com pontos x lâmpadas)
+        """
+        self.ambiente = np.asarray(ambiente, dtype=float)
+        self.tamanho_tabela = tamanho_tabela
+        self.max_pontos = max_pontos
+        self._tabelas: Dict[float, np.ndarray] = {}
+
+        self.posicoes = np.zeros((0, 3))
+        self.cores = np.zeros((0, 3))
+        for lampada in lampadas:
+            self.adiciona_lampada(lampada)
+
+    def adiciona_lampada(self, lampada: Lampada):
+        """Acrescenta uma lâmpada aos arrays empacotados"""
+        self.posicoes = np.vstack([self.posicoes, np.asarray(lampada.posicao, dtype=float)])
+        self.cores = np.vstack([self.cores, np.asarray(lampada.cor, dtype=float)])
+
+    @property
+    def n_lampadas(self) -> int:
+        return len(self.posicoes)
+
+    def tabela_especular(self, n: float) -> np.ndarray:
+        """
+        Tabela de x^n para x em [0, 1], criada na primeira consulta
+
+        Args:
+            n: Expoente especular do material
+
+        Returns:
+            Array (tamanho_tabela + 2,) com um valor extra no fim para a
+            interpolação em x = 1
+        """
+        tabela = self._tabelas.get(n)
+        if tabela is None:
+            x = np.linspace(0.0, 1.0, self.tamanho_tabela + 1)
+            tabela = np.append(x ** n, 1.0)
+            self._tabelas[n] = tabela
+        return tabela
+
+    def potencia(self, x: np.ndarray, n: float) -> np.ndarray:
+        """
+        Aproxima x^n pela tabela com interpolação linear
+
+        Args:
+            x: Array de valores em [0, 1]
+            n: Expoente
+
+        Returns:
+            Array com o formato de x
+        """
+        tabela = self.tabela_especular(n)
+        t = x * self.tamanho_tabela
+        i = t.astype(np.intp)
+        f = t - i
+        return tabela[i] + f * (tabela[i + 1] - tabela[i])
+
+    def avalia(self, pontos: np.ndarray, normais: np.ndarray,
+               observador: np.ndarray, material: Material) -> np.ndarray:
+        """
+        Avalia o modelo de Phong em lote
+
+        Args:
+            pontos: Array (M, 3) de posições no SRU
+            normais: Array (M, 3) de normais unitárias
+            observador: Posição (3,) do observador no SRU
+            material: Material da superfície
+
+        Returns:
+            Array (M, 3) de cores RGB em [0, 1]
+        """
+        pontos = np.asarray(pontos, dtype=float)
+        normais = np.asarray(normais, dtype=float)
+        cores = np.empty((len(pontos), 3))
+        for inicio in range(0, len(pontos), self.max_pontos):
+            fim = inicio + self.max_pontos
+            cores[inicio:fim] = self._avalia_bloco(
+                pontos[inicio:fim], normais[inicio:fim], observador, material)
+        return cores
+
+    def _avalia_bloco(self, pontos, normais, observador, material) -> np.ndarray:
+        """Uma passada sobre (M pontos) x (L lâmpadas)"""
+        cor = np.broadcast_to(self.ambiente * material.ka, (len(pontos), 3))
+        if self.n_lampadas == 0:
+            return np.clip(cor, 0.0, 1.0)
+
+        L = self.posicoes[np.newaxis, :, :] - pontos[:, np.newaxis, :]
+        L /= np.maximum(np.linalg.norm(L, axis=2, keepdims=True), 1e-12)
+        V = observador - pontos
+        V /= np.maximum(np.linalg.norm(V, axis=1, keepdims=True), 1e-12)
+
+        n_dot_l = np.einsum('mk,mlk->ml', normais, L)
+        R = 2.0 * n_dot_l[:, :, np.newaxis] * normais[:, np.newaxis, :] - L
+        r_dot_v = np.einsum('mlk,mk->ml', R, V)
+
+        iluminado = n_dot_l > 0.0
+        difusa = np.where(iluminado, n_dot_l, 0.0)
+        especular = self.potencia(np.clip(r_dot_v, 0.0, 1.0), material.n)
+        especular[~iluminado] = 0.0
+
+        cor = (cor + (difusa @ self.cores) * material.kd
+               + (especular @ self.cores) * material.ks)
+        return np.clip(cor, 0.0, 1.0)
+
+
+class SombreadorPhong:
+    """
+    Sombreador por pixel para o rasterizador
+
+    Recebe os atributos interpolados (normal, posição) dos pixels que
+    passaram no Z-buffer e devolve a cor. É um objeto simples para poder
+    ser enviado aos processos do RasterizadorTiles.
+    """
+
+    def __init__(self, iluminacao: Iluminacao, material: Material,
+                 observador: np.ndarray):
+        self.iluminacao = iluminacao
+        self.material = material
+        self.observador = np.asarray(observador, dtype=float)
+
+    def __call__(self, atributos: np.ndarray) -> np.ndarray:
+        normais = atributos[:, :3]
+        normais = normais / np.maximum(np.linalg.norm(normais, axis=1, keepdims=True), 1e-12)
+        return self.iluminacao.avalia(atributos[:, 3:6], normais,
+                                      self.observador, self.material)
+
+
+# ============================================================================
+# TONALIZAÇÃO DE MALHAS
+# ============================================================================
+
+def ilumina_malha(pipeline, rasterizador, malha: Malha,
+                  iluminacao: Iluminacao, material: Material,
+                  modo: ModoTonalizacao = ModoTonalizacao.GOURAUD,
+                  M1: Optional[np.ndarray] = None,
+                  culling: bool = True) -> int:
+    """
+    Ilumina e rasteriza uma malha
+
+    - CONSTANTE: avalia no centróide de cada face visível com a normal da face
+    - GOURAUD: avalia por vértice antes do recorte; as cores passam pelo
+      recorte e são interpoladas na rasterização
+    - PHONG: normal e posição de cada vértice são recortadas e
+      interpoladas; o modelo é avaliado por pixel
+
+    Args:
+        pipeline: PipelineGrafico com a câmera da cena
+        rasterizador: Estágio de rasterização com Z-buffer
+        malha: Malha com vértices no SRU
+        iluminacao: Luzes da cena
+        material: Material da malha
+        modo: Tipo de tonalização
+        M1: Matriz de visualização (None usa a da câmera atual)
+        culling: Se True, descarta faces traseiras
+
+    Returns:
+        Número de pixels escritos
+    """
+    if M1 is not None:
+        pipeline.define_camera(M1)
+    observador = pipeline.posicao_observador
+
+    if modo is ModoTonalizacao.CONSTANTE:
+        faces = np.asarray(malha.faces)
+        visiveis = pipeline.faces_frontais(malha) if culling else np.ones(len(faces), dtype=bool)
+        centroides = np.asarray(malha.vertices, dtype=float)[faces[visiveis]].mean(axis=1)
+        cores = np.zeros((len(faces), 3))
+        cores[visiveis] = iluminacao.avalia(centroides, malha.normais_faces()[visiveis],
+                                            observador, material)
+        return pipeline.rasteriza_malha(rasterizador, malha, cores=cores, culling=culling)
+
+    if modo is ModoTonalizacao.GOURAUD:
+        cores_vertices = iluminacao.avalia(malha.vertices, malha.normais_vertices(),
+                                           observador, material)
+        return pipeline.rasteriza_malha(rasterizador, malha, cores_vertices=cores_vertices,
+                                        culling=culling)
+
+    atributos = np.hstack([malha.normais_vertices(), np.asarray(malha.vertices, dtype=float)])
+    sombreador = SombreadorPhong(iluminacao, material, observador)
+    return pipeline.rasteriza_malha(rasterizador, malha, cores_vertices=atributos,
+                                    culling=culling, sombreador=sombreador)
+
+
+def ilumina_gbuffer(gbuffer, iluminacao: Iluminacao,
+                    materiais: Sequence[Material],
+                    observador: np.ndarray) -> int:
+    """
+    Passada de iluminação do modo adiado
+
+    Avalia o modelo de Phong uma única vez por pixel visível do G-buffer
+    (preenchido por PipelineGrafico.rasteriza_malha_adiada) e grava o
+    resultado em gbuffer.imagem. O custo cresce com o tamanho da tela, não
+    com a sobreposição das superfícies.
+
+    Args:
+        gbuffer: RasterizadorGBuffer já preenchido
+        iluminacao: Luzes da cena
+        materiais: Materiais indexados pelo plano de material
+        observador: Posição (3,) do observador no SRU
+
+    Returns:
+        Número de pixels iluminados
+    """
+    pixel = gbuffer.pixels_visiveis()
+    ids = gbuffer.material.reshape(-1)[pixel]
+    normais = gbuffer.normal.reshape(-1, 3)[pixel].astype(float)
+    normais /= np.maximum(np.linalg.norm(normais, axis=1, keepdims=True), 1e-12)
+    pontos = gbuffer.posicao.reshape(-1, 3)[pixel].astype(float)
+
+    cores = np.empty((len(pixel), 3))
+    for indice in np.unique(ids):
+        selecao = ids == indice
+        cores[selecao] = iluminacao.avalia(pontos[selecao], normais[selecao],
+                                           observador, materiais[indice])
+
+    gbuffer.imagem.reshape(-1, 3)[pixel] = (cores * 255.0 + 0.5).astype(np.uint8)
+    return len(pixel)
+
+
+# ============================================================================
+# EXEMPLO DE USO
+# ============================================================================
+
+if __name__ == "__main__":
+    from fase2_pipeline import PipelineGrafico, Camera
+    from fase3_rasterizacao import Rasterizador, RasterizadorGBuffer
+
+    print("=" * 60)
+    print("FASE 4: ILUMINAÇÃO DE PHONG - Python")
+    print("=" * 60)
+
+    # Esfera UV de raio 1 na origem
+    fatias, aneis = 48, 24
+    teta = np.linspace(0.0, np.pi, aneis + 1)
+    fi = np.linspace(0.0, 2.0 * np.pi, fatias, endpoint=False)
+    t, f = np.meshgrid(teta, fi, indexing='ij')
+    vertices = np.stack([np.sin(t) * np.cos(f), np.cos(t), -np.sin(t) * np.sin(f)], axis=-1)
+    vertices = vertices.reshape(-1, 3)
+    i, j = np.meshgrid(np.arange(aneis), np.arange(fatias), indexing='ij')
+    a = i * fatias + j
+    b = i * fatias + (j + 1) % fatias
+    faces = np.stack([a, a + fatias, b + fatias, b], axis=-1).reshape(-1, 4)
+    esfera = Malha(vertices, faces, normais=vertices.copy())
+
+    largura, altura = 800, 600
+    pipeline = PipelineGrafico(1.0, 10.0, largura, altura)
+    Camera(vrp=(0, 0, 3), p=(0, 0, 0), near=1.0, far=10.0).configura(pipeline)
+
+    iluminacao = Iluminacao(ambiente=(0.1, 0.1, 0.1), lampadas=[
+        Lampada(posicao=(5, 5, 5), cor=(0.8, 0.8, 0.8)),
+        Lampada(posicao=(-5, 2, 3), cor=(0.2, 0.2, 0.6)),
+    ])
+    material = Material(ka=(1.0, 0.3, 0.3), kd=(0.8, 0.2, 0.2), ks=(0.6, 0.6, 0.6), n=40)
+
+    x = np.linspace(0.0, 1.0, 100001)
+    erro = np.abs(iluminacao.potencia(x, material.n) - x ** material.n).max()
+    print(f"\nErro máximo da tabela de pow (n={material.n:g}): {erro:.2e}")
+
+    rasterizador = Rasterizador.para_pipeline(pipeline)
+    for modo in ModoTonalizacao:
+        rasterizador.limpa()
+        inicio = time.perf_counter()
+        escritos = ilumina_malha(pipeline, rasterizador, esfera, iluminacao, material, modo)
+        tempo = time.perf_counter() - inicio
+        cor_centro = tuple(int(c) for c in rasterizador.imagem[altura // 2, largura // 2])
+        print(f"{modo.value:>10}: {escritos} pixels, centro={cor_centro}, {tempo * 1000:.1f} ms")
+
+    print("\n--- Modo adiado (G-buffer) com duas esferas, a de trás primeiro ---")
+    deslocada = Malha(esfera.vertices + np.array([0.8, 0.0, -0.5]), esfera.faces,
+                      normais=esfera.normais)
+    outro = Material(ka=(0.3, 0.3, 1.0), kd=(0.2, 0.3, 0.8), ks=(0.8, 0.8, 0.8), n=80)
+
+    rasterizador.limpa()
+    rasterizador.pixels_escritos = 0
+    inicio = time.perf_counter()
+    for malha, mat in ((deslocada, outro), (esfera, material)):
+        ilumina_malha(pipeline, rasterizador, malha, iluminacao, mat, ModoTonalizacao.PHONG)
+    tempo_direto = time.perf_counter() - inicio
+
+    gbuffer = RasterizadorGBuffer.para_pipeline(pipeline)
+    inicio = time.perf_counter()
+    pipeline.rasteriza_malha_adiada(gbuffer, deslocada, material=1)
+    pipeline.rasteriza_malha_adiada(gbuffer, esfera, material=0)
+    iluminados = ilumina_gbuffer(gbuffer, iluminacao, [material, outro],
+                                 pipeline.posicao_observador)
+    tempo_adiado = time.perf_counter() - inicio
+
+    diferenca = np.abs(gbuffer.imagem.astype(int) - rasterizador.imagem.astype(int)).max()
+    print(f"Avaliações de Phong: direto={rasterizador.pixels_escritos}, adiado={iluminados}")
+    print(f"Tempo: direto={tempo_direto * 1000:.1f} ms, adiado={tempo_adiado * 1000:.1f} ms")
+    print(f"Diferença máxima entre as imagens: {diferenca}")
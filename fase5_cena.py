@@ -0,0 +1,1058 @@
+"""
+1. Cena com vários objetos (malha + deslocamento no SRU)
+2. BVH (hierarquia de caixas envolventes) sobre as AABBs dos objetos
+3. Descarte de objetos fora do volume de visão por nível da BVH, em lote
+4. Reajuste (refit) da BVH quando objetos são transladados
+5. Cena retida: triângulos de tela em cache por objeto e redesenho só dos
+   retângulos que mudaram
+6. Pilha de transformações adiada por objeto (escala e rotação compostas
+   em uma matriz e aplicadas aos vértices só quando necessário)
+7. Níveis de detalhe: cadeia de malhas simplificadas por agrupamento de
+   vértices e escolha do nível, a cada quadro, pelo raio em pixels da
+   esfera envolvente projetada
+"""
+
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fase2_pipeline import (
+    ClasseVolume, Malha, caixas_transformadas, classifica_caixas,
+    cria_matriz_escala, cria_matriz_rotacao, cria_matriz_translacao,
+    multiplica_matriz_vertices
+)
+from fase3_rasterizacao import triangula_leque
+
+# ============================================================================
+# NÍVEIS DE DETALHE
+# ============================================================================
+
+def simplifica_agrupamento(malha: Malha, tamanho_celula: float) -> Tuple[Malha, float]:
+    """
+    Simplifica uma malha por agrupamento de vértices em uma grade
+
+    Os vértices de cada célula cúbica viram um só, na média das posições
+    (cores e normais explícitas também são médias). As faces são
+    trianguladas em leque e renumeradas; triângulos degenerados (dois
+    vértices na mesma célula) e repetidos são descartados.
+
+    Args:
+        malha: Malha original
+        tamanho_celula: Aresta das células da grade, nas unidades da malha
+
+    Returns:
+        Tupla (malha simplificada, erro): erro é o maior deslocamento de
+        um vértice original até o seu representante
+    """
+    vertices = np.asarray(malha.vertices, dtype=float)
+    minimo = vertices.min(axis=0)
+    celulas = np.floor((vertices - minimo) / tamanho_celula).astype(np.int64)
+    dimensoes = celulas.max(axis=0) + 1
+    chaves = (celulas[:, 0] * dimensoes[1] + celulas[:, 1]) * dimensoes[2] + celulas[:, 2]
+    _, grupo, contagem = np.unique(chaves, return_inverse=True, return_counts=True)
+    grupo = grupo.reshape(-1)
+
+    def media(valores: np.ndarray) -> np.ndarray:
+        soma = np.zeros((len(contagem), valores.shape[1]))
+        np.add.at(soma, grupo, valores)
+        return soma / contagem[:, np.newaxis]
+
+    novos_vertices = media(vertices)
+    erro = float(np.sqrt(((vertices - novos_vertices[grupo]) ** 2).sum(axis=1).max()))
+
+    cores = None if malha.cores is None else media(np.asarray(malha.cores, dtype=float))
+    normais = None
+    if malha.normais is not None:
+        normais = media(np.asarray(malha.normais, dtype=float))
+        comprimento = np.linalg.norm(normais, axis=1, keepdims=True)
+        normais = normais / np.where(comprimento > 0, comprimento, 1.0)
+
+    # Leque (0, k, k + 1) de cada face, já com os índices agrupados
+    faces = grupo[np.asarray(malha.faces)]
+    lados = faces.shape[1]
+    triangulos = np.concatenate([faces[:, [0, k, k + 1]] for k in range(1, lados - 1)])
+    validos = ((triangulos[:, 0] != triangulos[:, 1])
+               & (triangulos[:, 1] != triangulos[:, 2])
+               & (triangulos[:, 0] != triangulos[:, 2]))
+    triangulos = triangulos[validos]
+    _, unicos = np.unique(np.sort(triangulos, axis=1), axis=0, return_index=True)
+    triangulos = triangulos[np.sort(unicos)].astype(np.int32)
+
+    return Malha(novos_vertices, triangulos, normais, cores), erro
+
+
+@dataclass
+class CadeiaLOD:
+    """
+    Versões de uma malha com cada vez menos vértices
+
+    niveis[0] é a malha original (erro 0); erros[k] é o maior
+    deslocamento de vértice do nível k, nas unidades da malha, e não
+    diminui com k.
+    """
+    niveis: List[Malha]
+    erros: np.ndarray
+
+    @classmethod
+    def cria(cls, malha: Malha, n_niveis: int = 5, reducao: float = 4.0,
+             min_faces: int = 32) -> 'CadeiaLOD':
+        """
+        Pré-calcula a cadeia por agrupamento de vértices
+
+        Cada nível agrupa a malha original com células sqrt(reducao)
+        vezes maiores que as do anterior (cerca de reducao vezes menos
+        vértices em uma superfície), partindo do comprimento médio das
+        arestas. A cadeia para antes se um nível ficaria com menos de
+        min_faces faces ou não reduziria os vértices.
+
+        Args:
+            malha: Malha original (nível 0)
+            n_niveis: Número máximo de níveis, contando o original
+            reducao: Fator de redução de vértices entre níveis
+            min_faces: Menor número de faces de um nível simplificado
+
+        Returns:
+            CadeiaLOD
+        """
+        niveis = [malha]
+        erros = [0.0]
+        arestas = np.asarray(malha.vertices, dtype=float)[malha.arestas]
+        base = float(np.linalg.norm(arestas[:, 0] - arestas[:, 1], axis=1).mean())
+        for k in range(1, n_niveis):
+            simplificada, erro = simplifica_agrupamento(malha, base * np.sqrt(reducao) ** k)
+            if (simplificada.n_faces < min_faces
+                    or simplificada.n_vertices >= niveis[-1].n_vertices):
+                break
+            niveis.append(simplificada)
+            erros.append(max(erro, erros[-1]))
+        return cls(niveis, np.array(erros))
+
+    def nivel(self, erro_maximo: float) -> int:
+        """Nível mais simples cujo erro não passa de erro_maximo"""
+        return int(np.searchsorted(self.erros, erro_maximo, side='right')) - 1
+
+    def transformada(self, matriz: np.ndarray) -> 'CadeiaLOD':
+        """
+        Cadeia com todos os níveis levados por uma matriz afim
+
+        Os erros são multiplicados pela norma espectral da parte linear
+        (o maior estiramento possível de um deslocamento).
+        """
+        estiramento = float(np.linalg.norm(np.asarray(matriz)[:3, :3], 2))
+        return CadeiaLOD([transforma_malha(nivel, matriz) for nivel in self.niveis],
+                         self.erros * estiramento)
+
+
+def transforma_malha(malha: Malha, matriz: np.ndarray) -> Malha:
+    """
+    Cópia de uma malha com uma transformação afim aplicada aos vértices
+
+    Normais explícitas são levadas pela inversa transposta e, se a
+    transformação espelha, a ordem dos vértices das faces é invertida
+    para manter a orientação anti-horária.
+    """
+    linear = np.asarray(matriz, dtype=float)[:3, :3]
+    normais = malha.normais
+    if normais is not None:
+        normais = np.asarray(normais) @ np.linalg.inv(linear)
+        normais = normais / np.linalg.norm(normais, axis=1, keepdims=True)
+    faces = malha.faces
+    if np.linalg.det(linear) < 0:
+        faces = faces[:, ::-1]
+
+    vertices = multiplica_matriz_vertices(matriz, malha.vertices)[:, :3]
+    return Malha(vertices, faces, normais, malha.cores, malha.arestas)
+
+
+# ============================================================================
+# ESTRUTURAS DE DADOS
+# ============================================================================
+
+@dataclass
+class Objeto:
+    """
+    Malha posicionada na cena por um deslocamento no SRU
+
+    Escalas e rotações não percorrem os vértices: são compostas em uma
+    matriz pendente e entram na matriz de modelo, que o pipeline junta a
+    P . M1 (uma única passada pelos vértices por quadro, qualquer que
+    seja o número de edições). consolida() aplica a matriz pendente aos
+    vértices de uma cópia da malha; malhas com até limite_vertices
+    vértices são consolidadas a cada edição, como se a transformação
+    fosse feita direto nos vértices.
+
+    O atributo versao é incrementado sempre que a malha, o deslocamento,
+    a cadeia de níveis de detalhe ou a transformação pendente mudam (como
+    Malha.versao), para os caches da cena retida.
+
+    lod, se informada, é uma CadeiaLOD cujo nível 0 é a própria malha;
+    ao trocar a malha, troque também a cadeia.
+    """
+    malha: Malha
+    deslocamento: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    limite_vertices: int = 4096
+    lod: Optional[CadeiaLOD] = None
+    _pendente: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.deslocamento = np.asarray(self.deslocamento, dtype=float)
+
+    def __setattr__(self, nome, valor):
+        super().__setattr__(nome, valor)
+        if nome in ('malha', 'deslocamento', 'lod', '_pendente'):
+            self.__dict__['versao'] = self.__dict__.get('versao', -1) + 1
+
+    @property
+    def pendente(self) -> bool:
+        """True se há transformação ainda não aplicada aos vértices"""
+        return self._pendente is not None
+
+    def caixa(self) -> Tuple[np.ndarray, np.ndarray]:
+        """AABB do objeto no SRU"""
+        minimo, maximo = self.malha.caixa_envolvente()
+        if self._pendente is None:
+            return minimo + self.deslocamento, maximo + self.deslocamento
+        minimos, maximos = caixas_transformadas(minimo, maximo,
+                                                self.matriz_modelo()[np.newaxis])
+        return minimos[0], maximos[0]
+
+    def malha_lod(self, nivel: int) -> Malha:
+        """Malha do nível de detalhe pedido (0 ou sem cadeia: a própria malha)"""
+        if nivel == 0 or self.lod is None:
+            return self.malha
+        return self.lod.niveis[nivel]
+
+    def matriz_modelo(self) -> np.ndarray:
+        """Matriz que leva a malha do seu sistema local ao SRU"""
+        T = cria_matriz_translacao(*self.deslocamento)
+        return T if self._pendente is None else T @ self._pendente
+
+    def translada(self, dx: float, dy: float, dz: float):
+        """Translada o objeto no SRU (só muda o deslocamento)"""
+        self.deslocamento = self.deslocamento + np.array([dx, dy, dz], dtype=float)
+
+    def escala(self, sx: float, sy: float, sz: float,
+               centro: Optional[Sequence[float]] = None):
+        """Escala em relação a um ponto do SRU (padrão: a origem do objeto)"""
+        self.transforma(cria_matriz_escala(sx, sy, sz), centro)
+
+    def rotaciona(self, eixo: Sequence[float], angulo: float,
+                  centro: Optional[Sequence[float]] = None):
+        """Gira angulo radianos em torno de um eixo por um ponto do SRU"""
+        self.transforma(cria_matriz_rotacao(eixo, angulo), centro)
+
+    def transforma(self, matriz: np.ndarray, centro: Optional[Sequence[float]] = None):
+        """
+        Acrescenta uma transformação afim à pilha do objeto
+
+        Args:
+            matriz: Matriz 4x4 afim, aplicada no SRU depois das anteriores
+            centro: Ponto fixo da transformação no SRU; None usa a origem
+                do objeto (o deslocamento)
+        """
+        matriz = np.asarray(matriz, dtype=float)
+        if centro is not None:
+            # T(c) . M . T(-c) escrita em relação à origem do objeto
+            c = np.asarray(centro, dtype=float) - self.deslocamento
+            matriz = cria_matriz_translacao(*c) @ matriz @ cria_matriz_translacao(*-c)
+
+        # A parte de translação fica no deslocamento; a pendente é linear
+        base = np.eye(4) if self._pendente is None else self._pendente
+        composta = matriz @ base
+        self.deslocamento = self.deslocamento + composta[:3, 3]
+        composta[:3, 3] = 0.0
+        self._pendente = composta
+
+        if self.malha.n_vertices <= self.limite_vertices:
+            self.consolida()
+
+    def consolida(self):
+        """
+        Aplica a transformação pendente aos vértices
+
+        A malha é trocada por uma cópia transformada (a original pode
+        estar compartilhada com outros objetos), ver transforma_malha; os
+        níveis de detalhe são transformados junto.
+        """
+        if self._pendente is None:
+            return
+        if self.lod is not None:
+            self.lod = self.lod.transformada(self._pendente)
+            self.malha = self.lod.niveis[0]
+        else:
+            self.malha = transforma_malha(self.malha, self._pendente)
+        self._pendente = None
+
+
+# ============================================================================
+# BVH
+# ============================================================================
+
+class BVH:
+    """
+    Hierarquia de caixas envolventes guardada em arrays
+
+    Cada nó tem sua AABB, os filhos (-1 nas folhas) e o intervalo
+    [inicio, fim) de 'ordem' com os objetos da subárvore. Os filhos são
+    sempre criados depois do pai, e a profundidade de cada nó fica
+    guardada para que o reajuste e a consulta andem nível a nível com
+    operações em lote.
+    """
+
+    def __init__(self, minimos: np.ndarray, maximos: np.ndarray,
+                 objetos_por_folha: int = 4):
+        """
+        Args:
+            minimos: Array (K, 3) com os cantos mínimos das AABBs
+            maximos: Array (K, 3) com os cantos máximos das AABBs
+            objetos_por_folha: Número máximo de objetos em uma folha
+        """
+        self.objetos_por_folha = objetos_por_folha
+        self._constroi(np.asarray(minimos, dtype=float), np.asarray(maximos, dtype=float))
+
+    @property
+    def n_nos(self) -> int:
+        return len(self.esquerdo)
+
+    def _constroi(self, minimos: np.ndarray, maximos: np.ndarray):
+        """Divisão pela mediana dos centros no eixo de maior extensão"""
+        n = len(minimos)
+        centros = (minimos + maximos) / 2.0
+        self.ordem = np.arange(n)
+
+        inicio, fim, esquerdo, direito, profundidade = [], [], [], [], []
+        pilha = [(0, n, 0, -1, 0)]  # (inicio, fim, profundidade, pai, lado)
+        while pilha:
+            ini, fi, prof, pai, lado = pilha.pop()
+            no = len(inicio)
+            inicio.append(ini)
+            fim.append(fi)
+            esquerdo.append(-1)
+            direito.append(-1)
+            profundidade.append(prof)
+            if pai >= 0:
+                (esquerdo if lado == 0 else direito)[pai] = no
+
+            if fi - ini <= self.objetos_por_folha:
+                continue
+
+            segmento = self.ordem[ini:fi]
+            c = centros[segmento]
+            eixo = int(np.argmax(c.max(axis=0) - c.min(axis=0)))
+            meio = (fi - ini) // 2
+            self.ordem[ini:fi] = segmento[np.argpartition(c[:, eixo], meio)]
+
+            pilha.append((ini + meio, fi, prof + 1, no, 1))
+            pilha.append((ini, ini + meio, prof + 1, no, 0))
+
+        self.inicio = np.array(inicio, dtype=np.intp)
+        self.fim = np.array(fim, dtype=np.intp)
+        self.esquerdo = np.array(esquerdo, dtype=np.intp)
+        self.direito = np.array(direito, dtype=np.intp)
+        self.profundidade = np.array(profundidade, dtype=np.intp)
+        self.folhas = np.flatnonzero(self.esquerdo < 0)
+        self.folhas = self.folhas[np.argsort(self.inicio[self.folhas])]
+
+        self.no_minimo = np.empty((self.n_nos, 3))
+        self.no_maximo = np.empty((self.n_nos, 3))
+        self.reajusta(minimos, maximos)
+
+    def reajusta(self, minimos: np.ndarray, maximos: np.ndarray):
+        """
+        Recalcula as caixas dos nós sem mudar a topologia (refit)
+
+        Barato o bastante para rodar a cada quadro em que objetos se
+        movem; a árvore só piora de qualidade se os objetos se afastarem
+        muito das posições em que ela foi construída.
+
+        Args:
+            minimos: Array (K, 3) com as novas AABBs dos objetos
+            maximos: Array (K, 3)
+        """
+        self.minimos = np.asarray(minimos, dtype=float)
+        self.maximos = np.asarray(maximos, dtype=float)
+        if len(self.ordem) == 0:
+            # Cena vazia: só a raiz, sem caixa; consulta não a visita
+            return
+
+        # Folhas: redução sobre intervalos contíguos de 'ordem'
+        inicios = self.inicio[self.folhas]
+        self.no_minimo[self.folhas] = np.minimum.reduceat(self.minimos[self.ordem], inicios)
+        self.no_maximo[self.folhas] = np.maximum.reduceat(self.maximos[self.ordem], inicios)
+
+        # Nós internos, do nível mais fundo para a raiz
+        internos = np.flatnonzero(self.esquerdo >= 0)
+        for prof in range(int(self.profundidade.max(initial=0)), -1, -1):
+            nos = internos[self.profundidade[internos] == prof]
+            if len(nos) == 0:
+                continue
+            e, d = self.esquerdo[nos], self.direito[nos]
+            self.no_minimo[nos] = np.minimum(self.no_minimo[e], self.no_minimo[d])
+            self.no_maximo[nos] = np.maximum(self.no_maximo[e], self.no_maximo[d])
+
+    def consulta(self, planos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Objetos que tocam o volume de visão
+
+        Todos os nós de um nível são testados de uma vez. Um nó inteiro
+        dentro do volume aceita a subárvore sem mais testes; nas folhas
+        que cruzam algum plano, cada objeto é testado pela própria AABB.
+
+        Args:
+            planos: Array (6, 4) de planos_volume_visao
+
+        Returns:
+            Tupla (indices, classes) em ordem crescente de índice, só com
+            objetos CRUZA ou DENTRO
+        """
+        indices: List[np.ndarray] = []
+        classes: List[np.ndarray] = []
+        fronteira = np.zeros(1 if len(self.ordem) else 0, dtype=np.intp)
+
+        while len(fronteira):
+            classe = classifica_caixas(planos, self.no_minimo[fronteira],
+                                       self.no_maximo[fronteira])
+
+            dentro = fronteira[classe == ClasseVolume.DENTRO]
+            if len(dentro):
+                objetos = self._objetos(dentro)
+                indices.append(objetos)
+                classes.append(np.full(len(objetos), ClasseVolume.DENTRO, dtype=np.int8))
+
+            cruza = fronteira[classe == ClasseVolume.CRUZA]
+            folha = self.esquerdo[cruza] < 0
+            if folha.any():
+                objetos = self._objetos(cruza[folha])
+                classe_obj = classifica_caixas(planos, self.minimos[objetos],
+                                               self.maximos[objetos])
+                visivel = classe_obj != ClasseVolume.FORA
+                indices.append(objetos[visivel])
+                classes.append(classe_obj[visivel])
+
+            internos = cruza[~folha]
+            fronteira = np.concatenate([self.esquerdo[internos], self.direito[internos]])
+
+        if not indices:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int8)
+        indices = np.concatenate(indices)
+        classes = np.concatenate(classes)
+        ordem = np.argsort(indices)
+        return indices[ordem], classes[ordem]
+
+    def _objetos(self, nos: np.ndarray) -> np.ndarray:
+        """Objetos das subárvores de vários nós"""
+        return np.concatenate([self.ordem[i:f] for i, f in
+                               zip(self.inicio[nos], self.fim[nos])])
+
+
+# ============================================================================
+# CENA
+# ============================================================================
+
+class Cena:
+    """
+    Conjunto de objetos com descarte pelo volume de visão
+
+    A BVH é construída na primeira consulta e reajustada (sem
+    reconstruir) quando a versão de algum objeto ou da sua malha muda
+    desde a última consulta, seja a edição feita pela cena, direto no
+    objeto ou nos vértices da malha (seguida de Malha.invalida()).
+
+    Objetos com cadeia de níveis de detalhe são desenhados no nível mais
+    simples cujo erro, projetado na tela, não passa de tolerancia_lod
+    pixels (None desenha sempre a malha original).
+    """
+
+    def __init__(self, objetos: Sequence[Objeto] = (), objetos_por_folha: int = 4,
+                 tolerancia_lod: Optional[float] = 1.0):
+        self.objetos: List[Objeto] = list(objetos)
+        self.objetos_por_folha = objetos_por_folha
+        self.tolerancia_lod = tolerancia_lod
+        self._bvh: Optional[BVH] = None
+        self._versoes: List[Tuple[int, int, int]] = []
+
+    def adiciona(self, objeto: Objeto) -> int:
+        """Acrescenta um objeto (a BVH será reconstruída); retorna o índice"""
+        self.objetos.append(objeto)
+        self._bvh = None
+        return len(self.objetos) - 1
+
+    def move(self, indice: int, delta: Sequence[float]):
+        """Translada um objeto; a BVH é reajustada na próxima consulta"""
+        objeto = self.objetos[indice]
+        objeto.deslocamento = objeto.deslocamento + np.asarray(delta, dtype=float)
+
+    def transforma(self, indice: int, matriz: np.ndarray,
+                   centro: Optional[Sequence[float]] = None):
+        """Aplica uma transformação afim a um objeto (ver Objeto.transforma)"""
+        self.objetos[indice].transforma(matriz, centro)
+
+    def caixas(self) -> Tuple[np.ndarray, np.ndarray]:
+        """AABBs (K, 3) de todos os objetos no SRU"""
+        if not self.objetos:
+            return np.zeros((0, 3)), np.zeros((0, 3))
+        caixas = [objeto.caixa() for objeto in self.objetos]
+        return np.array([c[0] for c in caixas]), np.array([c[1] for c in caixas])
+
+    @property
+    def bvh(self) -> BVH:
+        versoes = [(id(objeto), objeto.versao, objeto.malha.versao)
+                   for objeto in self.objetos]
+        if self._bvh is None or len(versoes) != len(self._versoes):
+            self._bvh = BVH(*self.caixas(), self.objetos_por_folha)
+        elif versoes != self._versoes:
+            self._bvh.reajusta(*self.caixas())
+        self._versoes = versoes
+        return self._bvh
+
+    def visiveis(self, pipeline, M1: Optional[np.ndarray] = None
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Objetos que tocam o volume de visão da câmera do pipeline
+
+        Returns:
+            Tupla (indices, classes), ver BVH.consulta
+        """
+        if M1 is not None:
+            pipeline.define_camera(M1)
+        indices, classes = self.bvh.consulta(pipeline.planos_visao)
+
+        pipeline.perfil.conta('malhas_fora', len(self.objetos) - len(indices))
+        pipeline.perfil.conta('malhas_dentro', np.count_nonzero(classes == ClasseVolume.DENTRO))
+        return indices, classes
+
+    def escolhe_niveis(self, pipeline, indices: Sequence[int],
+                       M1: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Nível de detalhe de cada objeto para a câmera do pipeline
+
+        A esfera envolvente da malha é levada ao SRU (raio multiplicado
+        pela maior coluna da matriz de modelo) e projetada com
+        PipelineGrafico.raios_tela. O erro de um nível em pixels é o seu
+        erro na malha vezes pixels por unidade (raio em pixels / raio na
+        malha). O nível e o erro escolhidos vão para perfil.lod e os
+        vértices poupados para o contador vertices_poupados_lod.
+
+        Args:
+            pipeline: PipelineGrafico
+            indices: Objetos a avaliar
+            M1: Matriz de visualização (None usa a da câmera atual)
+
+        Returns:
+            Array de níveis, na ordem de indices
+        """
+        indices = [int(i) for i in indices]
+        niveis = np.zeros(len(indices), dtype=int)
+        if self.tolerancia_lod is None:
+            return niveis
+        com_lod = [k for k, i in enumerate(indices) if self.objetos[i].lod is not None]
+        if not com_lod:
+            return niveis
+
+        centros = np.empty((len(com_lod), 3))
+        raios = np.empty(len(com_lod))
+        raios_malha = np.empty(len(com_lod))
+        for j, k in enumerate(com_lod):
+            objeto = self.objetos[indices[k]]
+            centro, raio = objeto.malha.esfera_envolvente()
+            modelo = objeto.matriz_modelo()
+            centros[j] = modelo[:3, :3] @ centro + modelo[:3, 3]
+            raios[j] = raio * np.linalg.norm(modelo[:3, :3], axis=0).max()
+            raios_malha[j] = raio
+        pixels_por_unidade = pipeline.raios_tela(centros, raios, M1) / np.maximum(raios_malha, 1e-12)
+
+        perfil = pipeline.perfil
+        for j, k in enumerate(com_lod):
+            objeto = self.objetos[indices[k]]
+            if np.isfinite(pixels_por_unidade[j]) and pixels_por_unidade[j] > 0:
+                nivel = objeto.lod.nivel(self.tolerancia_lod / pixels_por_unidade[j])
+            else:
+                nivel = 0
+            niveis[k] = nivel
+            perfil.registra_lod(indices[k], nivel,
+                                objeto.lod.erros[nivel] * pixels_por_unidade[j] if nivel else 0.0)
+            perfil.conta('vertices_poupados_lod',
+                         objeto.malha.n_vertices - objeto.malha_lod(nivel).n_vertices)
+        return niveis
+
+    def processa(self, pipeline, M1: Optional[np.ndarray] = None
+                 ) -> List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Arestas na tela de todos os objetos visíveis
+
+        Returns:
+            Lista de (indice do objeto, xy, z, visivel) como em
+            PipelineGrafico.processa_malha
+        """
+        M1 = pipeline.M1 if M1 is None else M1
+        indices, classes = self.visiveis(pipeline, M1)
+        niveis = self.escolhe_niveis(pipeline, indices, M1)
+
+        resultado = []
+        for indice, classe, nivel in zip(indices, classes, niveis):
+            objeto = self.objetos[indice]
+            M1_objeto = M1 @ objeto.matriz_modelo()
+            xy, z, visivel = pipeline.processa_malha(objeto.malha_lod(nivel), M1_objeto,
+                                                     ClasseVolume(classe))
+            resultado.append((int(indice), xy, z, visivel))
+
+        pipeline.define_camera(M1)
+        return resultado
+
+    def rasteriza(self, pipeline, rasterizador, M1: Optional[np.ndarray] = None,
+                  **kwargs) -> int:
+        """
+        Preenche todos os objetos visíveis no mesmo Z-buffer
+
+        Args:
+            pipeline: PipelineGrafico
+            rasterizador: Estágio de rasterização com Z-buffer
+            M1: Matriz de visualização (None usa a da câmera atual)
+            **kwargs: Repassados a PipelineGrafico.rasteriza_malha
+
+        Returns:
+            Número de pixels escritos
+        """
+        M1 = pipeline.M1 if M1 is None else M1
+        indices, classes = self.visiveis(pipeline, M1)
+        niveis = self.escolhe_niveis(pipeline, indices, M1)
+
+        escritos = 0
+        for indice, classe, nivel in zip(indices, classes, niveis):
+            objeto = self.objetos[indice]
+            escritos += pipeline.rasteriza_malha(
+                rasterizador, objeto.malha_lod(nivel), M1 @ objeto.matriz_modelo(),
+                classe=ClasseVolume(classe), **kwargs)
+
+        pipeline.define_camera(M1)
+        return escritos
+
+
+# ============================================================================
+# CENA RETIDA (REDESENHO INCREMENTAL)
+# ============================================================================
+
+Retangulo = Tuple[int, int, int, int]
+
+
+@dataclass
+class TriangulosTela:
+    """Resultado em cache de um objeto: triângulos já recortados e na tela"""
+    chave: Tuple[int, int, int]
+    triangulos: np.ndarray
+    cores: np.ndarray
+    retangulo: Optional[Retangulo]
+
+
+@dataclass
+class RelatorioQuadro:
+    """O que foi refeito em um quadro da cena retida"""
+    completo: bool
+    recalculados: int
+    retangulos: List[Retangulo]
+    pixels_refeitos: int
+    escritos: int
+
+
+class _GravadorPoligonos:
+    """
+    Rasterizador que só guarda os polígonos de tela recebidos
+
+    Passado ao pipeline no lugar do rasterizador, captura a saída do
+    recorte e do mapeamento para a tela já dividida em triângulos.
+    """
+
+    def __init__(self):
+        self.triangulos = np.zeros((0, 3, 3))
+        self.cores = None
+
+    def rasteriza_poligonos(self, tela: np.ndarray, contagem: np.ndarray,
+                            cores: Optional[np.ndarray] = None, **opcoes) -> int:
+        self.triangulos, self.cores = triangula_leque(tela, contagem, cores)
+        self.triangulos = np.asarray(self.triangulos, dtype=float)
+        return 0
+
+
+def _retangulo_triangulos(triangulos: np.ndarray, largura: int,
+                          altura: int) -> Optional[Retangulo]:
+    """Menor retângulo inclusivo de pixels que os triângulos podem cobrir"""
+    if len(triangulos) == 0:
+        return None
+    x0 = max(int(np.ceil(triangulos[:, :, 0].min())), 0)
+    x1 = min(int(np.floor(triangulos[:, :, 0].max())), largura - 1)
+    y0 = max(int(np.ceil(triangulos[:, :, 1].min())), 0)
+    y1 = min(int(np.floor(triangulos[:, :, 1].max())), altura - 1)
+    if x1 < x0 or y1 < y0:
+        return None
+    return x0, x1, y0, y1
+
+
+def une_retangulos(retangulos: Sequence[Retangulo]) -> List[Retangulo]:
+    """
+    Junta retângulos que se sobrepõem até sobrarem só retângulos disjuntos
+
+    Evita que a mesma região seja limpa e rasterizada duas vezes.
+    """
+    restantes = list(retangulos)
+    unidos: List[Retangulo] = []
+    while restantes:
+        x0, x1, y0, y1 = restantes.pop()
+        mudou = True
+        while mudou:
+            mudou = False
+            for i in range(len(restantes) - 1, -1, -1):
+                a0, a1, b0, b1 = restantes[i]
+                if a0 <= x1 and x0 <= a1 and b0 <= y1 and y0 <= b1:
+                    x0, x1 = min(x0, a0), max(x1, a1)
+                    y0, y1 = min(y0, b0), max(y1, b1)
+                    del restantes[i]
+                    mudou = True
+        # Um retângulo que cresceu pode passar a tocar um já unido
+        for i in range(len(unidos) - 1, -1, -1):
+            a0, a1, b0, b1 = unidos[i]
+            if a0 <= x1 and x0 <= a1 and b0 <= y1 and y0 <= b1:
+                restantes.append((min(x0, a0), max(x1, a1), min(y0, b0), max(y1, b1)))
+                del unidos[i]
+                break
+        else:
+            unidos.append((x0, x1, y0, y1))
+    return unidos
+
+
+class CenaRetida(Cena):
+    """
+    Cena em modo retido sobre o PipelineGrafico
+
+    Guarda, para cada objeto, os triângulos de tela produzidos pelo
+    recorte e pelo mapeamento, com a chave (versão do objeto, versão da
+    malha, versão da câmera). Entre quadros com a mesma câmera só os
+    objetos cuja chave mudou passam de novo pelo pipeline, e só os
+    retângulos de tela antigo e novo de cada um são limpos e
+    rasterizados de novo, com os triângulos em cache de todos os objetos
+    que os tocam; o resto da imagem e do Z-buffer fica como estava.
+
+    O resultado é idêntico ao de Cena.rasteriza com as mesmas opções,
+    desde que o rasterizador só seja usado por esta cena. O nível de
+    detalhe só depende da câmera e do objeto, então é escolhido só para
+    os objetos recalculados; ao mudar tolerancia_lod chame invalida().
+    """
+
+    def __init__(self, objetos: Sequence[Objeto] = (), objetos_por_folha: int = 4,
+                 tolerancia_lod: Optional[float] = 1.0, **opcoes):
+        """
+        Args:
+            objetos: Objetos iniciais
+            objetos_por_folha: Ver Cena
+            tolerancia_lod: Ver Cena
+            **opcoes: Repassadas a PipelineGrafico.rasteriza_malha
+                (cores, cores_vertices, culling, sombreador)
+        """
+        super().__init__(objetos, objetos_por_folha, tolerancia_lod)
+        self.opcoes = opcoes
+        self.versao_camera = 0
+        self._estado_camera = None
+        self._cache: Dict[int, TriangulosTela] = {}
+
+    def invalida(self):
+        """Força o redesenho completo no próximo quadro"""
+        self._estado_camera = None
+
+    def desenha(self, pipeline, rasterizador, M1: Optional[np.ndarray] = None
+                ) -> RelatorioQuadro:
+        """
+        Atualiza a imagem do rasterizador com o estado atual da cena
+
+        Uma mudança de câmera, projeção, viewport ou de rasterizador
+        redesenha tudo; caso contrário só as regiões dos objetos que
+        mudaram são refeitas.
+
+        Args:
+            pipeline: PipelineGrafico
+            rasterizador: Estágio de rasterização com Z-buffer, mantido
+                entre os quadros
+            M1: Matriz de visualização (None usa a da câmera atual)
+
+        Returns:
+            RelatorioQuadro com os objetos recalculados e os retângulos
+            refeitos
+        """
+        M1 = np.array(pipeline.M1 if M1 is None else M1, dtype=float)
+        estado = (M1.tobytes(), pipeline.versao_projecao, pipeline.versao_viewport,
+                  id(rasterizador), rasterizador.zbuffer.shape)
+        completo = estado != self._estado_camera
+        if completo:
+            self.versao_camera += 1
+            self._estado_camera = estado
+
+        # Objetos cujo resultado em cache não vale mais
+        antigos = {}
+        if completo:
+            antigos, self._cache = self._cache, {}
+            indices, classes = self.visiveis(pipeline, M1)
+            classe_de = dict(zip(indices.tolist(), classes.tolist()))
+            mudados = range(len(self.objetos))
+            avaliados = indices
+        else:
+            for indice in [i for i in self._cache if i >= len(self.objetos)]:
+                antigos[indice] = self._cache.pop(indice)
+            classe_de = {}
+            mudados = [i for i, objeto in enumerate(self.objetos)
+                       if self._chave(i) != getattr(self._cache.get(i), 'chave', None)]
+            avaliados = mudados
+        nivel_de = dict(zip([int(i) for i in avaliados],
+                            self.escolhe_niveis(pipeline, avaliados, M1).tolist()))
+
+        retangulos = []
+        for indice in mudados:
+            anterior = self._cache.get(indice, antigos.get(indice))
+            if anterior is not None and anterior.retangulo is not None:
+                retangulos.append(anterior.retangulo)
+            if completo and indice not in classe_de:
+                classe = ClasseVolume.FORA
+            else:
+                classe = classe_de.get(indice)
+            self._cache[indice] = self._calcula(pipeline, rasterizador, M1, indice, classe,
+                                                nivel_de.get(indice, 0))
+            if not completo and self._cache[indice].retangulo is not None:
+                retangulos.append(self._cache[indice].retangulo)
+        pipeline.define_camera(M1)
+
+        if completo:
+            retangulos = [(0, rasterizador.largura - 1, 0, rasterizador.altura - 1)]
+        else:
+            retangulos = une_retangulos(retangulos)
+
+        escritos = pixels = 0
+        for retangulo in retangulos:
+            pixels += (retangulo[1] - retangulo[0] + 1) * (retangulo[3] - retangulo[2] + 1)
+            escritos += self._redesenha(pipeline, rasterizador, retangulo)
+
+        return RelatorioQuadro(completo, len(mudados), retangulos, pixels, escritos)
+
+    def _chave(self, indice: int) -> Tuple[int, int, int]:
+        objeto = self.objetos[indice]
+        return objeto.versao, objeto.malha.versao, self.versao_camera
+
+    def _calcula(self, pipeline, rasterizador, M1: np.ndarray, indice: int,
+                 classe: Optional[int], nivel: int = 0) -> TriangulosTela:
+        """Passa um objeto pelo pipeline e guarda os triângulos de tela"""
+        objeto = self.objetos[indice]
+        gravador = _GravadorPoligonos()
+        if classe != ClasseVolume.FORA:
+            pipeline.rasteriza_malha(
+                gravador, objeto.malha_lod(nivel), M1 @ objeto.matriz_modelo(),
+                classe=None if classe is None else ClasseVolume(classe), **self.opcoes)
+
+        triangulos = gravador.triangulos
+        cores = gravador.cores
+        if cores is None:
+            cores = np.ones((len(triangulos), 3, 3))
+        elif cores.ndim == 2:
+            cores = np.repeat(cores[:, np.newaxis, :], 3, axis=1)
+        retangulo = _retangulo_triangulos(triangulos, rasterizador.largura,
+                                          rasterizador.altura)
+        return TriangulosTela(self._chave(indice), triangulos, cores, retangulo)
+
+    def _redesenha(self, pipeline, rasterizador, retangulo: Retangulo) -> int:
+        """Limpa um retângulo e rasteriza os triângulos em cache que o tocam"""
+        x0, x1, y0, y1 = retangulo
+        rasterizador.limpa(retangulo)
+
+        # Em ordem de índice, como no desenho completo: empates de
+        # profundidade ficam com o mesmo objeto
+        tocados = [entrada for _, entrada in sorted(self._cache.items())
+                   if entrada.retangulo is not None
+                   and entrada.retangulo[0] <= x1 and x0 <= entrada.retangulo[1]
+                   and entrada.retangulo[2] <= y1 and y0 <= entrada.retangulo[3]]
+        if not tocados:
+            return 0
+
+        triangulos = np.concatenate([entrada.triangulos for entrada in tocados])
+        cores = np.concatenate([entrada.cores for entrada in tocados])
+        opcoes = {}
+        if self.opcoes.get('sombreador') is not None:
+            opcoes['sombreador'] = self.opcoes['sombreador']
+        with pipeline.perfil.estagio('rasterizacao'):
+            return rasterizador.rasteriza_triangulos(triangulos, cores, regiao=retangulo,
+                                                     **opcoes)
+
+
+# ============================================================================
+# EXEMPLO DE USO
+# ============================================================================
+
+if __name__ == "__main__":
+    from fase2_pipeline import Camera, Cubo, PipelineGrafico
+
+    print("=" * 60)
+    print("FASE 5: CENA COM VÁRIOS OBJETOS E BVH - Python")
+    print("=" * 60)
+
+    pipeline = PipelineGrafico(1.0, 30.0, 800, 600)
+    camera = Camera(vrp=(0, 2, 20), p=(0, 0, 0), near=1.0, far=30.0)
+    camera.configura(pipeline)
+
+    # 50 x 50 cubos em um plano de 200 x 200 unidades
+    cubo = Malha.de_cubo(Cubo.criar_cubo_unitario(centro=(0, 0, 0), tamanho=1))
+    lado = 50
+    grade = (np.arange(lado) - lado / 2) * 4.0
+    cena = Cena([Objeto(cubo, (x, 0.0, z)) for x in grade for z in grade])
+
+    inicio = time.perf_counter()
+    linhas = cena.processa(pipeline)
+    tempo_bvh = time.perf_counter() - inicio
+    n_classes = np.bincount(cena.visiveis(pipeline)[1], minlength=3)
+    print(f"\nObjetos: {len(cena.objetos)}, nós da BVH: {cena.bvh.n_nos}")
+    print(f"Visíveis: {len(linhas)} ({n_classes[ClasseVolume.DENTRO]} sem recorte)")
+
+    # Referência: cada objeto testado individualmente pelo pipeline
+    inicio = time.perf_counter()
+    visiveis_ref = []
+    for i, objeto in enumerate(cena.objetos):
+        M1_objeto = camera.M1 @ objeto.matriz_modelo()
+        if pipeline.processa_malha(objeto.malha, M1_objeto)[2].any():
+            visiveis_ref.append(i)
+    pipeline.define_camera(camera.M1)
+    tempo_todos = time.perf_counter() - inicio
+
+    com_arestas = [i for i, _, _, visivel in linhas if visivel.any()]
+    print(f"Mesmos objetos desenhados que sem BVH: {com_arestas == visiveis_ref}")
+    print(f"Tempo: BVH {tempo_bvh * 1000:.1f} ms, todos os objetos {tempo_todos * 1000:.1f} ms")
+
+    print("\n--- Objetos transladados (refit) ---")
+    for i in range(0, len(cena.objetos), 7):
+        cena.move(i, (500.0, 0.0, 0.0))
+    inicio = time.perf_counter()
+    indices, _ = cena.visiveis(pipeline)
+    tempo_refit = time.perf_counter() - inicio
+    referencia = np.flatnonzero(classifica_caixas(pipeline.planos_visao, *cena.caixas())
+                                != ClasseVolume.FORA)
+    print(f"Visíveis após mover: {len(indices)}; confere com teste por objeto: "
+          f"{np.array_equal(indices, referencia)}")
+    print(f"Refit + consulta: {tempo_refit * 1000:.2f} ms")
+
+    print("\n--- Cena retida (redesenho incremental) ---")
+    from fase3_rasterizacao import Rasterizador
+    camera_retida = Camera(vrp=(0, 25, 30), p=(0, 0, 0), su=0.6, sv=0.45,
+                           near=1.0, far=80.0)
+    camera_retida.configura(pipeline)
+    grade = (np.arange(12) - 6) * 4.0
+    cores_faces = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1],
+                            [1, 1, 0], [1, 0, 1], [0, 1, 1]], dtype=float)
+    retida = CenaRetida([Objeto(cubo, (x, 0.0, z)) for x in grade for z in grade],
+                        cores=cores_faces)
+    tela = Rasterizador.para_pipeline(pipeline)
+
+    inicio = time.perf_counter()
+    relatorio = retida.desenha(pipeline, tela)
+    tempo_completo = time.perf_counter() - inicio
+    print(f"Quadro completo: {relatorio.recalculados} objetos, "
+          f"{tempo_completo * 1000:.1f} ms")
+
+    for passo in range(3):
+        retida.move(passo * 13, (0.0, 1.5, 0.0))
+        inicio = time.perf_counter()
+        relatorio = retida.desenha(pipeline, tela)
+        tempo_incremental = time.perf_counter() - inicio
+
+        referencia = Rasterizador.para_pipeline(pipeline)
+        retida.rasteriza(pipeline, referencia, cores=cores_faces)
+        iguais = (np.array_equal(tela.imagem, referencia.imagem)
+                  and np.array_equal(tela.zbuffer, referencia.zbuffer))
+        print(f"Objeto {passo * 13} movido: {relatorio.recalculados} recalculado(s), "
+              f"{relatorio.pixels_refeitos} pixels refeitos em "
+              f"{len(relatorio.retangulos)} retângulo(s), "
+              f"{tempo_incremental * 1000:.1f} ms; igual ao quadro completo: {iguais}")
+
+    relatorio = retida.desenha(pipeline, tela)
+    print(f"Sem mudanças: {relatorio.recalculados} recalculados, "
+          f"{relatorio.pixels_refeitos} pixels refeitos")
+
+    print("\n--- Transformações adiadas ---")
+    # Superfície de 400 x 400 vértices
+    n = 400
+    u, v = np.meshgrid(np.linspace(-2, 2, n), np.linspace(-2, 2, n), indexing='ij')
+    vertices = np.stack([u, 0.2 * np.sin(3 * u) * np.cos(3 * v), v], axis=-1).reshape(-1, 3)
+    q = (np.arange(n - 1)[:, np.newaxis] * n + np.arange(n - 1)).ravel()
+    faces = np.concatenate([np.stack([q, q + 1, q + n + 1], axis=1),
+                            np.stack([q, q + n + 1, q + n], axis=1)])
+    superficie = Malha(vertices, faces)
+    edicoes = [(cria_matriz_rotacao((0, 1, 0), 0.05), None),
+               (cria_matriz_escala(1.01, 1.0, 0.99), None),
+               (cria_matriz_rotacao((1, 0, 1), -0.02), (0.5, 0.0, 0.0))] * 17
+
+    camera.configura(pipeline)
+    imediato = Objeto(superficie, limite_vertices=superficie.n_vertices)
+    adiado = Objeto(superficie)
+    inicio = time.perf_counter()
+    for matriz, centro in edicoes[:50]:
+        imediato.transforma(matriz, centro)
+    xy_imediato, _, vis_imediato = pipeline.processa_malha(
+        imediato.malha, camera.M1 @ imediato.matriz_modelo())
+    tempo_imediato = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for matriz, centro in edicoes[:50]:
+        adiado.transforma(matriz, centro)
+    xy_adiado, _, vis_adiado = pipeline.processa_malha(
+        adiado.malha, camera.M1 @ adiado.matriz_modelo())
+    tempo_adiado = time.perf_counter() - inicio
+    pipeline.define_camera(camera.M1)
+
+    ambos = vis_imediato & vis_adiado
+    print(f"{superficie.n_vertices} vértices, 50 edições: aplicando nos vértices "
+          f"{tempo_imediato * 1000:.1f} ms, adiado {tempo_adiado * 1000:.1f} ms")
+    print(f"Desvio em tela: {int(np.abs(xy_imediato[ambos] - xy_adiado[ambos]).max())} "
+          f"pixel(s); visibilidade diferente: {int((vis_imediato != vis_adiado).sum())}")
+    adiado.consolida()
+    print(f"Após consolidar: maior diferença nos vértices "
+          f"{np.abs(adiado.malha.vertices + adiado.deslocamento - imediato.malha.vertices - imediato.deslocamento).max():.1e}")
+
+    print("\n--- Níveis de detalhe ---")
+    # Esfera UV de 64 x 128 vértices, cor pela normal
+    nt, nf = 64, 128
+    theta, phi = np.meshgrid(np.linspace(0.05, np.pi - 0.05, nt),
+                             np.linspace(0, 2 * np.pi, nf), indexing='ij')
+    direcoes = np.stack([np.sin(theta) * np.cos(phi), np.cos(theta),
+                         np.sin(theta) * np.sin(phi)], axis=-1).reshape(-1, 3)
+    q = (np.arange(nt - 1)[:, np.newaxis] * nf + np.arange(nf - 1)).ravel()
+    faces = np.concatenate([np.stack([q, q + 1, q + nf + 1], axis=1),
+                            np.stack([q, q + nf + 1, q + nf], axis=1)])
+    esfera = Malha(direcoes, faces, cores=(direcoes + 1) / 2)
+
+    inicio = time.perf_counter()
+    cadeia = CadeiaLOD.cria(esfera)
+    print(f"Cadeia em {(time.perf_counter() - inicio) * 1000:.1f} ms: vértices "
+          f"{[nivel.n_vertices for nivel in cadeia.niveis]}, erros "
+          f"{np.round(cadeia.erros, 3).tolist()}")
+
+    # 200 esferas espalhadas em profundidade
+    pipeline = PipelineGrafico(1.0, 300.0, 800, 600)
+    camera = Camera(vrp=(0, 2, 20), p=(0, 0, 0), near=1.0, far=300.0)
+    camera.configura(pipeline)
+    gerador = np.random.default_rng(1)
+    posicoes = np.column_stack([gerador.uniform(-40, 40, 200), gerador.uniform(-5, 5, 200),
+                                -np.linspace(0, 250, 200)])
+    cena_lod = Cena([Objeto(esfera, p, lod=cadeia) for p in posicoes])
+
+    imagens = {}
+    for tolerancia in (None, 1.0):
+        cena_lod.tolerancia_lod = tolerancia
+        pipeline.habilita_perfil()
+        tela = Rasterizador.para_pipeline(pipeline)
+        inicio = time.perf_counter()
+        cena_lod.rasteriza(pipeline, tela)
+        tempo = time.perf_counter() - inicio
+        imagens[tolerancia] = tela.imagem
+        estatisticas = pipeline.perfil.estatisticas()
+        print(f"Tolerância {tolerancia}: {estatisticas['contadores']['vertices']} vértices "
+              f"projetados, {tempo * 1000:.1f} ms")
+    niveis = [nivel for nivel, _ in estatisticas['lod'].values()]
+    erros = [erro for _, erro in estatisticas['lod'].values()]
+    print(f"Objetos por nível: {np.bincount(niveis).tolist()}; maior erro "
+          f"{max(erros):.2f} pixel(s); vértices poupados "
+          f"{estatisticas['contadores']['vertices_poupados_lod']}")
+    diferentes = np.count_nonzero(np.abs(imagens[None] - imagens[1.0]).max(axis=-1) > 0)
+    print(f"Pixels diferentes da imagem sem LOD: {diferentes} de "
+          f"{imagens[None].shape[0] * imagens[None].shape[1]}")
@@ -0,0 +1,539 @@
+"""
+Leitura de malhas de arquivos OBJ e PLY
+
+1. OBJ lido em blocos de linhas (sem carregar o arquivo inteiro em texto)
+2. PLY ASCII lido em blocos
+3. PLY binário mapeado em memória com np.memmap
+4. Blocos de (vértices, arestas) para PipelineGrafico.processa_fluxo
+5. Instantâneo binário de malhas pré-processadas (geometria e dados
+   derivados), carregado com np.memmap
+"""
+
+import itertools
+import os
+import struct
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fase2_pipeline import Malha, arestas_unicas
+
+# ============================================================================
+# OBJ
+# ============================================================================
+
+def le_obj_em_blocos(caminho: str, linhas_por_bloco: int = 1 << 16
+                     ) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]]:
+    """
+    Lê um OBJ bloco a bloco
+
+    Apenas 'v' e 'f' são interpretados; 'v x y z r g b' traz cor por
+    vértice. Faces com mais de 3 vértices são divididas em leque. Os
+    índices das faces são absolutos (base 0), então podem apontar para
+    vértices de blocos anteriores; índices negativos são relativos aos
+    vértices lidos até a linha da face.
+
+    Args:
+        caminho: Caminho do arquivo .obj
+        linhas_por_bloco: Linhas de texto lidas por bloco
+
+    Yields:
+        Tupla (vertices (n, 3), cores (n, 3) ou None, faces (m, 3) int32)
+    """
+    n_vertices = 0
+
+    with open(caminho, 'r') as arquivo:
+        while True:
+            linhas = list(itertools.islice(arquivo, linhas_por_bloco))
+            if not linhas:
+                break
+
+            # Cada face guarda quantos vértices já tinham sido lidos
+            linhas_v = []
+            linhas_f = []
+            for linha in linhas:
+                if linha.startswith('v '):
+                    linhas_v.append(linha)
+                elif linha.startswith('f '):
+                    linhas_f.append((linha, n_vertices + len(linhas_v)))
+
+            vertices, cores = _vertices_obj(linhas_v)
+            n_vertices += len(vertices)
+
+            faces = _faces_obj(linhas_f)
+            yield vertices, cores, faces
+
+
+def carrega_obj(caminho: str, linhas_por_bloco: int = 1 << 16) -> Malha:
+    """
+    Carrega uma malha OBJ inteira
+
+    Args:
+        caminho: Caminho do arquivo .obj
+        linhas_por_bloco: Linhas de texto lidas por bloco
+
+    Returns:
+        Malha triangulada
+    """
+    blocos_v: List[np.ndarray] = []
+    blocos_c: List[np.ndarray] = []
+    blocos_f: List[np.ndarray] = []
+    tem_cor = True
+
+    for vertices, cores, faces in le_obj_em_blocos(caminho, linhas_por_bloco):
+        blocos_v.append(vertices)
+        blocos_f.append(faces)
+        if len(vertices):
+            tem_cor = tem_cor and cores is not None
+            if cores is not None:
+                blocos_c.append(cores)
+
+    vertices = np.concatenate(blocos_v) if blocos_v else np.zeros((0, 3))
+    faces = np.concatenate(blocos_f) if blocos_f else np.zeros((0, 3), dtype=np.int32)
+    cores = np.concatenate(blocos_c) if tem_cor and blocos_c else None
+
+    return Malha(vertices, faces, cores=cores)
+
+
+def _vertices_obj(linhas: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Converte linhas 'v ...' de um bloco em arrays"""
+    if not linhas:
+        return np.zeros((0, 3)), None
+
+    campos = [l.split()[1:] for l in linhas]
+    n_campos = min(len(c) for c in campos)
+
+    if n_campos >= 6:
+        valores = np.array([c[:6] for c in campos], dtype=float)
+        return valores[:, :3], valores[:, 3:6]
+
+    valores = np.array([c[:3] for c in campos], dtype=float)
+    return valores, None
+
+
+def _faces_obj(linhas: List[Tuple[str, int]]) -> np.ndarray:
+    """
+    Converte linhas 'f ...' de um bloco em triângulos (base 0)
+
+    Cada linha vem com o número de vértices lidos antes dela, base dos
+    índices negativos.
+    """
+    triangulos = []
+
+    for linha, n_vertices in linhas:
+        # 'f v/vt/vn ...': só o índice do vértice interessa
+        idx = [int(campo.split('/')[0]) for campo in linha.split()[1:]]
+        idx = [i - 1 if i > 0 else n_vertices + i for i in idx]
+        for k in range(1, len(idx) - 1):
+            triangulos.append((idx[0], idx[k], idx[k + 1]))
+
+    return np.array(triangulos, dtype=np.int32).reshape(-1, 3)
+
+
+# ============================================================================
+# PLY
+# ============================================================================
+
+# Tipos escalares do cabeçalho PLY
+_TIPOS_PLY = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+def _le_cabecalho_ply(arquivo) -> Tuple[str, list, int]:
+    """
+    Lê o cabeçalho PLY
+
+    Returns:
+        Tupla (formato, elementos, tamanho do cabeçalho em bytes). Cada
+        elemento é (nome, quantidade, propriedades) e cada propriedade é
+        (nome, tipo) ou (nome, (tipo_contagem, tipo_item)) para listas.
+    """
+    if arquivo.readline().strip() != b'ply':
+        raise ValueError("Arquivo não é PLY")
+
+    formato = None
+    elementos = []
+    while True:
+        linha = arquivo.readline()
+        if not linha:
+            raise ValueError("Cabeçalho PLY sem end_header")
+        partes = linha.decode('ascii').split()
+        if not partes or partes[0] in ('comment', 'obj_info'):
+            continue
+        if partes[0] == 'end_header':
+            break
+        if partes[0] == 'format':
+            formato = partes[1]
+        elif partes[0] == 'element':
+            elementos.append((partes[1], int(partes[2]), []))
+        elif partes[0] == 'property':
+            if partes[1] == 'list':
+                tipo = (_TIPOS_PLY[partes[2]], _TIPOS_PLY[partes[3]])
+                elementos[-1][2].append((partes[4], tipo))
+            else:
+                elementos[-1][2].append((partes[2], _TIPOS_PLY[partes[1]]))
+
+    return formato, elementos, arquivo.tell()
+
+
+def carrega_ply(caminho: str, mmap: bool = True,
+                linhas_por_bloco: int = 1 << 16) -> Malha:
+    """
+    Carrega uma malha PLY (ASCII ou binária)
+
+    No formato binário os vértices são lidos com np.memmap; se o elemento
+    vertex tiver apenas x, y, z do mesmo tipo, a malha usa o mapa direto,
+    sem cópia. Faces com mais de 3 vértices são divididas em leque.
+
+    Args:
+        caminho: Caminho do arquivo .ply
+        mmap: Se True, mapeia o arquivo binário em vez de lê-lo
+        linhas_por_bloco: Linhas lidas por bloco no formato ASCII
+
+    Returns:
+        Malha com normais e cores quando presentes no arquivo
+    """
+    with open(caminho, 'rb') as arquivo:
+        formato, elementos, inicio = _le_cabecalho_ply(arquivo)
+
+    nomes = [e[0] for e in elementos]
+    if nomes[:1] != ['vertex']:
+        raise ValueError(f"Layout PLY não suportado: {nomes}")
+    # Só um elemento face logo após vertex é lido; o resto é ignorado
+    elementos = elementos[:2] if nomes[1:2] == ['face'] else elementos[:1]
+
+    if formato == 'ascii':
+        return _carrega_ply_ascii(caminho, elementos, inicio, linhas_por_bloco)
+    if formato in ('binary_little_endian', 'binary_big_endian'):
+        ordem = '<' if formato == 'binary_little_endian' else '>'
+        return _carrega_ply_binario(caminho, elementos, inicio, ordem, mmap)
+    raise ValueError(f"Formato PLY desconhecido: {formato}")
+
+
+def _malha_ply(campos_v: dict, faces: np.ndarray, vertices=None) -> Malha:
+    """Monta a Malha a partir das colunas do elemento vertex"""
+    if vertices is None:
+        vertices = np.stack([campos_v['x'], campos_v['y'], campos_v['z']], axis=1)
+
+    normais = None
+    if all(n in campos_v for n in ('nx', 'ny', 'nz')):
+        normais = np.stack([campos_v['nx'], campos_v['ny'], campos_v['nz']], axis=1)
+
+    cores = None
+    if all(n in campos_v for n in ('red', 'green', 'blue')):
+        cores = np.stack([campos_v['red'], campos_v['green'], campos_v['blue']],
+                         axis=1).astype(float)
+        if np.issubdtype(campos_v['red'].dtype, np.integer):
+            cores /= 255.0
+
+    return Malha(vertices, faces, normais=normais, cores=cores)
+
+
+def _triangula_listas(indices: List[np.ndarray]) -> np.ndarray:
+    """Divide em leque faces de tamanhos variados"""
+    triangulos = []
+    for idx in indices:
+        for k in range(1, len(idx) - 1):
+            triangulos.append((idx[0], idx[k], idx[k + 1]))
+    return np.array(triangulos, dtype=np.int32).reshape(-1, 3)
+
+
+def _carrega_ply_ascii(caminho: str, elementos: list, inicio: int,
+                       linhas_por_bloco: int) -> Malha:
+    """Lê PLY ASCII em blocos de linhas"""
+    _, n_vertices, props_v = elementos[0]
+    n_faces = elementos[1][1] if len(elementos) > 1 else 0
+
+    blocos_v = []
+    faces = []
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        texto = (linha.decode('ascii') for linha in arquivo)
+
+        restantes = n_vertices
+        while restantes > 0:
+            n = min(linhas_por_bloco, restantes)
+            bloco = np.loadtxt(itertools.islice(texto, n), ndmin=2)
+            blocos_v.append(bloco[:, :len(props_v)])
+            restantes -= n
+
+        for linha in itertools.islice(texto, n_faces):
+            valores = linha.split()
+            n = int(valores[0])
+            faces.append(np.array(valores[1:n + 1], dtype=np.int64))
+
+    valores_v = np.concatenate(blocos_v) if blocos_v else np.zeros((0, len(props_v)))
+    campos_v = {nome: valores_v[:, i].astype(tipo)
+                for i, (nome, tipo) in enumerate(props_v)}
+
+    return _malha_ply(campos_v, _triangula_listas(faces))
+
+
+def _carrega_ply_binario(caminho: str, elementos: list, inicio: int,
+                         ordem: str, mmap: bool) -> Malha:
+    """Lê PLY binário, mapeando os vértices em memória"""
+    _, n_vertices, props_v = elementos[0]
+    if any(isinstance(tipo, tuple) for _, tipo in props_v):
+        raise ValueError("Propriedades de lista no elemento vertex não são suportadas")
+
+    tipo_v = np.dtype([(nome, ordem + tipo) for nome, tipo in props_v])
+    if mmap:
+        dados_v = np.memmap(caminho, dtype=tipo_v, mode='r',
+                            offset=inicio, shape=(n_vertices,))
+    else:
+        dados_v = np.fromfile(caminho, dtype=tipo_v, count=n_vertices, offset=inicio)
+
+    # Apenas x, y, z do mesmo tipo: usa o mapa como (N, 3) sem cópia
+    vertices = None
+    nomes_v = [nome for nome, _ in props_v]
+    tipos_v = {tipo for _, tipo in props_v}
+    if nomes_v == ['x', 'y', 'z'] and len(tipos_v) == 1 and n_vertices:
+        vertices = dados_v.view(ordem + tipos_v.pop()).reshape(n_vertices, 3)
+
+    faces = np.zeros((0, 3), dtype=np.int32)
+    if len(elementos) > 1:
+        _, n_faces, props_f = elementos[1]
+        inicio_f = inicio + n_vertices * tipo_v.itemsize
+        faces = _le_faces_binarias(caminho, inicio_f, n_faces, props_f, ordem, mmap)
+
+    campos_v = {nome: dados_v[nome] for nome in nomes_v}
+    return _malha_ply(campos_v, faces, vertices)
+
+
+def _le_faces_binarias(caminho: str, inicio: int, n_faces: int,
+                       props_f: list, ordem: str, mmap: bool) -> np.ndarray:
+    """
+    Lê o elemento face binário
+
+    O caso comum (só a lista de índices, todas as faces triangulares) é
+    lido de uma vez como array estruturado; o resto cai em um laço.
+    """
+    if len(props_f) != 1 or not isinstance(props_f[0][1], tuple):
+        raise ValueError("Elemento face deve ter apenas a lista de índices")
+
+    tipo_n, tipo_i = props_f[0][1]
+    tipo_tri = np.dtype([('n', ordem + tipo_n), ('v', ordem + tipo_i, 3)])
+
+    dados = np.fromfile(caminho, dtype=np.uint8, offset=inicio) if not mmap else \
+        np.memmap(caminho, dtype=np.uint8, mode='r', offset=inicio)
+
+    if len(dados) >= n_faces * tipo_tri.itemsize:
+        tri = dados[:n_faces * tipo_tri.itemsize].view(tipo_tri)
+        if np.all(tri['n'] == 3):
+            return tri['v'].astype(np.int32)
+
+    # Faces de tamanhos variados
+    tam_n = np.dtype(tipo_n).itemsize
+    tam_i = np.dtype(tipo_i).itemsize
+    faces = []
+    pos = 0
+    for _ in range(n_faces):
+        n = int(dados[pos:pos + tam_n].view(ordem + tipo_n)[0])
+        pos += tam_n
+        faces.append(dados[pos:pos + n * tam_i].view(ordem + tipo_i))
+        pos += n * tam_i
+
+    return _triangula_listas(faces)
+
+
+# ============================================================================
+# BLOCOS PARA O PROCESSAMENTO EM FLUXO
+# ============================================================================
+
+def le_arestas_obj_em_blocos(caminho: str, linhas_por_bloco: int = 1 << 16
+                             ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Blocos (vertices, arestas) de um OBJ para PipelineGrafico.processa_fluxo
+
+    As arestas são únicas dentro de cada bloco; uma aresta compartilhada
+    por faces de blocos diferentes aparece uma vez em cada um.
+
+    Args:
+        caminho: Caminho do arquivo .obj
+        linhas_por_bloco: Linhas de texto lidas por bloco
+
+    Yields:
+        Tupla (vertices (n, 3), arestas (e, 2) com índices absolutos)
+    """
+    for vertices, _, faces in le_obj_em_blocos(caminho, linhas_por_bloco):
+        yield vertices, arestas_unicas(faces)
+
+
+def blocos_malha(malha: Malha, faces_por_bloco: int = 1 << 16
+                 ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Divide uma malha (por exemplo com vértices em np.memmap) em blocos
+
+    Faces e vértices são cortados no mesmo número de fatias, de modo que
+    cada bloco traz a fração correspondente dos vértices. Em arquivos com
+    boa localidade, quase todas as arestas caem na janela de vértices;
+    as demais são relidas de malha.vertices (passe-o como
+    vertices_origem).
+
+    Args:
+        malha: Malha de origem
+        faces_por_bloco: Faces por bloco
+
+    Yields:
+        Tupla (vertices (n, 3), arestas (e, 2) com índices absolutos)
+    """
+    n_faces = len(malha.faces)
+    n_blocos = max(1, -(-n_faces // faces_por_bloco))
+    cortes_v = np.linspace(0, malha.n_vertices, n_blocos + 1).astype(np.int64)
+
+    for i in range(n_blocos):
+        vertices = malha.vertices[cortes_v[i]:cortes_v[i + 1]]
+        faces = malha.faces[i * faces_por_bloco:(i + 1) * faces_por_bloco]
+        yield np.asarray(vertices, dtype=float), arestas_unicas(faces)
+
+
+# ============================================================================
+# INSTANTÂNEO PRÉ-PROCESSADO
+# ============================================================================
+
+# Layout (little-endian):
+#   cabeçalho: mágico, versão, alinhamento, número de malhas e de arrays
+#   índice: uma entrada por array (malha, nome, dtype, forma, deslocamento)
+#   dados: cada array contíguo (ordem C), começando em um múltiplo de
+#          ALINHAMENTO_INSTANTANEO bytes a partir do início do arquivo
+# Os dados derivados (ver Malha.derivados) são gravados junto com a
+# geometria, então a carga não recalcula nada.
+
+MAGICO_INSTANTANEO = b'CGMALHAS'
+VERSAO_INSTANTANEO = 1
+ALINHAMENTO_INSTANTANEO = 64
+_CABECALHO_INSTANTANEO = struct.Struct('<8sHHII')
+_ENTRADA_INSTANTANEO = struct.Struct('<I24s8sB3x3QQ')
+_CAMPOS_MALHA = ('vertices', 'faces', 'arestas', 'normais', 'cores')
+
+
+def _alinha(posicao: int) -> int:
+    return -(-posicao // ALINHAMENTO_INSTANTANEO) * ALINHAMENTO_INSTANTANEO
+
+
+def salva_instantaneo(caminho: str, malhas: Sequence[Malha],
+                      derivados: bool = True) -> int:
+    """
+    Grava malhas e seus dados derivados em um arquivo binário alinhado
+
+    O arquivo é escrito com outro nome e renomeado no fim, para que um
+    leitor nunca veja um instantâneo pela metade.
+
+    Args:
+        caminho: Arquivo de saída (extensão .cgm por convenção)
+        malhas: Malhas a gravar, na ordem em que serão carregadas
+        derivados: Se True, calcula e grava também normais, planos das
+            faces e volumes envolventes
+
+    Returns:
+        Tamanho do arquivo em bytes
+    """
+    arrays = []
+    for indice, malha in enumerate(malhas):
+        campos = {nome: getattr(malha, nome) for nome in _CAMPOS_MALHA}
+        if derivados:
+            campos.update(malha.derivados())
+        for nome, dados in campos.items():
+            if dados is None:
+                continue
+            dados = np.asarray(dados)
+            if dados.ndim > 3 or len(nome) > 24:
+                raise ValueError(f"Array não suportado no instantâneo: {nome} {dados.shape}")
+            arrays.append((indice, nome, np.ascontiguousarray(
+                dados, dtype=dados.dtype.newbyteorder('<'))))
+
+    posicao = _alinha(_CABECALHO_INSTANTANEO.size + len(arrays) * _ENTRADA_INSTANTANEO.size)
+    entradas = []
+    for indice, nome, dados in arrays:
+        forma = tuple(dados.shape) + (0,) * (3 - dados.ndim)
+        entradas.append(_ENTRADA_INSTANTANEO.pack(
+            indice, nome.encode('ascii'), dados.dtype.str.encode('ascii'),
+            dados.ndim, *forma, posicao))
+        posicao = _alinha(posicao + dados.nbytes)
+
+    temporario = caminho + '.parcial'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(_CABECALHO_INSTANTANEO.pack(
+            MAGICO_INSTANTANEO, VERSAO_INSTANTANEO, ALINHAMENTO_INSTANTANEO,
+            len(malhas), len(arrays)))
+        arquivo.write(b''.join(entradas))
+        for _, _, dados in arrays:
+            arquivo.write(b'\0' * (_alinha(arquivo.tell()) - arquivo.tell()))
+            arquivo.write(dados.data)
+        tamanho = arquivo.tell()
+    os.replace(temporario, caminho)
+    return tamanho
+
+
+def le_indice_instantaneo(caminho: str) -> Tuple[int, List[Tuple[int, str, np.dtype, tuple, int]]]:
+    """
+    Lê só o cabeçalho e o índice de um instantâneo
+
+    Returns:
+        Tupla (número de malhas, entradas (malha, nome, dtype, forma,
+        deslocamento))
+    """
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.read(_CABECALHO_INSTANTANEO.size)
+        if len(cabecalho) < _CABECALHO_INSTANTANEO.size:
+            raise ValueError(f"Instantâneo truncado: {caminho}")
+        magico, versao, alinhamento, n_malhas, n_arrays = \
+            _CABECALHO_INSTANTANEO.unpack(cabecalho)
+        if magico != MAGICO_INSTANTANEO:
+            raise ValueError(f"Não é um instantâneo de malhas: {caminho}")
+        if versao != VERSAO_INSTANTANEO:
+            raise ValueError(f"Versão de instantâneo não suportada: {versao}")
+
+        dados = arquivo.read(n_arrays * _ENTRADA_INSTANTANEO.size)
+        if len(dados) < n_arrays * _ENTRADA_INSTANTANEO.size:
+            raise ValueError(f"Instantâneo truncado: {caminho}")
+
+    entradas = []
+    for campos in _ENTRADA_INSTANTANEO.iter_unpack(dados):
+        indice, nome, dtype, ndim = campos[:4]
+        forma, deslocamento = campos[4:4 + ndim], campos[7]
+        entradas.append((indice, nome.rstrip(b'\0').decode('ascii'),
+                         np.dtype(dtype.rstrip(b'\0').decode('ascii')),
+                         tuple(forma), deslocamento))
+    return n_malhas, entradas
+
+
+def carrega_instantaneo(caminho: str, mmap: bool = True) -> List[Malha]:
+    """
+    Carrega as malhas de um instantâneo gravado por salva_instantaneo
+
+    Com mmap=True o arquivo é mapeado uma única vez e todos os arrays
+    (vértices, faces e derivados) são visões somente leitura do mapa:
+    nada é lido ou recalculado na carga, e processos que abrem o mesmo
+    arquivo compartilham as páginas pelo cache do sistema operacional.
+
+    Args:
+        caminho: Arquivo .cgm
+        mmap: Se False, lê o arquivo inteiro para a memória
+
+    Returns:
+        Lista de malhas com os dados derivados já instalados
+    """
+    n_malhas, entradas = le_indice_instantaneo(caminho)
+    if mmap:
+        mapa = np.memmap(caminho, dtype=np.uint8, mode='r')
+    else:
+        mapa = np.fromfile(caminho, dtype=np.uint8)
+
+    campos: List[Dict[str, np.ndarray]] = [{} for _ in range(n_malhas)]
+    for indice, nome, dtype, forma, deslocamento in entradas:
+        tamanho = int(np.prod(forma, dtype=np.int64)) * dtype.itemsize
+        if deslocamento + tamanho > len(mapa):
+            raise ValueError(f"Instantâneo truncado: {caminho}")
+        campos[indice][nome] = np.ndarray(forma, dtype=dtype, buffer=mapa,
+                                          offset=deslocamento)
+
+    malhas = []
+    for dados in campos:
+        malha = Malha(**{nome: dados.get(nome) for nome in _CAMPOS_MALHA})
+        malha.restaura_derivados(dados)
+        malhas.append(malha)
+    return malhas
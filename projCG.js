@@ -61,6 +61,9 @@ function setup() {
   face[0][1].concat([1]);
   face[0][2].concat([1]);
   face[0][3].concat([1]);*/
+
+  // Quadros do servidor, quando houver; sem ele o cubo local é desenhado
+  connectFrameServer();
 }
 
 function draw() {
@@ -68,6 +71,11 @@ function draw() {
   noFill(); // Para ver através do cubo
   stroke(0); // Linhas pretas
 
+  if (latestFrame !== null) {
+    drawLatestFrame();
+    return;
+  }
+
   let viewMatrix = createViewMatrix();
   let viewProjectionMatrix = multiplyMatrices(projectionMatrix, viewMatrix);
 
@@ -310,4 +318,166 @@ function clipFaceAgainstNear(faceVertices, near) {
   return result;
 }*/
 
-// TEM QUE FAZER PARA O FAR TBM OU UNIR
\ No newline at end of file
+// TEM QUE FAZER PARA O FAR TBM OU UNIR
+/**** QUADROS BINÁRIOS DO PIPELINE PYTHON */
+
+// Formato escrito por escreve_quadro (fase2_pipeline.py), little-endian:
+// cabeçalho de 24 bytes ("CGQD", versão u16, bytes por segmento u16,
+// nº de segmentos u32, nº do quadro u32, largura u32, altura u32)
+// seguido de n segmentos (x0 i32, y0 i32, z0 f32, x1 i32, y1 i32, z1 f32).
+// Cabeçalho e registros têm múltiplos de 4 bytes, então os typed arrays
+// apontam direto para o buffer, sem cópia.
+const FRAME_HEADER_BYTES = 24;
+const SEGMENT_WORDS = 6;
+
+function readSegmentFrame(buffer, offset = 0) {
+  let header = new DataView(buffer, offset, FRAME_HEADER_BYTES);
+  let magic = String.fromCharCode(
+    header.getUint8(0), header.getUint8(1), header.getUint8(2), header.getUint8(3)
+  );
+  if (magic !== "CGQD") {
+    throw new Error("Quadro inválido na posição " + offset);
+  }
+  let segmentBytes = header.getUint16(6, true);
+  let count = header.getUint32(8, true);
+  let start = offset + FRAME_HEADER_BYTES;
+
+  return {
+    number: header.getUint32(12, true),
+    width: header.getUint32(16, true),
+    height: header.getUint32(20, true),
+    count: count,
+    // Mesma memória vista como inteiros (x, y) e como floats (z)
+    ints: new Int32Array(buffer, start, count * SEGMENT_WORDS),
+    floats: new Float32Array(buffer, start, count * SEGMENT_WORDS),
+    next: start + count * segmentBytes,
+  };
+}
+
+function readSegmentFrames(buffer) {
+  // Vários quadros podem vir concatenados no mesmo arquivo
+  let frames = [];
+  let offset = 0;
+  while (offset < buffer.byteLength) {
+    let frame = readSegmentFrame(buffer, offset);
+    frames.push(frame);
+    offset = frame.next;
+  }
+  return frames;
+}
+
+function drawSegmentFrame(frame) {
+  let s = frame.ints;
+  for (let i = 0; i < frame.count; i++) {
+    let k = i * SEGMENT_WORDS;
+    line(s[k], s[k + 1], s[k + 3], s[k + 4]);
+  }
+}
+
+/**** CONEXÃO COM O SERVIDOR DE QUADROS (servidor_quadros.py) */
+
+// Mensagens binárias recebidas: quadros de segmentos ("CGQD", acima) ou
+// imagens ("CGIM": cabeçalho de 20 bytes com versão u16, canais u16,
+// nº do quadro u32, largura u32 e altura u32, seguido dos pixels RGB).
+// Mensagens de texto enviadas: comandos de câmera em JSON.
+const IMAGE_HEADER_BYTES = 20;
+
+let frameServer = null;
+let latestFrame = null;
+
+function messageMagic(buffer) {
+  let bytes = new Uint8Array(buffer, 0, 4);
+  return String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]);
+}
+
+function readImageFrame(buffer) {
+  let header = new DataView(buffer, 0, IMAGE_HEADER_BYTES);
+  if (messageMagic(buffer) !== "CGIM") {
+    throw new Error("Mensagem de imagem inválida");
+  }
+  let channels = header.getUint16(6, true);
+  let width = header.getUint32(12, true);
+  let height = header.getUint32(16, true);
+
+  return {
+    number: header.getUint32(8, true),
+    width: width,
+    height: height,
+    channels: channels,
+    pixels: new Uint8Array(buffer, IMAGE_HEADER_BYTES, width * height * channels),
+  };
+}
+
+function connectFrameServer(url = "ws://127.0.0.1:8765/ws") {
+  frameServer = new WebSocket(url);
+  frameServer.binaryType = "arraybuffer";
+  frameServer.onmessage = (event) => {
+    if (typeof event.data === "string") {
+      console.warn("Servidor de quadros:", event.data);
+      return;
+    }
+    // Só o quadro mais recente fica guardado; draw() desenha no seu ritmo
+    latestFrame = messageMagic(event.data) === "CGIM"
+      ? readImageFrame(event.data)
+      : readSegmentFrame(event.data);
+  };
+  frameServer.onclose = () => {
+    // Volta ao desenho local
+    frameServer = null;
+    latestFrame = null;
+  };
+  return frameServer;
+}
+
+function sendCameraCommand(command) {
+  if (frameServer !== null && frameServer.readyState === 1) {
+    frameServer.send(JSON.stringify(command));
+  }
+}
+
+function cameraCommandForKey(k) {
+  // Setas orbitam em torno do ponto focal, + e - aproximam e afastam
+  switch (k) {
+    case "ArrowLeft": return { tipo: "orbita", azimute: -0.1 };
+    case "ArrowRight": return { tipo: "orbita", azimute: 0.1 };
+    case "ArrowUp": return { tipo: "orbita", elevacao: 0.1 };
+    case "ArrowDown": return { tipo: "orbita", elevacao: -0.1 };
+    case "+": return { tipo: "aproxima", distancia: 0.5 };
+    case "-": return { tipo: "aproxima", distancia: -0.5 };
+    default: return null;
+  }
+}
+
+function drawImageFrame(frame) {
+  let img = createImage(frame.width, frame.height);
+  img.loadPixels();
+  let n = frame.width * frame.height;
+  for (let i = 0; i < n; i++) {
+    for (let c = 0; c < 3; c++) {
+      img.pixels[4 * i + c] = frame.pixels[frame.channels * i + c];
+    }
+    img.pixels[4 * i + 3] = 255;
+  }
+  img.updatePixels();
+  image(img, 0, 0);
+}
+
+function drawLatestFrame() {
+  if (latestFrame === null) {
+    return;
+  }
+  if (latestFrame.pixels !== undefined) {
+    drawImageFrame(latestFrame);
+  } else {
+    drawSegmentFrame(latestFrame);
+  }
+}
+
+function keyPressed() {
+  let command = cameraCommandForKey(key);
+  if (command === null) {
+    return true;
+  }
+  sendCameraCommand(command);
+  return false; // Setas não rolam a página
+}
@@ -0,0 +1,525 @@
+"""
+Renderizador em lote (sem janela) de percursos de câmera
+
+1. Descrição de cena em JSON: objetos, quadros-chave da câmera, luzes e viewport
+2. Quadros-chave interpolados e todas as matrizes M1 montadas de uma vez
+3. Quadros distribuídos em um pool de processos, com um pipeline por processo
+4. Imagens PPM ou PNG gravadas apenas com a biblioteca padrão (zlib)
+5. Retomada: quadros já gravados são pulados; relatório de tempo por quadro
+6. Instantâneo da geometria pré-processada: os processos mapeiam o mesmo
+   arquivo em vez de receber as malhas e recalcular os dados derivados
+
+Uso:
+    python renderizador_lote.py cena_exemplo.json --saida quadros/
+    python renderizador_lote.py cena.json --saida quadros/ --formato png --processos 4
+    python renderizador_lote.py cena.json --instantaneo cena.cgm --processos 4
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fase2_pipeline import (
+    Cubo, Malha, PipelineGrafico, cria_matrizes_visualizacao
+)
+from fase3_rasterizacao import Rasterizador
+from fase4_iluminacao import (
+    Iluminacao, Lampada, Material, ModoTonalizacao, ilumina_malha
+)
+from leitores_malha import (
+    carrega_instantaneo, carrega_obj, carrega_ply, salva_instantaneo
+)
+
+# ============================================================================
+# DESCRIÇÃO DA CENA
+# ============================================================================
+
+# Formato do JSON (caminhos relativos ao próprio arquivo):
+#
+# {
+#   "viewport": {"largura": 640, "altura": 480, "cor_fundo": [0, 0, 0]},
+#   "camera": {"near": 1, "far": 30, "quadros": 48,
+#              "janela": {"su": 1, "sv": 1, "dp": 1},
+#              "chaves": [{"quadro": 0, "vrp": [0, 2, 10], "p": [0, 0, 0],
+#                          "view_up": [0, 1, 0]}, ...]},
+#   "luzes": {"ambiente": [0.2, 0.2, 0.2],
+#             "lampadas": [{"posicao": [5, 5, 5], "cor": [1, 1, 1]}]},
+#   "modo": "gouraud",
+#   "objetos": [{"arquivo": "malha.obj", "deslocamento": [0, 0, 0],
+#                "material": {"kd": [0.8, 0.2, 0.2]}, "modo": "phong"},
+#               {"cubo": {"centro": [3, 0, 0], "tamanho": 2}}]
+# }
+#
+# "modo" aceita os valores de ModoTonalizacao e também "aramado" (arestas
+# com linhas ocultas removidas, na cor kd do material).
+# "arquivo" aceita .obj, .ply e instantâneos .cgm (com "indice" da malha
+# no arquivo, padrão 0).
+
+MODO_ARAMADO = 'aramado'
+FORMATOS = ('ppm', 'png')
+
+
+@dataclass
+class ObjetoLote:
+    """Malha já posicionada no SRU, com material e modo de tonalização"""
+    malha: Malha
+    material: Material = field(default_factory=Material)
+    modo: str = ModoTonalizacao.GOURAUD.value
+
+
+@dataclass
+class CenaLote:
+    """Tudo o que um processo precisa para renderizar qualquer quadro"""
+    largura: int
+    altura: int
+    near: float
+    far: float
+    objetos: List[ObjetoLote]
+    iluminacao: Iluminacao
+    matrizes: np.ndarray  # (Q, 4, 4), uma M1 por quadro
+    cor_fundo: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    instantaneo: Optional[str] = None  # arquivo .cgm com as malhas dos objetos
+
+    @property
+    def n_quadros(self) -> int:
+        return len(self.matrizes)
+
+    def sem_malhas(self) -> 'CenaLote':
+        """
+        Cópia sem as malhas, para enviar a outros processos
+
+        Só faz sentido com instantâneo: cada processo remapeia o arquivo
+        com restaura_malhas.
+        """
+        objetos = [dataclasses.replace(objeto, malha=None) for objeto in self.objetos]
+        return dataclasses.replace(self, objetos=objetos)
+
+    def restaura_malhas(self):
+        """Liga cada objeto à sua malha no instantâneo (mapeado, sem cópia)"""
+        malhas = carrega_instantaneo(self.instantaneo)
+        if len(malhas) != len(self.objetos):
+            raise ValueError(f"Instantâneo com {len(malhas)} malhas para "
+                             f"{len(self.objetos)} objetos: {self.instantaneo}")
+        for objeto, malha in zip(self.objetos, malhas):
+            objeto.malha = malha
+
+
+def interpola_chaves(chaves: Sequence[dict], n_quadros: int
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Interpola linearmente VRP, ponto focal e View-Up entre quadros-chave
+
+    Antes da primeira e depois da última chave a câmera fica parada.
+
+    Args:
+        chaves: Dicionários com 'quadro', 'vrp', 'p' e opcionalmente
+            'view_up'
+        n_quadros: Número total de quadros
+
+    Returns:
+        Tupla (vrps, focos, view_ups) de arrays (Q, 3)
+    """
+    if not chaves:
+        raise ValueError("A câmera precisa de pelo menos um quadro-chave")
+    chaves = sorted(chaves, key=lambda chave: chave['quadro'])
+    tempos = np.array([chave['quadro'] for chave in chaves], dtype=float)
+    quadros = np.arange(n_quadros, dtype=float)
+
+    def interpola(nome: str, padrao=None) -> np.ndarray:
+        valores = np.array([chave.get(nome, padrao) for chave in chaves], dtype=float)
+        return np.stack([np.interp(quadros, tempos, valores[:, eixo])
+                         for eixo in range(3)], axis=1)
+
+    return interpola('vrp'), interpola('p'), interpola('view_up', (0.0, 1.0, 0.0))
+
+
+def _carrega_malha(descricao: dict, diretorio: str) -> Malha:
+    """Malha de um objeto da cena: arquivo OBJ/PLY ou cubo"""
+    if 'cubo' in descricao:
+        cubo = descricao['cubo']
+        return Malha.de_cubo(Cubo.criar_cubo_unitario(
+            centro=tuple(cubo.get('centro', (0, 0, 0))),
+            tamanho=cubo.get('tamanho', 1.0)))
+
+    caminho = os.path.join(diretorio, descricao['arquivo'])
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.obj':
+        return carrega_obj(caminho)
+    if extensao == '.ply':
+        return carrega_ply(caminho)
+    if extensao == '.cgm':
+        return carrega_instantaneo(caminho)[descricao.get('indice', 0)]
+    raise ValueError(f"Formato de malha não suportado: {caminho}")
+
+
+def _instantaneo_atual(instantaneo: str, caminho: str, descricao: dict,
+                       diretorio: str) -> bool:
+    """True se o instantâneo é mais novo que o JSON e os arquivos de malha"""
+    if not os.path.exists(instantaneo):
+        return False
+    fontes = [caminho] + [os.path.join(diretorio, item['arquivo'])
+                          for item in descricao.get('objetos', []) if 'arquivo' in item]
+    gravado = os.path.getmtime(instantaneo)
+    return all(os.path.getmtime(fonte) <= gravado for fonte in fontes)
+
+
+def carrega_cena(caminho: str, instantaneo: Optional[str] = None) -> CenaLote:
+    """
+    Lê a descrição JSON de uma cena e monta as matrizes de todos os quadros
+
+    Os objetos são estáticos: o deslocamento de cada um é aplicado aos
+    vértices uma única vez, na carga.
+
+    Com instantaneo, as malhas já posicionadas e seus dados derivados são
+    gravados nesse arquivo na primeira carga e, enquanto ele for mais
+    novo que o JSON e as malhas de origem, lidos de lá por mapeamento
+    em memória, sem interpretar OBJ/PLY nem recalcular normais.
+
+    Args:
+        caminho: Arquivo JSON no formato descrito acima
+        instantaneo: Arquivo .cgm opcional com a geometria pré-processada
+
+    Returns:
+        CenaLote pronta para renderizar
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        descricao = json.load(arquivo)
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    reaproveita = instantaneo is not None and _instantaneo_atual(
+        instantaneo, caminho, descricao, diretorio)
+
+    viewport = descricao.get('viewport', {})
+    camera = descricao['camera']
+    luzes = descricao.get('luzes', {})
+    modo_padrao = descricao.get('modo', ModoTonalizacao.GOURAUD.value)
+
+    objetos = []
+    for item in descricao.get('objetos', []):
+        malha = None
+        if not reaproveita:
+            malha = _carrega_malha(item, diretorio)
+            deslocamento = np.asarray(item.get('deslocamento', (0, 0, 0)), dtype=float)
+            if np.any(deslocamento):
+                malha = Malha(malha.vertices + deslocamento, malha.faces,
+                              normais=malha.normais, cores=malha.cores)
+        modo = item.get('modo', modo_padrao)
+        if modo != MODO_ARAMADO:
+            ModoTonalizacao(modo)  # valida
+        objetos.append(ObjetoLote(malha, Material(**item.get('material', {})), modo))
+
+    iluminacao = Iluminacao(
+        luzes.get('ambiente', (0.2, 0.2, 0.2)),
+        [Lampada(tuple(l['posicao']), tuple(l.get('cor', (1.0, 1.0, 1.0))))
+         for l in luzes.get('lampadas', [])])
+
+    n_quadros = int(camera.get('quadros', 1))
+    vrps, focos, view_ups = interpola_chaves(camera['chaves'], n_quadros)
+    janela = camera.get('janela', {})
+    matrizes = cria_matrizes_visualizacao(vrps, focos, view_ups, **janela)
+
+    cena = CenaLote(
+        largura=int(viewport.get('largura', 640)),
+        altura=int(viewport.get('altura', 480)),
+        near=float(camera.get('near', 1.0)),
+        far=float(camera.get('far', 10.0)),
+        objetos=objetos,
+        iluminacao=iluminacao,
+        matrizes=matrizes,
+        cor_fundo=tuple(viewport.get('cor_fundo', (0.0, 0.0, 0.0))),
+        instantaneo=instantaneo,
+    )
+    if instantaneo is not None:
+        if not reaproveita:
+            salva_instantaneo(instantaneo, [objeto.malha for objeto in objetos])
+        cena.restaura_malhas()
+    return cena
+
+
+# ============================================================================
+# GRAVAÇÃO DE IMAGENS
+# ============================================================================
+
+def escreve_ppm(caminho: str, imagem: np.ndarray):
+    """Grava uma imagem (A, L, 3) uint8 em PPM binário (P6)"""
+    altura, largura = imagem.shape[:2]
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(f"P6\n{largura} {altura}\n255\n".encode('ascii'))
+        arquivo.write(np.ascontiguousarray(imagem, dtype=np.uint8).tobytes())
+
+
+def _bloco_png(tipo: bytes, dados: bytes) -> bytes:
+    """Bloco PNG: tamanho, tipo, dados e CRC32 de tipo + dados"""
+    return (struct.pack('>I', len(dados)) + tipo + dados +
+            struct.pack('>I', zlib.crc32(tipo + dados) & 0xFFFFFFFF))
+
+
+def escreve_png(caminho: str, imagem: np.ndarray, nivel: int = 6):
+    """
+    Grava uma imagem (A, L, 3) uint8 em PNG RGB de 8 bits
+
+    Cada linha recebe o filtro 0 (nenhum) e o conjunto é comprimido com
+    zlib, sem dependências além da biblioteca padrão.
+
+    Args:
+        caminho: Arquivo de saída
+        imagem: Array (altura, largura, 3) uint8
+        nivel: Nível de compressão do zlib (0 a 9)
+    """
+    altura, largura = imagem.shape[:2]
+    linhas = np.empty((altura, 1 + 3 * largura), dtype=np.uint8)
+    linhas[:, 0] = 0
+    linhas[:, 1:] = imagem.reshape(altura, -1)
+
+    cabecalho = struct.pack('>IIBBBBB', largura, altura, 8, 2, 0, 0, 0)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'\x89PNG\r\n\x1a\n')
+        arquivo.write(_bloco_png(b'IHDR', cabecalho))
+        arquivo.write(_bloco_png(b'IDAT', zlib.compress(linhas.tobytes(), nivel)))
+        arquivo.write(_bloco_png(b'IEND', b''))
+
+
+_ESCRITORES = {'ppm': escreve_ppm, 'png': escreve_png}
+
+
+def caminho_quadro(diretorio: str, indice: int, formato: str) -> str:
+    """Nome do arquivo de um quadro (quadro_00012.png)"""
+    return os.path.join(diretorio, f"quadro_{indice:05d}.{formato}")
+
+
+# ============================================================================
+# RENDERIZAÇÃO POR PROCESSO
+# ============================================================================
+
+class RenderizadorQuadros:
+    """
+    Pipeline, rasterizador e cena reaproveitados entre quadros
+
+    Cada processo do pool cria um único RenderizadorQuadros; entre dois
+    quadros só a câmera muda, então os caches do pipeline (matrizes P e
+    M2, volumes envolventes e normais das malhas, tabelas especulares)
+    continuam válidos.
+    """
+
+    def __init__(self, cena: CenaLote):
+        self.cena = cena
+        self.pipeline = PipelineGrafico(cena.near, cena.far, cena.largura, cena.altura,
+                                        usa_z_negativo=True)
+        self.rasterizador = Rasterizador.para_pipeline(self.pipeline,
+                                                       cor_fundo=cena.cor_fundo)
+
+    def renderiza(self, indice: int) -> int:
+        """
+        Desenha um quadro em self.rasterizador.imagem
+
+        Args:
+            indice: Número do quadro
+
+        Returns:
+            Número de pixels escritos
+        """
+        return self.renderiza_camera(self.cena.matrizes[indice])
+
+    def renderiza_camera(self, M1: np.ndarray) -> int:
+        """
+        Desenha a cena vista por uma matriz de visualização qualquer
+
+        Args:
+            M1: Matriz de visualização (ex.: Camera.M1 de uma sessão
+                interativa)
+
+        Returns:
+            Número de pixels escritos
+        """
+        self.rasterizador.limpa()
+        self.pipeline.define_camera(M1)
+
+        escritos = 0
+        for objeto in self.cena.objetos:
+            if objeto.modo == MODO_ARAMADO:
+                escritos += self.pipeline.desenha_arestas(
+                    self.rasterizador, objeto.malha, cor=np.clip(objeto.material.kd, 0, 1))
+            else:
+                escritos += ilumina_malha(self.pipeline, self.rasterizador, objeto.malha,
+                                          self.cena.iluminacao, objeto.material,
+                                          ModoTonalizacao(objeto.modo))
+        return escritos
+
+    def renderiza_e_grava(self, indice: int, caminho: str, formato: str) -> Dict:
+        """
+        Renderiza um quadro e grava a imagem
+
+        O arquivo é escrito com outro nome e renomeado no fim, para que
+        um quadro interrompido no meio nunca pareça pronto na retomada.
+
+        Returns:
+            Registro de tempo do quadro
+        """
+        inicio = time.perf_counter()
+        pixels = self.renderiza(indice)
+        meio = time.perf_counter()
+
+        temporario = caminho + '.parcial'
+        _ESCRITORES[formato](temporario, self.rasterizador.imagem)
+        os.replace(temporario, caminho)
+        fim = time.perf_counter()
+
+        return {
+            'quadro': indice,
+            'renderizacao_s': meio - inicio,
+            'gravacao_s': fim - meio,
+            'pixels': pixels,
+            'processo': os.getpid(),
+        }
+
+
+# Instância do processo trabalhador, criada pelo inicializador do pool
+_RENDERIZADOR: Optional[RenderizadorQuadros] = None
+
+
+def _inicializa_trabalhador(cena: CenaLote):
+    global _RENDERIZADOR
+    if cena.instantaneo is not None:
+        cena.restaura_malhas()
+    _RENDERIZADOR = RenderizadorQuadros(cena)
+
+
+def _renderiza_tarefa(tarefa: Tuple[int, str, str]) -> Dict:
+    indice, caminho, formato = tarefa
+    return _RENDERIZADOR.renderiza_e_grava(indice, caminho, formato)
+
+
+# ============================================================================
+# LOTE
+# ============================================================================
+
+def renderiza_lote(cena: CenaLote, diretorio: str, formato: str = 'ppm',
+                   processos: int = 1, quadros: Optional[Sequence[int]] = None,
+                   refaz: bool = False, progresso=None) -> Dict:
+    """
+    Renderiza uma sequência de quadros em arquivos de imagem
+
+    Args:
+        cena: Cena carregada por carrega_cena
+        diretorio: Diretório de saída (criado se não existir)
+        formato: 'ppm' ou 'png'
+        processos: Número de processos; 1 renderiza no processo atual
+        quadros: Índices a renderizar (padrão: todos)
+        refaz: Se False, quadros cujo arquivo já existe são pulados
+        progresso: Função opcional chamada com o registro de cada quadro
+
+    Returns:
+        Relatório com o registro de cada quadro renderizado, os quadros
+        pulados e o tempo total
+    """
+    if formato not in _ESCRITORES:
+        raise ValueError(f"Formato desconhecido: {formato} (use {FORMATOS})")
+    os.makedirs(diretorio, exist_ok=True)
+
+    if quadros is None:
+        quadros = range(cena.n_quadros)
+    tarefas, pulados = [], []
+    for indice in quadros:
+        caminho = caminho_quadro(diretorio, indice, formato)
+        if not refaz and os.path.exists(caminho):
+            pulados.append(indice)
+        else:
+            tarefas.append((indice, caminho, formato))
+
+    inicio = time.perf_counter()
+    registros = []
+    if processos <= 1 or len(tarefas) <= 1:
+        renderizador = RenderizadorQuadros(cena)
+        for indice, caminho, formato in tarefas:
+            registros.append(renderizador.renderiza_e_grava(indice, caminho, formato))
+            if progresso:
+                progresso(registros[-1])
+    else:
+        # Com instantâneo as malhas não são serializadas: cada processo
+        # mapeia o arquivo e compartilha as páginas com os demais
+        enviada = cena.sem_malhas() if cena.instantaneo is not None else cena
+        with ProcessPoolExecutor(max_workers=processos,
+                                 initializer=_inicializa_trabalhador,
+                                 initargs=(enviada,)) as pool:
+            futuros = [pool.submit(_renderiza_tarefa, tarefa) for tarefa in tarefas]
+            for futuro in as_completed(futuros):
+                registros.append(futuro.result())
+                if progresso:
+                    progresso(registros[-1])
+
+    registros.sort(key=lambda registro: registro['quadro'])
+    return {
+        'quadros': registros,
+        'pulados': pulados,
+        'processos': processos,
+        'tempo_total_s': time.perf_counter() - inicio,
+    }
+
+
+def resumo(relatorio: Dict) -> str:
+    """Linhas de texto com o tempo por quadro e as estatísticas do lote"""
+    linhas = [f"{'quadro':>7} {'render (ms)':>12} {'gravação (ms)':>14} {'pixels':>9} {'pid':>7}"]
+    for registro in relatorio['quadros']:
+        linhas.append(f"{registro['quadro']:>7} {registro['renderizacao_s'] * 1e3:>12.1f} "
+                      f"{registro['gravacao_s'] * 1e3:>14.1f} {registro['pixels']:>9} "
+                      f"{registro['processo']:>7}")
+
+    tempos = np.array([r['renderizacao_s'] + r['gravacao_s'] for r in relatorio['quadros']])
+    total = relatorio['tempo_total_s']
+    linhas.append(f"{len(tempos)} quadros renderizados, {len(relatorio['pulados'])} pulados, "
+                  f"{relatorio['processos']} processo(s), {total:.2f} s")
+    if len(tempos):
+        linhas.append(f"Por quadro: média {tempos.mean() * 1e3:.1f} ms, "
+                      f"máx {tempos.max() * 1e3:.1f} ms; "
+                      f"vazão {len(tempos) / total:.1f} quadros/s")
+    return "\n".join(linhas)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('cena', help='Descrição da cena em JSON')
+    parser.add_argument('--saida', default='quadros', help='Diretório das imagens')
+    parser.add_argument('--formato', choices=FORMATOS, default='ppm')
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--quadros', type=int, nargs=2, metavar=('INICIO', 'FIM'),
+                        help='Intervalo [INICIO, FIM) de quadros (padrão: todos)')
+    parser.add_argument('--refaz', action='store_true',
+                        help='Renderiza de novo quadros que já existem')
+    parser.add_argument('--relatorio', help='Grava os tempos por quadro em JSON')
+    parser.add_argument('--silencioso', action='store_true',
+                        help='Não imprime cada quadro ao terminar')
+    parser.add_argument('--instantaneo', metavar='ARQUIVO',
+                        help='Geometria pré-processada (.cgm), criada se ausente '
+                             'ou desatualizada')
+    args = parser.parse_args(argv)
+
+    cena = carrega_cena(args.cena, args.instantaneo)
+    quadros = range(*args.quadros) if args.quadros else None
+
+    def progresso(registro: Dict):
+        print(f"quadro {registro['quadro']:5d}: "
+              f"{(registro['renderizacao_s'] + registro['gravacao_s']) * 1e3:8.1f} ms",
+              file=sys.stderr)
+
+    relatorio = renderiza_lote(cena, args.saida, args.formato, args.processos,
+                               quadros, args.refaz,
+                               None if args.silencioso else progresso)
+    print(resumo(relatorio))
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
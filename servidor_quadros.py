@@ -0,0 +1,715 @@
+"""
+Servidor local (asyncio) que transmite a saída do pipeline ao visualizador
+
+1. Cena JSON (formato de renderizador_lote) renderizada em um executor,
+   fora do laço de eventos
+2. Quadros enviados como mensagens binárias por WebSocket (/ws) ou por
+   HTTP com transferência em blocos (/quadros): segmentos (escreve_quadro)
+   ou imagem RGB do framebuffer
+3. Controle de câmera pelo cliente (orbita, aproxima, desloca, posiciona)
+4. Contrapressão: cada visualizador guarda só o quadro mais recente; um
+   cliente lento perde quadros em vez de acumular atraso
+5. Cliente local de teste (WebSocket e HTTP) para exercitar o servidor
+
+Uso:
+    python servidor_quadros.py cena_exemplo.json --porta 8765
+    python servidor_quadros.py cena_exemplo.json --modo imagem
+    python servidor_quadros.py cena_exemplo.json --teste
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from fase2_pipeline import Camera, escreve_quadro, le_quadro
+from renderizador_lote import CenaLote, RenderizadorQuadros, carrega_cena, interpola_chaves
+
+MODOS = ('segmentos', 'imagem')
+
+# ============================================================================
+# WEBSOCKET (RFC 6455, SÓ O NECESSÁRIO)
+# ============================================================================
+
+_GUID_WS = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUACAO = 0x0
+OP_TEXTO = 0x1
+OP_BINARIO = 0x2
+OP_FECHA = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+MAX_MENSAGEM_WS = 1 << 24
+
+
+def chave_aceite_ws(chave: str) -> str:
+    """Valor de Sec-WebSocket-Accept para uma Sec-WebSocket-Key"""
+    resumo = hashlib.sha1((chave + _GUID_WS).encode('ascii')).digest()
+    return base64.b64encode(resumo).decode('ascii')
+
+
+def codifica_mensagem_ws(opcode: int, dados: bytes, mascara: bool = False) -> bytes:
+    """
+    Monta um quadro WebSocket final (FIN = 1) com um único fragmento
+
+    Args:
+        opcode: OP_TEXTO, OP_BINARIO, OP_FECHA, OP_PING ou OP_PONG
+        dados: Conteúdo da mensagem
+        mascara: True para quadros enviados pelo cliente (obrigatório
+            pela RFC); o servidor envia sem máscara
+
+    Returns:
+        Bytes prontos para escrever no socket
+    """
+    tamanho = len(dados)
+    bit_mascara = 0x80 if mascara else 0
+    if tamanho < 126:
+        cabecalho = struct.pack('!BB', 0x80 | opcode, bit_mascara | tamanho)
+    elif tamanho < 1 << 16:
+        cabecalho = struct.pack('!BBH', 0x80 | opcode, bit_mascara | 126, tamanho)
+    else:
+        cabecalho = struct.pack('!BBQ', 0x80 | opcode, bit_mascara | 127, tamanho)
+
+    if not mascara:
+        return cabecalho + bytes(dados)
+    chave = os.urandom(4)
+    return cabecalho + chave + _aplica_mascara(dados, chave)
+
+
+def _aplica_mascara(dados: bytes, chave: bytes) -> bytes:
+    """XOR dos dados com a chave de 4 bytes repetida"""
+    bloco = np.frombuffer(chave * (-(-len(dados) // 4)), dtype=np.uint8)[:len(dados)]
+    return (np.frombuffer(dados, dtype=np.uint8) ^ bloco).tobytes()
+
+
+async def _le_fragmento_ws(leitor: asyncio.StreamReader) -> Tuple[bool, int, bytes]:
+    """Lê um quadro WebSocket: (fin, opcode, dados já sem máscara)"""
+    b0, b1 = await leitor.readexactly(2)
+    tamanho = b1 & 0x7F
+    if tamanho == 126:
+        tamanho, = struct.unpack('!H', await leitor.readexactly(2))
+    elif tamanho == 127:
+        tamanho, = struct.unpack('!Q', await leitor.readexactly(8))
+    if tamanho > MAX_MENSAGEM_WS:
+        raise ValueError(f"Mensagem WebSocket grande demais: {tamanho} bytes")
+
+    chave = await leitor.readexactly(4) if b1 & 0x80 else None
+    dados = await leitor.readexactly(tamanho)
+    if chave is not None:
+        dados = _aplica_mascara(dados, chave)
+    return bool(b0 & 0x80), b0 & 0x0F, dados
+
+
+async def le_mensagem_ws(leitor: asyncio.StreamReader,
+                         escritor: Optional[asyncio.StreamWriter] = None,
+                         mascara: bool = False) -> Tuple[int, bytes]:
+    """
+    Lê a próxima mensagem de dados ou de fechamento
+
+    Fragmentos são juntados; pings recebidos são respondidos com pong
+    (se houver escritor) e pongs são ignorados.
+
+    Args:
+        leitor: Fluxo de entrada
+        escritor: Fluxo de saída para responder pings
+        mascara: Se as respostas devem ser mascaradas (lado cliente)
+
+    Returns:
+        Tupla (opcode, dados); OP_FECHA indica fim da conexão
+    """
+    partes, opcode = [], None
+    while True:
+        fin, op, dados = await _le_fragmento_ws(leitor)
+        if op == OP_PING:
+            if escritor is not None:
+                escritor.write(codifica_mensagem_ws(OP_PONG, dados, mascara))
+            continue
+        if op == OP_PONG:
+            continue
+        if op == OP_FECHA:
+            return OP_FECHA, dados
+        if op != OP_CONTINUACAO:
+            opcode = op
+        partes.append(dados)
+        if fin:
+            return opcode, b''.join(partes)
+
+
+async def _le_cabecalho_http(leitor: asyncio.StreamReader
+                             ) -> Tuple[str, str, Dict[str, str]]:
+    """Linha de requisição e cabeçalhos (nomes em minúsculas)"""
+    linha = (await leitor.readline()).decode('latin-1').strip()
+    if not linha:
+        raise ConnectionError("Conexão fechada antes da requisição")
+    metodo, caminho, _ = linha.split(' ', 2)
+
+    cabecalhos = {}
+    while True:
+        linha = (await leitor.readline()).decode('latin-1').strip()
+        if not linha:
+            break
+        nome, _, valor = linha.partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    return metodo, caminho, cabecalhos
+
+
+def _resposta_http(status: str, corpo: bytes = b'',
+                   tipo: str = 'application/json') -> bytes:
+    return (f"HTTP/1.1 {status}\r\nContent-Type: {tipo}\r\n"
+            f"Content-Length: {len(corpo)}\r\nConnection: close\r\n"
+            f"Access-Control-Allow-Origin: *\r\n\r\n").encode('latin-1') + corpo
+
+
+# ============================================================================
+# MENSAGENS DE IMAGEM
+# ============================================================================
+
+# Cabeçalho de 20 bytes ("CGIM", versão u16, canais u16, nº do quadro u32,
+# largura u32, altura u32) seguido dos pixels RGB uint8 linha a linha
+MAGICO_IMAGEM = b'CGIM'
+VERSAO_IMAGEM = 1
+_CABECALHO_IMAGEM = struct.Struct('<4sHHIII')
+
+
+def bytes_imagem(imagem: np.ndarray, numero: int = 0) -> bytes:
+    """Mensagem binária com o framebuffer (altura, largura, 3) uint8"""
+    altura, largura, canais = imagem.shape
+    cabecalho = _CABECALHO_IMAGEM.pack(MAGICO_IMAGEM, VERSAO_IMAGEM, canais,
+                                       numero, largura, altura)
+    return cabecalho + np.ascontiguousarray(imagem, dtype=np.uint8).tobytes()
+
+
+def le_imagem(dados) -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Lê uma mensagem de imagem sem copiar os pixels
+
+    Returns:
+        Tupla (cabeçalho, imagem (altura, largura, canais) uint8)
+    """
+    magico, versao, canais, numero, largura, altura = \
+        _CABECALHO_IMAGEM.unpack_from(dados, 0)
+    if magico != MAGICO_IMAGEM:
+        raise ValueError(f"Mensagem de imagem inválida: {magico!r}")
+    if versao != VERSAO_IMAGEM:
+        raise ValueError(f"Versão de imagem não suportada: {versao}")
+    imagem = np.frombuffer(dados, dtype=np.uint8, count=altura * largura * canais,
+                           offset=_CABECALHO_IMAGEM.size)
+    cabecalho = {'numero': numero, 'largura': largura, 'altura': altura}
+    return cabecalho, imagem.reshape(altura, largura, canais)
+
+
+# ============================================================================
+# CONTROLE DE CÂMERA
+# ============================================================================
+
+def aplica_comando(camera: Camera, comando: Dict):
+    """
+    Aplica uma mensagem de controle do cliente à câmera
+
+    Formatos aceitos (JSON):
+        {"tipo": "orbita", "azimute": rad, "elevacao": rad}
+        {"tipo": "aproxima", "distancia": d}
+        {"tipo": "desloca", "du": du, "dv": dv}
+        {"tipo": "posiciona", "vrp": [x, y, z], "p": [x, y, z], "view_up": [...]}
+
+    Raises:
+        ValueError: Tipo de comando desconhecido
+    """
+    tipo = comando.get('tipo')
+    if tipo == 'orbita':
+        camera.orbita(float(comando.get('azimute', 0.0)),
+                      float(comando.get('elevacao', 0.0)))
+    elif tipo == 'aproxima':
+        camera.aproxima(float(comando['distancia']))
+    elif tipo == 'desloca':
+        camera.desloca(float(comando.get('du', 0.0)), float(comando.get('dv', 0.0)))
+    elif tipo == 'posiciona':
+        camera.posiciona(comando.get('vrp'), comando.get('p'), comando.get('view_up'))
+    else:
+        raise ValueError(f"Comando de câmera desconhecido: {tipo}")
+
+
+def camera_da_cena(caminho: str, quadro: int = 0) -> Camera:
+    """Câmera interativa na posição de um quadro do percurso da cena JSON"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        camera = json.load(arquivo)['camera']
+    n_quadros = int(camera.get('quadros', 1))
+    vrps, focos, view_ups = interpola_chaves(camera['chaves'], n_quadros)
+    return Camera(vrps[quadro], focos[quadro], view_ups[quadro],
+                  near=float(camera.get('near', 1.0)), far=float(camera.get('far', 10.0)),
+                  **camera.get('janela', {}))
+
+
+# ============================================================================
+# VISUALIZADORES
+# ============================================================================
+
+class Visualizador:
+    """
+    Cliente conectado, com espaço para um único quadro pendente
+
+    O laço de envio de cada cliente pega o quadro mais recente; se um
+    novo quadro chega antes de o anterior ser retirado, o anterior é
+    descartado. Um cliente lento nunca faz o servidor acumular fila nem
+    atrasa os demais.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.enviados = 0
+        self.descartados = 0
+        self._quadro: Optional[bytes] = None
+        self._novo = asyncio.Event()
+
+    def oferece(self, quadro: bytes):
+        """Deixa um quadro pronto para envio, substituindo o pendente"""
+        if self._quadro is not None:
+            self.descartados += 1
+        self._quadro = quadro
+        self._novo.set()
+
+    async def proximo(self) -> bytes:
+        """Espera e retira o quadro pendente"""
+        await self._novo.wait()
+        self._novo.clear()
+        quadro, self._quadro = self._quadro, None
+        return quadro
+
+    def estado(self) -> Dict:
+        return {'nome': self.nome, 'enviados': self.enviados,
+                'descartados': self.descartados}
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+
+class ServidorQuadros:
+    """
+    Serve os quadros de uma cena a vários visualizadores
+
+    Um quadro só é renderizado quando a câmera muda (ou quando o
+    servidor inicia); comandos que chegam durante uma renderização são
+    acumulados na câmera e geram um único quadro seguinte. O pipeline
+    roda em um executor de uma thread, então o laço de eventos continua
+    aceitando conexões e comandos enquanto o NumPy trabalha.
+    """
+
+    def __init__(self, cena: CenaLote, camera: Camera, modo: str = 'segmentos',
+                 limite_envio: int = 1 << 16):
+        """
+        Args:
+            cena: Cena carregada por carrega_cena
+            camera: Câmera controlada pelos clientes
+            modo: 'segmentos' (arestas visíveis de todos os objetos, no
+                formato de escreve_quadro) ou 'imagem' (framebuffer RGB)
+            limite_envio: Bytes no buffer de saída de cada conexão a partir
+                dos quais o envio espera o cliente (contrapressão)
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo desconhecido: {modo} (use {MODOS})")
+        self.cena = cena
+        self.camera = camera
+        self.modo = modo
+        self.limite_envio = limite_envio
+        self.renderizador = RenderizadorQuadros(cena)
+
+        self.visualizadores: Set[Visualizador] = set()
+        self.ultimo: Optional[bytes] = None
+        self.numero = 0
+        self.tempo_renderizacao = 0.0
+        self.comandos = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._mudou: Optional[asyncio.Event] = None
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._laco: Optional[asyncio.Task] = None
+        self._atendimentos: Set[asyncio.Task] = set()
+        self._conexoes = 0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def inicia(self, host: str = '127.0.0.1', porta: int = 0) -> int:
+        """Abre o socket e começa a renderizar; retorna a porta usada"""
+        self._mudou = asyncio.Event()
+        self._mudou.set()
+        self._laco = asyncio.create_task(self._laco_renderizacao())
+        self._servidor = await asyncio.start_server(self._atende, host, porta)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def fecha(self):
+        """Para de aceitar conexões, derruba as abertas e encerra a renderização"""
+        if self._servidor is not None:
+            self._servidor.close()
+        tarefas = list(self._atendimentos)
+        if self._laco is not None:
+            tarefas.append(self._laco)
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        if self._servidor is not None:
+            await self._servidor.wait_closed()
+        self._executor.shutdown(wait=True)
+
+    def comando(self, comando: Dict):
+        """Aplica um comando de câmera e pede um novo quadro"""
+        aplica_comando(self.camera, comando)
+        self.comandos += 1
+        self._mudou.set()
+
+    def estado(self) -> Dict:
+        """Estatísticas do servidor e de cada visualizador"""
+        return {
+            'modo': self.modo,
+            'quadros': self.numero,
+            'comandos': self.comandos,
+            'renderizacao_ms': self.tempo_renderizacao * 1e3 / max(self.numero, 1),
+            'vrp': self.camera.vrp.tolist(),
+            'visualizadores': [v.estado() for v in self.visualizadores],
+        }
+
+    # ------------------------------------------------------------------
+    # Renderização
+    # ------------------------------------------------------------------
+
+    async def _laco_renderizacao(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            await self._mudou.wait()
+            self._mudou.clear()
+            # A câmera só é alterada no laço de eventos; o executor recebe
+            # uma cópia de M1
+            M1 = self.camera.M1.copy()
+            inicio = time.perf_counter()
+            quadro = await laco.run_in_executor(self._executor, self._renderiza,
+                                                M1, self.numero)
+            self.tempo_renderizacao += time.perf_counter() - inicio
+            self.numero += 1
+            self.ultimo = quadro
+            for visualizador in self.visualizadores:
+                visualizador.oferece(quadro)
+
+    def _renderiza(self, M1: np.ndarray, numero: int) -> bytes:
+        """Gera a mensagem binária de um quadro (roda no executor)"""
+        if self.modo == 'imagem':
+            self.renderizador.renderiza_camera(M1)
+            return bytes_imagem(self.renderizador.rasterizador.imagem, numero)
+
+        pipeline = self.renderizador.pipeline
+        pipeline.define_camera(M1)
+        segmentos = [pipeline.processa_segmentos(objeto.malha)
+                     for objeto in self.cena.objetos]
+        saida = io.BytesIO()
+        escreve_quadro(saida, np.concatenate(segmentos) if segmentos else [],
+                       numero, self.cena.largura, self.cena.altura)
+        return saida.getvalue()
+
+    # ------------------------------------------------------------------
+    # Conexões
+    # ------------------------------------------------------------------
+
+    async def _atende(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        tarefa = asyncio.current_task()
+        self._atendimentos.add(tarefa)
+        try:
+            metodo, caminho, cabecalhos = await _le_cabecalho_http(leitor)
+            rota = caminho.split('?', 1)[0]
+
+            if rota == '/ws' and cabecalhos.get('upgrade', '').lower() == 'websocket':
+                await self._sessao_ws(leitor, escritor, cabecalhos)
+            elif rota == '/quadros' and metodo == 'GET':
+                await self._sessao_http(escritor)
+            elif rota == '/camera' and metodo == 'POST':
+                corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+                try:
+                    self.comando(json.loads(corpo))
+                    escritor.write(_resposta_http('204 No Content'))
+                except (ValueError, KeyError, TypeError) as erro:
+                    escritor.write(_resposta_http(
+                        '400 Bad Request', json.dumps({'erro': str(erro)}).encode()))
+            elif rota == '/estado' and metodo == 'GET':
+                escritor.write(_resposta_http('200 OK', json.dumps(self.estado()).encode()))
+            else:
+                escritor.write(_resposta_http('404 Not Found'))
+            await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Servidor fechando: a conexão termina sem erro
+            pass
+        finally:
+            self._atendimentos.discard(tarefa)
+            escritor.close()
+
+    def _novo_visualizador(self, escritor: asyncio.StreamWriter, tipo: str) -> Visualizador:
+        self._conexoes += 1
+        visualizador = Visualizador(f"{tipo}-{self._conexoes}")
+        escritor.transport.set_write_buffer_limits(high=self.limite_envio)
+        self.visualizadores.add(visualizador)
+        if self.ultimo is not None:
+            visualizador.oferece(self.ultimo)
+        return visualizador
+
+    async def _sessao_ws(self, leitor: asyncio.StreamReader,
+                         escritor: asyncio.StreamWriter, cabecalhos: Dict[str, str]):
+        """Envia quadros binários e recebe comandos JSON (mensagens de texto)"""
+        aceite = chave_aceite_ws(cabecalhos['sec-websocket-key'])
+        escritor.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Accept: {aceite}\r\n\r\n"
+        ).encode('latin-1'))
+        await escritor.drain()
+        visualizador = self._novo_visualizador(escritor, 'ws')
+
+        async def envia():
+            while True:
+                quadro = await visualizador.proximo()
+                escritor.write(codifica_mensagem_ws(OP_BINARIO, quadro))
+                await escritor.drain()
+                visualizador.enviados += 1
+
+        async def recebe():
+            while True:
+                opcode, dados = await le_mensagem_ws(leitor, escritor)
+                if opcode == OP_FECHA:
+                    escritor.write(codifica_mensagem_ws(OP_FECHA, dados[:2]))
+                    return
+                if opcode != OP_TEXTO:
+                    continue
+                try:
+                    self.comando(json.loads(dados))
+                except (ValueError, KeyError, TypeError) as erro:
+                    escritor.write(codifica_mensagem_ws(
+                        OP_TEXTO, json.dumps({'erro': str(erro)}).encode()))
+
+        tarefas = [asyncio.create_task(envia()), asyncio.create_task(recebe())]
+        try:
+            await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            self.visualizadores.discard(visualizador)
+
+    async def _sessao_http(self, escritor: asyncio.StreamWriter):
+        """Fluxo HTTP em blocos: um bloco por quadro, até o cliente sair"""
+        escritor.write((
+            "HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n"
+            "Transfer-Encoding: chunked\r\nCache-Control: no-store\r\n"
+            "Access-Control-Allow-Origin: *\r\n\r\n"
+        ).encode('latin-1'))
+        visualizador = self._novo_visualizador(escritor, 'http')
+        try:
+            while True:
+                quadro = await visualizador.proximo()
+                escritor.write(f"{len(quadro):X}\r\n".encode('ascii') + quadro + b"\r\n")
+                await escritor.drain()
+                visualizador.enviados += 1
+        finally:
+            self.visualizadores.discard(visualizador)
+
+
+# ============================================================================
+# CLIENTE DE TESTE
+# ============================================================================
+
+class ClienteTeste:
+    """Cliente WebSocket mínimo para testar o servidor sem navegador"""
+
+    def __init__(self):
+        self.leitor: Optional[asyncio.StreamReader] = None
+        self.escritor: Optional[asyncio.StreamWriter] = None
+
+    async def conecta(self, host: str, porta: int, caminho: str = '/ws'):
+        """Abre a conexão e faz o handshake; confere o Sec-WebSocket-Accept"""
+        self.leitor, self.escritor = await asyncio.open_connection(host, porta)
+        chave = base64.b64encode(os.urandom(16)).decode('ascii')
+        self.escritor.write((
+            f"GET {caminho} HTTP/1.1\r\nHost: {host}:{porta}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {chave}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode('latin-1'))
+        await self.escritor.drain()
+
+        linha = (await self.leitor.readline()).decode('latin-1')
+        if ' 101 ' not in linha:
+            raise ConnectionError(f"Handshake recusado: {linha.strip()}")
+        cabecalhos = {}
+        while True:
+            linha = (await self.leitor.readline()).decode('latin-1').strip()
+            if not linha:
+                break
+            nome, _, valor = linha.partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        if cabecalhos.get('sec-websocket-accept') != chave_aceite_ws(chave):
+            raise ConnectionError("Sec-WebSocket-Accept inválido")
+
+    async def envia_comando(self, comando: Dict):
+        self.escritor.write(codifica_mensagem_ws(OP_TEXTO, json.dumps(comando).encode(),
+                                                 mascara=True))
+        await self.escritor.drain()
+
+    async def recebe(self) -> bytes:
+        """Próxima mensagem binária (quadro)"""
+        while True:
+            opcode, dados = await le_mensagem_ws(self.leitor, self.escritor, mascara=True)
+            if opcode == OP_FECHA:
+                raise ConnectionError("Servidor fechou a conexão")
+            if opcode == OP_BINARIO:
+                return dados
+
+    async def fecha(self):
+        self.escritor.write(codifica_mensagem_ws(OP_FECHA, struct.pack('!H', 1000),
+                                                 mascara=True))
+        await self.escritor.drain()
+        self.escritor.close()
+
+
+async def le_fluxo_http(host: str, porta: int, n_quadros: int) -> list:
+    """Lê n_quadros blocos de /quadros (transferência em blocos)"""
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    escritor.write(f"GET /quadros HTTP/1.1\r\nHost: {host}:{porta}\r\n\r\n".encode('latin-1'))
+    await escritor.drain()
+    while (await leitor.readline()).strip():
+        pass
+
+    quadros = []
+    for _ in range(n_quadros):
+        tamanho = int((await leitor.readline()).strip(), 16)
+        quadros.append(await leitor.readexactly(tamanho))
+        await leitor.readexactly(2)
+    escritor.close()
+    return quadros
+
+
+async def requisicao_http(host: str, porta: int, metodo: str, caminho: str,
+                          corpo: bytes = b'') -> Tuple[int, bytes]:
+    """Requisição HTTP simples (status, corpo)"""
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    escritor.write((f"{metodo} {caminho} HTTP/1.1\r\nHost: {host}:{porta}\r\n"
+                    f"Content-Length: {len(corpo)}\r\n\r\n").encode('latin-1') + corpo)
+    await escritor.drain()
+    resposta = await leitor.read()
+    escritor.close()
+    cabecalho, _, dados = resposta.partition(b'\r\n\r\n')
+    return int(cabecalho.split()[1]), dados
+
+
+async def demonstracao(caminho_cena: str):
+    """Servidor e clientes no mesmo processo: formato, câmera e contrapressão"""
+    cena = carrega_cena(caminho_cena)
+
+    print("--- Segmentos por WebSocket ---")
+    servidor = ServidorQuadros(cena, camera_da_cena(caminho_cena))
+    porta = await servidor.inicia()
+    cliente = ClienteTeste()
+    await cliente.conecta('127.0.0.1', porta)
+    cabecalho, segmentos, _ = le_quadro(await cliente.recebe())
+    print(f"Quadro {cabecalho['numero']}: {len(segmentos)} segmentos "
+          f"({cabecalho['largura']}x{cabecalho['altura']})")
+
+    latencias = []
+    for _ in range(10):
+        inicio = time.perf_counter()
+        await cliente.envia_comando({'tipo': 'orbita', 'azimute': 0.1})
+        cabecalho, segmentos, _ = le_quadro(await cliente.recebe())
+        latencias.append(time.perf_counter() - inicio)
+    print(f"Comando -> quadro: média {np.mean(latencias) * 1e3:.1f} ms, "
+          f"máx {np.max(latencias) * 1e3:.1f} ms")
+
+    # O último quadro confere com o pipeline rodando direto
+    referencia = RenderizadorQuadros(cena).pipeline
+    referencia.define_camera(servidor.camera.M1)
+    esperado = np.concatenate([referencia.processa_segmentos(o.malha) for o in cena.objetos])
+    print(f"Igual ao pipeline direto: {np.array_equal(segmentos, esperado)}")
+
+    status, _ = await requisicao_http('127.0.0.1', porta, 'POST', '/camera',
+                                      json.dumps({'tipo': 'aproxima', 'distancia': 0.5}).encode())
+    http = await le_fluxo_http('127.0.0.1', porta, 1)
+    print(f"POST /camera: {status}; /quadros em blocos: quadro {le_quadro(http[0])[0]['numero']}")
+    status, _ = await requisicao_http('127.0.0.1', porta, 'POST', '/camera',
+                                      b'{"tipo": "voa"}')
+    print(f"Comando inválido: {status}")
+    await cliente.fecha()
+    await servidor.fecha()
+
+    print("\n--- Contrapressão (imagem, cliente lento) ---")
+    servidor = ServidorQuadros(cena, camera_da_cena(caminho_cena), modo='imagem')
+    porta = await servidor.inicia()
+    rapido, lento = ClienteTeste(), ClienteTeste()
+    await rapido.conecta('127.0.0.1', porta)
+    await lento.conecta('127.0.0.1', porta)
+    await rapido.recebe()
+
+    recebidos_lento = 0
+    for _ in range(30):
+        await rapido.envia_comando({'tipo': 'orbita', 'azimute': 0.05})
+        cabecalho, imagem = le_imagem(await rapido.recebe())
+    for _ in range(3):
+        # O cliente lento só lê de vez em quando
+        await lento.recebe()
+        recebidos_lento += 1
+    status, corpo = await requisicao_http('127.0.0.1', porta, 'GET', '/estado')
+    estado = json.loads(corpo)
+    print(f"{estado['quadros']} quadros renderizados, "
+          f"{estado['renderizacao_ms']:.1f} ms por quadro, imagem {imagem.shape}")
+    for visualizador in sorted(estado['visualizadores'], key=lambda v: v['nome']):
+        print(f"  {visualizador['nome']}: {visualizador['enviados']} enviados, "
+              f"{visualizador['descartados']} descartados")
+    print(f"Cliente lento leu {recebidos_lento} quadros sem atrasar o rápido")
+    await rapido.fecha()
+    await lento.fecha()
+    await servidor.fecha()
+
+
+# ============================================================================
+# LINHA DE COMANDO
+# ============================================================================
+
+async def _serve(args):
+    cena = carrega_cena(args.cena, args.instantaneo)
+    servidor = ServidorQuadros(cena, camera_da_cena(args.cena), args.modo)
+    porta = await servidor.inicia(args.host, args.porta)
+    print(f"Servindo {args.cena} em ws://{args.host}:{porta}/ws "
+          f"e http://{args.host}:{porta}/quadros ({args.modo})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.fecha()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('cena', help='Descrição da cena em JSON')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--modo', choices=MODOS, default='segmentos')
+    parser.add_argument('--instantaneo', metavar='ARQUIVO',
+                        help='Geometria pré-processada (.cgm), ver renderizador_lote')
+    parser.add_argument('--teste', action='store_true',
+                        help='Roda servidor e clientes locais e imprime os resultados')
+    args = parser.parse_args(argv)
+
+    if args.teste:
+        asyncio.run(demonstracao(args.cena))
+        return 0
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())